@@ -0,0 +1,29 @@
+'''Benchmarks of the time to import elm modules in a new process
+
+Imports are timed in a subprocess so that modules already imported
+by asv or other benchmarks do not hide the cost.
+'''
+import subprocess as sp
+import sys
+
+IMPORT_CODE = '''
+import time
+start = time.perf_counter()
+import {}
+print(time.perf_counter() - start)
+'''
+
+
+def _import_seconds(module):
+    out = sp.check_output([sys.executable, '-c', IMPORT_CODE.format(module)])
+    return float(out.decode().strip().splitlines()[-1])
+
+
+class TrackImport(object):
+    params = ['elm.config', 'elm.readers', 'elm.pipeline', 'elm.scripts.main']
+    param_names = ['module']
+    timeout = 120
+
+    def track_import(self, module):
+        return _import_seconds(module)
+    track_import.unit = 'seconds'
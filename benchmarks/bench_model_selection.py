@@ -0,0 +1,16 @@
+'''Benchmarks of model selection helpers'''
+import numpy as np
+
+from elm.model_selection.sorting import pareto_front, _pareto_front_deap
+
+
+class TimeParetoFront(object):
+    params = ([100, 1000], ['numpy', 'deap'])
+    param_names = ['n_models', 'implementation']
+
+    def setup(self, n_models, implementation):
+        self.objectives = np.random.RandomState(0).randn(n_models, 2)
+        self.func = pareto_front if implementation == 'numpy' else _pareto_front_deap
+
+    def time_pareto_front(self, n_models, implementation):
+        self.func([-1, 1], self.objectives)
@@ -0,0 +1,104 @@
+'''Benchmarks of Pipeline fit / predict, fit_ensemble, fit_ea
+and predict_many for each executor'''
+import copy
+import os
+import shutil
+import tempfile
+
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+
+from elm.model_selection.evolve import ea_setup
+from elm.model_selection.kmeans import kmeans_aic
+from elm.pipeline import Pipeline, steps
+
+from .common import synthetic_es, make_client, close_client, EXECUTORS
+
+
+def _pipeline():
+    return Pipeline([steps.Flatten(),
+                     ('pca', steps.Transform(IncrementalPCA(n_components=3))),
+                     ('kmeans', MiniBatchKMeans(n_clusters=4))],
+                    scoring=kmeans_aic,
+                    scoring_kwargs={'score_weights': [-1]})
+
+
+def _sampler(*args, **kwargs):
+    return synthetic_es(bands=6, height=100, width=100)
+
+
+ARGS_LIST = [()] * 4
+
+PARAM_GRID = {
+    'kmeans__n_clusters': list(range(3, 8)),
+    'pca__n_components': [2, 3, 4],
+    'control': {
+        'select_method': 'selNSGA2',
+        'crossover_method': 'cxTwoPoint',
+        'mutate_method': 'mutUniformInt',
+        'init_pop': 'random',
+        'indpb': 0.5,
+        'mutpb': 0.9,
+        'cxpb':  0.3,
+        'eta':   20,
+        'ngen':  2,
+        'mu':    4,
+        'k':     4,
+    }
+}
+
+
+class TimePipeline(object):
+    params = [100, 500]
+    param_names = ['size']
+
+    def setup(self, size):
+        self.X = synthetic_es(bands=6, height=size, width=size)
+        self.pipe = _pipeline()
+        self.fitted = _pipeline().fit(self.X)
+
+    def time_fit(self, size):
+        self.pipe.fit(self.X)
+
+    def time_predict(self, size):
+        self.fitted.predict(self.X)
+
+    def peakmem_fit(self, size):
+        self.pipe.fit(self.X)
+
+
+class TimeEnsemble(object):
+    params = EXECUTORS
+    param_names = ['executor']
+    timeout = 300
+
+    def setup(self, executor):
+        self.client = make_client(executor)
+        self.tmp = tempfile.mkdtemp()
+        self.pipe = _pipeline()
+        self.fitted = _pipeline().fit_ensemble(sampler=_sampler,
+                                               args_list=ARGS_LIST,
+                                               ngen=1,
+                                               init_ensemble_size=2)
+
+    def teardown(self, executor):
+        close_client(self.client)
+        shutil.rmtree(self.tmp)
+
+    def time_fit_ensemble(self, executor):
+        self.pipe.fit_ensemble(sampler=_sampler, args_list=ARGS_LIST,
+                               client=self.client, ngen=2,
+                               init_ensemble_size=4,
+                               saved_ensemble_size=2)
+
+    def time_fit_ea(self, executor):
+        evo_params = ea_setup(param_grid=copy.deepcopy(PARAM_GRID),
+                              param_grid_name='bench_param_grid',
+                              score_weights=[-1])
+        evo_params.history_file = os.path.join(self.tmp, evo_params.history_file)
+        self.pipe.fit_ea(sampler=_sampler, args_list=ARGS_LIST,
+                         client=self.client, evo_params=evo_params)
+
+    def time_predict_many(self, executor):
+        self.fitted.predict_many(sampler=_sampler, args_list=ARGS_LIST,
+                                 client=self.client, to_raster=False)
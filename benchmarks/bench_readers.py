@@ -0,0 +1,41 @@
+'''Benchmarks of load_array / load_meta for each file format'''
+from elm.readers import load_array, load_meta, BandSpec
+
+from .common import (make_tif_dir, make_hdf5_file, make_netcdf_file,
+                     remove)
+
+BANDS = 4
+
+class TimeLoadArray(object):
+    params = ['tif', 'hdf5', 'netcdf']
+    param_names = ['reader']
+
+    def setup(self, reader):
+        if reader == 'tif':
+            self.filename = make_tif_dir(bands=BANDS)
+            self.band_specs = [BandSpec('name', '_B{}.TIF'.format(idx + 1),
+                                        'band_{}'.format(idx + 1))
+                               for idx in range(BANDS)]
+        elif reader == 'hdf5':
+            self.filename = make_hdf5_file(bands=BANDS)
+            self.band_specs = None
+        else:
+            self.filename = make_netcdf_file(bands=BANDS)
+            self.band_specs = ['band_{}'.format(idx + 1) for idx in range(BANDS)]
+        self.reader = reader
+        self.meta = load_meta(self.filename, reader=reader,
+                              band_specs=self.band_specs)
+
+    def teardown(self, reader):
+        remove(self.filename)
+
+    def time_load_meta(self, reader):
+        load_meta(self.filename, reader=reader, band_specs=self.band_specs)
+
+    def time_load_array(self, reader):
+        load_array(self.filename, meta=self.meta,
+                   band_specs=self.band_specs, reader=reader)
+
+    def peakmem_load_array(self, reader):
+        load_array(self.filename, meta=self.meta,
+                   band_specs=self.band_specs, reader=reader)
@@ -0,0 +1,43 @@
+'''Benchmarks of elm.readers.reshape functions on synthetic ElmStores'''
+import numpy as np
+
+from elm.readers import (flatten, inverse_flatten, drop_na_rows,
+                         select_canvas)
+from elm.readers.util import xy_canvas
+
+from .common import synthetic_es
+
+
+class TimeReshape(object):
+    params = [100, 1000]
+    param_names = ['size']
+
+    def setup(self, size):
+        self.es = synthetic_es(bands=8, height=size, width=size)
+        self.flat = flatten(self.es)
+        with_na = self.flat.flat.values.copy()
+        with_na[::10, 0] = np.NaN
+        self.flat_na = self.flat.copy(deep=True)
+        self.flat_na.flat.values[:] = with_na
+        band = self.es.band_1
+        canvas = band.canvas
+        geo = list(canvas.geo_transform)
+        geo[1] /= 2.
+        geo[5] /= 2.
+        self.new_canvas = xy_canvas(geo, canvas.buf_xsize * 2,
+                                    canvas.buf_ysize * 2, canvas.dims)
+
+    def time_flatten(self, size):
+        flatten(self.es)
+
+    def time_inverse_flatten(self, size):
+        inverse_flatten(self.flat)
+
+    def time_drop_na_rows(self, size):
+        drop_na_rows(self.flat_na)
+
+    def time_select_canvas(self, size):
+        select_canvas(self.es, self.new_canvas)
+
+    def peakmem_flatten(self, size):
+        flatten(self.es)
@@ -0,0 +1,119 @@
+'''
+Synthetic data helpers for the asv benchmarks in this directory
+
+Files are written locally to temporary directories so that no
+elm-data examples are needed.
+'''
+from multiprocessing.pool import ThreadPool
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from elm.pipeline.tests.util import random_elm_store, GEO
+
+EXECUTORS = ['serial', 'threaded', 'distributed']
+
+# Grid header words recognized by
+# elm.readers.util.grid_header_to_geo_transform
+GRID_HEADER = {'LatitudeResolution': 0.1,
+               'LongitudeResolution': 0.1,
+               'NorthBoundingCoordinate': 50.,
+               'SouthBoundingCoordinate': 30.,
+               'EastBoundingCoordinate': -80.,
+               'WestBoundingCoordinate': -100.,
+               'Registration': 'CENTER',
+               'BinMethod': 'ARITHMETIC MEAN',
+               'Origin': 'NORTHWEST'}
+
+
+def synthetic_es(bands=4, height=200, width=200):
+    '''ElmStore with make_blobs data in each band'''
+    return random_elm_store(bands=bands, height=height, width=width)
+
+
+def make_client(executor):
+    '''Return a client for executor in EXECUTORS or raise
+    NotImplementedError (asv skips the benchmark)'''
+    if executor == 'serial':
+        return None
+    elif executor == 'threaded':
+        return ThreadPool(4)
+    try:
+        from distributed import Executor
+    except ImportError:
+        raise NotImplementedError('distributed is not installed')
+    return Executor()
+
+
+def close_client(client):
+    if client is None:
+        return
+    if isinstance(client, ThreadPool):
+        client.close()
+    else:
+        client.shutdown()
+
+
+def _band_data(bands, height, width):
+    rng = np.random.RandomState(0)
+    return [rng.uniform(0, 1000, (height, width)).astype(np.float32)
+            for _ in range(bands)]
+
+
+def make_tif_dir(bands=4, height=500, width=500):
+    '''Directory of GeoTiffs, one per band, named like *_B1.TIF'''
+    try:
+        import rasterio as rio
+    except ImportError:
+        raise NotImplementedError('rasterio is not installed')
+    tmp = tempfile.mkdtemp()
+    transform = (GEO[1], GEO[2], GEO[0], GEO[4], GEO[5], GEO[3])
+    for idx, data in enumerate(_band_data(bands, height, width)):
+        fname = os.path.join(tmp, 'synthetic_B{}.TIF'.format(idx + 1))
+        with rio.open(fname, 'w', driver='GTiff', height=height,
+                      width=width, count=1, dtype=data.dtype.name,
+                      transform=transform) as dst:
+            dst.write(data, 1)
+    return tmp
+
+
+def make_hdf5_file(bands=4, height=500, width=500):
+    '''HDF5 file with one dataset per band'''
+    try:
+        import h5py
+    except ImportError:
+        raise NotImplementedError('h5py is not installed')
+    tmp = tempfile.mkdtemp()
+    fname = os.path.join(tmp, 'synthetic.h5')
+    with h5py.File(fname, 'w') as f:
+        for k, v in GRID_HEADER.items():
+            f.attrs[k] = v
+        for idx, data in enumerate(_band_data(bands, height, width)):
+            f.create_dataset('band_{}'.format(idx + 1), data=data)
+    return fname
+
+
+def make_netcdf_file(bands=4, height=500, width=500):
+    '''NetCDF file with one variable per band and x, y coords'''
+    try:
+        import netCDF4
+    except ImportError:
+        raise NotImplementedError('netCDF4 is not installed')
+    import xarray as xr
+    tmp = tempfile.mkdtemp()
+    fname = os.path.join(tmp, 'synthetic.nc')
+    coords = [('y', np.linspace(50, 30, height)),
+              ('x', np.linspace(-100, -80, width))]
+    data = {'band_{}'.format(idx + 1): xr.DataArray(d, coords=coords, dims=('y', 'x'))
+            for idx, d in enumerate(_band_data(bands, height, width))}
+    xr.Dataset(data, attrs=GRID_HEADER).to_netcdf(fname)
+    return fname
+
+
+def remove(path):
+    '''Remove a file made above and its temporary directory'''
+    if os.path.isfile(path):
+        path = os.path.dirname(path)
+    shutil.rmtree(path, ignore_errors=True)
@@ -3,6 +3,7 @@ from elm.config.load_config import ConfigParser
 from elm.config.dask_settings import client_context
 from elm.config.env import parse_env_vars
 from elm.config.config_info import *
+from elm.config.dtype_policy import *
 from elm.config.util import (ElmConfigError,
                              import_callable)
 import elm.config.logging_config
@@ -21,6 +21,9 @@ def add_env_vars_override_options(parser):
 def add_config_file_argument(parser):
     '''Add parser arguments related to taking config file or directory'''
     group = parser.add_argument_group('Inputs', 'Input config file or directory')
+    group.add_argument('--max-concurrent-configs', type=int, default=1,
+                       help='With --config-dir, run up to this many configs '
+                            'at once on the dask client (default: 1)')
     group = group.add_mutually_exclusive_group()
     group.add_argument('--config', type=str, help="Path to yaml config")
     group.add_argument('--config-dir', type=str, help='Path to a directory of yaml configs')
@@ -39,8 +42,12 @@ def add_ensemble_kwargs(parser):
                         help='Number of ensemble generations, defaulting to ngen from ensemble_kwargs in config')
 
 def add_run_options(parser):
-    '''Add the --train-only and --predict-only arguments to parser'''
+    '''Add the --train-only, --predict-only and --profile arguments to parser'''
     parser.add_argument_group('Run', 'Run options')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the tasks of each config (cProfile), '
+                             'writing a merged report and task timeline '
+                             'to ELM_TRAIN_PATH/profile')
     group = parser.add_mutually_exclusive_group()
     group.add_argument('--train-only', action='store_true',
                       help='Run only the training, not prediction, actions specified by config')
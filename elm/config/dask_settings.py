@@ -2,10 +2,11 @@
 dask_settings.py is a module of helpers for dask executors
 '''
 import contextlib
-import dask.array as da
+from functools import partial
 import os
+import sys
 
-from concurrent.futures import as_completed
+from concurrent.futures import as_completed, Future
 from multiprocessing.pool import ThreadPool
 from multiprocessing import Pool
 from dask.threaded import get as dask_threaded_get
@@ -13,20 +14,40 @@ from dask.async import get_sync
 
 from dask import delayed as dask_delayed
 from toolz import curry
-try:
-    from distributed import Executor
-    from dask.diagnostics import ProgressBar
-except ImportError:
-    Executor = None
 
 from elm.config.env import parse_env_vars
 
 
+def _import_executor():
+    '''Import distributed's Executor, returning None if not installed
+
+    distributed is slow to import, so it is imported here
+    rather than when elm is imported'''
+    try:
+        from distributed import Executor
+    except ImportError:
+        return None
+    return Executor
+
+
+def _is_distributed_client(client):
+    '''Return True if client is a distributed Executor
+
+    If distributed has not been imported, client cannot be an
+    Executor, so this does not import distributed'''
+    distributed = sys.modules.get('distributed')
+    if client is None or distributed is None:
+        return False
+    Executor = getattr(distributed, 'Executor', None)
+    return Executor is not None and isinstance(client, Executor)
+
+
 def _find_get_func_for_client(client):
     '''Return the "get" function corresponding to client'''
     if client is None:
         return get_sync
-    elif Executor and isinstance(client, Executor):
+    elif _is_distributed_client(client):
+        from dask.diagnostics import ProgressBar
         def get(*args, **kwargs):
             pbar = ProgressBar()
             pbar.register()
@@ -40,6 +61,47 @@ def _find_get_func_for_client(client):
         raise ValueError('client argument not a thread pool dask scheduler or None')
 
 
+def _resolve_futures(args):
+    '''Replace any concurrent.futures.Future in args with its result'''
+    return tuple(a.result() if isinstance(a, Future) else a for a in args)
+
+
+def _submit_serial(func, *args):
+    '''Call func now, returning a completed Future'''
+    fut = Future()
+    try:
+        fut.set_result(func(*_resolve_futures(args)))
+    except Exception as e:
+        fut.set_exception(e)
+    return fut
+
+
+def _submit_thread_pool(pool, func, *args):
+    '''Call func in a ThreadPool, returning a Future'''
+    fut = Future()
+    pool.apply_async(lambda: func(*_resolve_futures(args)),
+                     callback=fut.set_result,
+                     error_callback=fut.set_exception)
+    return fut
+
+
+def _find_submit_func_for_client(client):
+    '''Return a "submit" function corresponding to client
+
+    The submit function has the signature submit(func, *args) and
+    returns a Future with an add_done_callback method.  Futures
+    given in args are resolved before func is called.
+    '''
+    if client is None:
+        return _submit_serial
+    elif _is_distributed_client(client):
+        return partial(client.submit, pure=False)
+    elif isinstance(client, ThreadPool):
+        return partial(_submit_thread_pool, client)
+    else:
+        raise ValueError('client argument not a thread pool dask scheduler or None')
+
+
 @contextlib.contextmanager
 def client_context(dask_client=None, dask_scheduler=None):
     '''client_context creates a dask distributed or threadpool client or None
@@ -54,6 +116,7 @@ def client_context(dask_client=None, dask_scheduler=None):
     dask_client = dask_client or env.get('DASK_CLIENT', 'SERIAL')
     dask_scheduler = dask_scheduler or env.get('DASK_SCHEDULER')
     if dask_client == 'DISTRIBUTED':
+        Executor = _import_executor()
         if Executor is None:
             raise ValueError('distributed is not installed - "conda install distributed"')
         client = Executor(dask_scheduler)
@@ -64,6 +127,7 @@ def client_context(dask_client=None, dask_scheduler=None):
     else:
         raise ValueError('Did not expect DASK_CLIENT to be {}'.format(dask_client))
     get_func = _find_get_func_for_client(client)
+    import dask.array as da
     with da.set_options(pool=dask_client):
        yield client
 
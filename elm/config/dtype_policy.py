@@ -0,0 +1,136 @@
+'''
+----------------------------
+
+``elm.config.dtype_policy``
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+The floating point dtype elm computes in: the dtype of floating
+point rasters from the readers, of the arrays allocated by flatten
+and the other reshaping functions, of band math and of the output
+of Pipeline steps.
+
+The policy is, in order of precedence:
+
+ * Pipeline(..., dtype='float32') while that Pipeline runs
+ * float_dtype_context('float32') in the current thread
+ * set_float_dtype('float32')
+ * the ELM_FLOAT_DTYPE environment variable
+
+With no policy (the default), floating point rasters keep the dtype
+they are read with and the arrays elm allocates are float64.
+With a 'float32' policy, memory use and bandwidth are half that
+of float64.  Integer rasters are read as integers either way and
+become floating point when NaNs are set or they are flattened.
+'''
+from contextlib import contextmanager
+import os
+import threading
+
+import numpy as np
+
+__all__ = ['FLOAT_DTYPES',
+           'check_float_dtype',
+           'get_float_dtype',
+           'set_float_dtype',
+           'float_dtype_context',
+           'as_float_dtype']
+
+FLOAT_DTYPES = ('float32', 'float64')
+
+
+def check_float_dtype(dtype):
+    '''Return dtype as a numpy.dtype, None if dtype is None, or
+    raise ValueError if it is not in FLOAT_DTYPES'''
+    if dtype is None:
+        return None
+    try:
+        dtype = np.dtype(dtype)
+    except TypeError:
+        dtype = None
+    if dtype is None or dtype.name not in FLOAT_DTYPES:
+        raise ValueError('Expected a float dtype among {} or None '
+                         '(got {})'.format(FLOAT_DTYPES, dtype))
+    return dtype
+
+
+_FLOAT_DTYPE = check_float_dtype(os.environ.get('ELM_FLOAT_DTYPE') or None)
+_LOCAL = threading.local()
+
+
+def get_float_dtype(default=None):
+    '''Return the float dtype policy (a numpy.dtype) or default
+    if there is no policy'''
+    dtype = getattr(_LOCAL, 'dtype', None)
+    if dtype is None:
+        dtype = _FLOAT_DTYPE
+    if dtype is None and default is not None:
+        return np.dtype(default)
+    return dtype
+
+
+def set_float_dtype(dtype):
+    '''Set the float dtype policy for all threads
+
+    Parameters:
+        :dtype: 'float32', 'float64' or None for no policy
+    '''
+    global _FLOAT_DTYPE
+    _FLOAT_DTYPE = check_float_dtype(dtype)
+
+
+@contextmanager
+def float_dtype_context(dtype):
+    '''Context manager setting the float dtype policy in this thread
+
+    Parameters:
+        :dtype: 'float32', 'float64' or None to keep the current policy
+    '''
+    dtype = check_float_dtype(dtype)
+    if dtype is None:
+        yield get_float_dtype()
+        return
+    old = getattr(_LOCAL, 'dtype', None)
+    _LOCAL.dtype = dtype
+    try:
+        yield dtype
+    finally:
+        _LOCAL.dtype = old
+
+
+def _cast_to(arr_dtype, dtype, integers):
+    if arr_dtype == dtype:
+        return False
+    if arr_dtype.kind == 'f':
+        return True
+    return integers and arr_dtype.kind in 'biu'
+
+
+def as_float_dtype(values, dtype=None, integers=False):
+    '''Cast floating point values to dtype or the float dtype policy
+
+    Parameters:
+        :values:   numpy array, xarray.DataArray or ElmStore / xarray.Dataset
+                   (casting each of its DataArrays)
+        :dtype:    dtype or None for the float dtype policy
+        :integers: cast integer and bool values as well
+
+    Returns:
+        :values:   values cast, or values unchanged if there is no
+                   policy or they are not floating point
+    '''
+    dtype = get_float_dtype() if dtype is None else np.dtype(dtype)
+    if dtype is None:
+        return values
+    if hasattr(values, 'data_vars'):
+        to_cast = [name for name, arr in values.data_vars.items()
+                   if _cast_to(arr.dtype, dtype, integers)]
+        if not to_cast:
+            return values
+        new = values.copy(deep=False)
+        for name in to_cast:
+            new[name] = values[name].astype(dtype)
+        return new
+    arr_dtype = getattr(values, 'dtype', None)
+    if arr_dtype is None or not _cast_to(arr_dtype, dtype, integers):
+        return values
+    return values.astype(dtype)
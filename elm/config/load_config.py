@@ -11,8 +11,6 @@ import traceback
 
 import attr
 import numpy as np
-import sklearn.feature_selection as skfeat
-import sklearn.preprocessing as skpre
 import yaml
 
 
@@ -299,6 +297,7 @@ class ConfigParser(object):
         if not feature_selection:
             return True
         self._validate_type(feature_selection, 'feature_selection', dict)
+        import sklearn.feature_selection as skfeat
         for k, s in feature_selection.items():
             self._validate_type(k, 'feature_selection:{}'.format(k), str)
             self._validate_type(s, 'feature_selection:{}'.format(s), dict)
@@ -431,6 +430,7 @@ class ConfigParser(object):
         '''Validate "sklearn_preprocessing" dict in config'''
         self.sklearn_preprocessing = self.config.get('sklearn_preprocessing') or {}
         self._validate_type(self.sklearn_preprocessing, 'sklearn_preprocessing', dict)
+        import sklearn.preprocessing as skpre
         for k, v in self.sklearn_preprocessing.items():
             self._validate_type(v, 'sklearn_preprocessing:{}'.format(k), dict)
             if v.get('method') in dir(skpre) or callable(v.get('method')):
@@ -451,7 +451,13 @@ class ConfigParser(object):
         for f in ('saved_ensemble_size', 'ngen',
                   'init_ensemble_size', 'partial_fit_batches'):
             for k in self.ensembles:
-                self._validate_positive_int(self.ensembles[k].get(f), f)
+                val = self.ensembles[k].get(f)
+                if f == 'partial_fit_batches' and isinstance(val, (list, tuple)):
+                    # one int per generation, e.g. successive halving
+                    for v in val:
+                        self._validate_positive_int(v, f)
+                else:
+                    self._validate_positive_int(val, f)
 
     def _validate_model_selection(self):
         '''Validate "model_selection" section of config'''
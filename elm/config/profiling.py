@@ -0,0 +1,182 @@
+'''
+----------------------
+
+``elm.config.profiling``
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Profiling of elm tasks for ``elm-main --profile``.
+
+Functions decorated with profile_task (sample loading, fit,
+score, predict and serialize) are run under cProfile when
+a profile_dir has been set by profile_context, and each call is
+added to a timeline.  On exiting profile_context, the per-task
+profiles are merged into one report for the config:
+
+ * profile.prof: merged cProfile stats (pstats / snakeviz format)
+ * profile.txt:  merged stats sorted by cumulative time
+ * timeline.csv: start / end of each task with host, pid and thread
+
+With a dask-distributed client the profile_dir is also set on each
+worker, so profile_dir should be on a filesystem the workers share
+(as ELM_TRAIN_PATH is for serialize_pipe).
+'''
+import contextlib
+import cProfile
+import csv
+from functools import wraps
+import glob
+import itertools
+import json
+import logging
+import os
+import pstats
+import socket
+import threading
+import time
+
+from elm.config.dask_settings import _is_distributed_client
+
+__all__ = ['profile_task', 'profile_context', 'merge_profiles']
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_COLUMNS = ['kind', 'func', 'start', 'end', 'elapsed',
+                    'host', 'pid', 'thread']
+
+PROFILE_DIR = None
+
+_local = threading.local()
+_lock = threading.Lock()
+_task_idx = itertools.count()
+
+
+def set_profile_dir(profile_dir):
+    '''Set (or unset with None) the directory of task profiles in
+    this process.  Called on each worker by profile_context'''
+    global PROFILE_DIR
+    PROFILE_DIR = profile_dir
+
+
+def _record_task(profile_dir, kind, func, start, end, prof):
+    host, pid = socket.gethostname(), os.getpid()
+    event = {'kind': kind,
+             'func': '{}.{}'.format(func.__module__, func.__name__),
+             'start': start, 'end': end, 'elapsed': end - start,
+             'host': host, 'pid': pid,
+             'thread': threading.current_thread().name}
+    base = '{}-{}'.format(host, pid)
+    with _lock:
+        with open(os.path.join(profile_dir, 'timeline-{}.jsonl'.format(base)), 'a') as f:
+            f.write(json.dumps(event) + '\n')
+        if prof is not None:
+            fname = '{}-{}-{}.prof'.format(kind, base, next(_task_idx))
+            prof.dump_stats(os.path.join(profile_dir, 'tasks', fname))
+
+
+def profile_task(kind):
+    '''Decorator that profiles a function call as a task of kind
+    ("sample", "fit", "score", "predict", "serialize") if a
+    profile_dir has been set, otherwise just calls the function.
+
+    Calls nested in another profiled task (e.g. score within fit)
+    are added to the timeline but not profiled separately.
+    '''
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profile_dir = PROFILE_DIR
+            if profile_dir is None:
+                return func(*args, **kwargs)
+            outer = not getattr(_local, 'active', False)
+            prof = None
+            if outer:
+                _local.active = True
+                prof = cProfile.Profile()
+                try:
+                    prof.enable()
+                except ValueError:
+                    # Another profiler is active in this process
+                    prof = None
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end = time.time()
+                if outer:
+                    if prof is not None:
+                        prof.disable()
+                    _local.active = False
+                _record_task(profile_dir, kind, func, start, end, prof)
+        return wrapper
+    return decorator
+
+
+def merge_profiles(profile_dir, top_n=50):
+    '''Merge the task profiles and timelines in profile_dir into
+    profile.prof, profile.txt and timeline.csv, removing the per-task
+    files
+
+    Parameters:
+        :profile_dir: directory given to profile_context
+        :top_n:       number of functions in profile.txt
+
+    Returns:
+        :events: list of timeline dicts sorted by start time
+    '''
+    prof_files = sorted(glob.glob(os.path.join(profile_dir, 'tasks', '*.prof')))
+    if prof_files:
+        stats = pstats.Stats(prof_files[0])
+        for fname in prof_files[1:]:
+            stats.add(fname)
+        stats.dump_stats(os.path.join(profile_dir, 'profile.prof'))
+        with open(os.path.join(profile_dir, 'profile.txt'), 'w') as f:
+            f.write('Merged {} task profiles\n'.format(len(prof_files)))
+            stats.files = []
+            stats.stream = f
+            stats.sort_stats('cumulative').print_stats(top_n)
+    events = []
+    timeline_files = glob.glob(os.path.join(profile_dir, 'timeline-*.jsonl'))
+    for fname in timeline_files:
+        with open(fname) as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    events.sort(key=lambda event: event['start'])
+    with open(os.path.join(profile_dir, 'timeline.csv'), 'w') as f:
+        writer = csv.DictWriter(f, TIMELINE_COLUMNS)
+        writer.writeheader()
+        writer.writerows(events)
+    for fname in prof_files + timeline_files:
+        os.remove(fname)
+    totals = {}
+    for event in events:
+        totals[event['kind']] = totals.get(event['kind'], 0) + event['elapsed']
+    logger.info('Profile in {} - task seconds by kind: {}'.format(profile_dir, totals))
+    return events
+
+
+@contextlib.contextmanager
+def profile_context(profile_dir, client=None):
+    '''Profile the tasks run within this context, writing the
+    merged report and timeline to profile_dir on exit
+
+    Parameters:
+        :profile_dir: directory for profile.prof, profile.txt and
+                      timeline.csv, e.g. under ELM_TRAIN_PATH
+        :client:      dask client or None.  With a distributed
+                      client, profiling is also enabled on workers
+    '''
+    os.makedirs(os.path.join(profile_dir, 'tasks'), exist_ok=True)
+    distributed = _is_distributed_client(client)
+    set_profile_dir(profile_dir)
+    if distributed:
+        client.run(set_profile_dir, profile_dir)
+    start = time.time()
+    try:
+        yield profile_dir
+    finally:
+        set_profile_dir(None)
+        if distributed:
+            client.run(set_profile_dir, None)
+        _record_task(profile_dir, 'config', profile_context, start,
+                     time.time(), None)
+        merge_profiles(profile_dir)
+        os.rmdir(os.path.join(profile_dir, 'tasks'))
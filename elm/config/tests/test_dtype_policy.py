@@ -0,0 +1,98 @@
+import threading
+
+import numpy as np
+import pytest
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import PCA
+
+from elm.config.dtype_policy import (as_float_dtype, float_dtype_context,
+                                     get_float_dtype, set_float_dtype)
+from elm.pipeline import Pipeline, steps
+from elm.pipeline.tests.util import random_elm_store
+from elm.readers import drop_na_rows, filled_flattened, flatten, set_na_from_meta
+from elm.sample_util.bands_operation import NormedBandsDiff
+
+
+def test_policy():
+    assert get_float_dtype() is None
+    assert get_float_dtype(np.float64) == np.float64
+    with float_dtype_context('float32'):
+        assert get_float_dtype(np.float64) == np.float32
+        # the policy is per thread
+        other = []
+        t = threading.Thread(target=lambda: other.append(get_float_dtype()))
+        t.start()
+        t.join()
+        assert other == [None]
+        with float_dtype_context(None):
+            assert get_float_dtype() == np.float32
+    assert get_float_dtype() is None
+    set_float_dtype('float32')
+    try:
+        assert get_float_dtype() == np.float32
+        with float_dtype_context('float64'):
+            assert get_float_dtype() == np.float64
+    finally:
+        set_float_dtype(None)
+    for bad in ('int16', 'not_a_dtype'):
+        with pytest.raises(ValueError):
+            set_float_dtype(bad)
+        with pytest.raises(ValueError):
+            Pipeline([MiniBatchKMeans()], dtype=bad)
+
+
+def test_as_float_dtype():
+    arr = np.ones(3)
+    assert as_float_dtype(arr) is arr
+    ints = np.arange(3)
+    with float_dtype_context('float32'):
+        assert as_float_dtype(arr).dtype == np.float32
+        assert as_float_dtype(ints) is ints
+        assert as_float_dtype(ints, integers=True).dtype == np.float32
+        X = random_elm_store(bands=2, height=4, width=5)
+        X32 = as_float_dtype(X)
+    assert X.band_1.dtype == np.float64
+    assert X32.band_1.dtype == X32.band_2.dtype == np.float32
+    assert X32.band_order == X.band_order
+    assert X32.band_1.canvas == X.band_1.canvas
+
+
+def test_reshape_and_na_float32():
+    X = random_elm_store(bands=2, height=4, width=5)
+    X.band_1.attrs['missing_value'] = 0
+    X.band_1.values[:2, :] = 0
+    X['band_2'] = X.band_2.astype(np.int16)
+    assert flatten(X).flat.dtype == np.float64
+    with float_dtype_context('float32'):
+        set_na_from_meta(X)
+        assert X.band_1.dtype == X.band_2.dtype == np.float32
+        assert np.isnan(X.band_1.values[:2]).all()
+        flat = flatten(X)
+        assert flat.flat.dtype == np.float32
+        dropped = drop_na_rows(flat)
+        assert dropped.flat.shape[0] == 10
+        filled = filled_flattened(dropped)
+        assert filled.flat.dtype == np.float32
+        assert np.isnan(filled.flat.values).any(axis=1).sum() == 10
+        Xnew, _, _ = NormedBandsDiff(spec={'nd': ('band_1', 'band_2')}).fit_transform(X)
+        assert Xnew.nd.dtype == np.float32
+
+
+def test_pipeline_float32():
+    X = random_elm_store(bands=3, height=20, width=30)
+    def pipe(dtype):
+        return Pipeline([steps.Flatten(),
+                         steps.Transform(PCA(n_components=2)),
+                         steps.StandardScaler(),
+                         MiniBatchKMeans(n_clusters=3, random_state=0)],
+                        dtype=dtype)
+    pipe32 = pipe('float32').fit(X)
+    Xt, _, _ = pipe32.steps[1][1].transform(pipe32.steps[0][1].fit_transform(X)[0])
+    # dtype policy applies only while the Pipeline runs
+    assert Xt.flat.dtype == np.float64
+    assert pipe32.unfitted_copy().dtype == 'float32'
+    pred, Xt = pipe32.predict(X, return_X=True)
+    assert Xt.flat.dtype == np.float32
+    pred64 = pipe(None).fit(X).predict(X)
+    assert pred.shape == pred64.shape == (600,)
+    assert len(np.unique(pred)) == 3
@@ -0,0 +1,49 @@
+from multiprocessing.pool import ThreadPool
+import csv
+import os
+import pstats
+
+from sklearn.cluster import MiniBatchKMeans
+import pytest
+
+from elm.config.profiling import profile_context
+from elm.model_selection.kmeans import kmeans_aic
+from elm.pipeline import Pipeline, steps
+from elm.pipeline.tests.util import random_elm_store
+
+
+def sampler(*args, **kwargs):
+    return random_elm_store(bands=3, height=20, width=30)
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_profile_context(tmpdir, threaded):
+    profile_dir = os.path.join(str(tmpdir), 'profile', 'config')
+    pipe = Pipeline([steps.Flatten(), MiniBatchKMeans(n_clusters=3)],
+                    scoring=kmeans_aic,
+                    scoring_kwargs={'score_weights': [-1]})
+    client = ThreadPool(2) if threaded else None
+    try:
+        with profile_context(profile_dir, client=client):
+            pipe.fit_ensemble(sampler=sampler, args_list=[()] * 2, ngen=2,
+                              init_ensemble_size=2, client=client)
+            pipe.predict_many(sampler=sampler, args_list=[()], client=client)
+    finally:
+        if client is not None:
+            client.close()
+    assert sorted(os.listdir(profile_dir)) == ['profile.prof', 'profile.txt',
+                                               'timeline.csv']
+    with open(os.path.join(profile_dir, 'timeline.csv')) as f:
+        events = list(csv.DictReader(f))
+    kinds = [event['kind'] for event in events]
+    # 2 generations x 2 members
+    assert kinds.count('fit') == 4
+    assert kinds.count('score') == 4
+    assert kinds.count('predict') == 2
+    assert kinds.count('sample') == 3
+    assert kinds[0] == 'config'
+    stats = pstats.Stats(os.path.join(profile_dir, 'profile.prof'))
+    assert any(func[2] == '_run_steps' for func in stats.stats)
+    # profiling is off after the context
+    pipe.fit_ensemble(sampler=sampler, args_list=[()], ngen=1)
+    assert len(os.listdir(profile_dir)) == 3
@@ -1,5 +1,4 @@
 
-from pkg_resources import resource_stream, Requirement, resource_filename
 import json
 import os
 import traceback
@@ -8,6 +7,9 @@ import yaml
 
 EXAMPLE_CALLABLE = 'numpy:median'
 
+# "module:callable" strings imported in this process by import_callable
+_IMPORTED_CALLABLES = {}
+
 def read_from_egg(tfile):
     '''Read a relative path, getting the contents
     locally or from the installed egg, parsing the contents
@@ -19,6 +21,7 @@ def read_from_egg(tfile):
     '''
     template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), tfile)
     if not os.path.exists(template_path):
+        from pkg_resources import Requirement, resource_filename
         template_path = resource_filename(Requirement.parse("elm"), os.path.join('elm', os.path.basename(tfile)))
     with open(template_path, 'r') as f:
         contents = f.read()
@@ -42,9 +45,16 @@ def import_callable(func_or_not, required=True, context=''):
     Raises:
         ElmConfigError if not importable / callable and
         required=True (default)
+
+    Successful imports are cached by the "module:callable" string,
+    so later calls with the same string are a dict lookup
     '''
     if callable(func_or_not):
         return func_or_not
+    if isinstance(func_or_not, str):
+        func = _IMPORTED_CALLABLES.get(func_or_not)
+        if func is not None:
+            return func
     context = context + ' -  e' if context else 'E'
     if func_or_not and (not isinstance(func_or_not, str) or func_or_not.count(':') != 1):
         raise ElmConfigError('{}xpected {} to be an module:callable '
@@ -66,4 +76,5 @@ def import_callable(func_or_not, required=True, context=''):
         raise ElmConfigError('{}xpected {} to be callable - '
                                'module was imported but attribute not found or is not '
                                'callable'.format(context, func_or_not))
+    _IMPORTED_CALLABLES[func_or_not] = func
     return func
@@ -566,7 +566,7 @@ def eval_stop_wrapper(evo_params, original_fitness):
                              'len()'.format(evo_params.score_weights,
                                             typ, value, original_fitness))
     eval_stop = partial(func,
-                        early_stop.get('agg', all),
+                        (early_stop or {}).get('agg', all),
                         evo_params.score_weights,
                         value,
                         original_fitness)
@@ -659,3 +659,113 @@ def ea_general(evo_params, cxpb, mutpb, ngen, k):
     # based on the None in 2nd position below
     logger.info('Evolutionary algorithm finished')
     yield (pop, None, param_history)
+
+
+def _tournament_dcd(ind1, ind2):
+    '''Binary tournament on Pareto dominance then crowding distance
+    (as in deap.tools.selTournamentDCD but for a single pair)'''
+    if ind1.fitness.dominates(ind2.fitness):
+        return ind1
+    elif ind2.fitness.dominates(ind1.fitness):
+        return ind2
+    cd1 = getattr(ind1.fitness, 'crowding_dist', 0.)
+    cd2 = getattr(ind2.fitness, 'crowding_dist', 0.)
+    if cd1 < cd2:
+        return ind2
+    elif cd1 > cd2:
+        return ind1
+    return random.choice((ind1, ind2))
+
+
+def _steady_state_offspring(toolbox, pop, cxpb, mutpb):
+    '''Return two new unevaluated offspring of the evaluated pop'''
+    def pick():
+        if len(pop) < 2:
+            return pop[0]
+        return _tournament_dcd(*random.sample(pop, 2))
+    ind1, ind2 = (toolbox.clone(pick()) for _ in range(2))
+    if random.random() <= cxpb:
+        ind1, ind2 = toolbox.mate(ind1, ind2)
+    if random.random() < mutpb:
+        toolbox.mutate(ind1)
+    if random.random() < mutpb:
+        toolbox.mutate(ind2)
+    del ind1.fitness.values, ind2.fitness.values
+    return [ind1, ind2]
+
+
+def ea_steady_state(evo_params, cxpb, mutpb, ngen, k):
+    '''Asynchronous steady-state variant of ea_general
+
+    Rather than waiting on a whole generation, the caller sends a
+    list of (individual, fitness) tuples for each fit that has
+    completed, in any order, and receives one new individual to
+    evaluate per completed fit.  Each result is folded into the
+    population with a (mu + 1) NSGA-2 style replacement using
+    toolbox.select.  At most ngen * mu individuals are evaluated.
+
+    Parameters:
+        :evo_params: EvoParams instance
+        :cxpb:    crossover prob (float 0 < cxpb < 1)
+        :mutpb:   mutation prob (float 0 < cxpb < 1)
+        :ngen:    number of generations' worth of evaluations (int)
+        :k:       number to select (not used, see ea_general)
+
+    Yields:
+        :(pop, new_ind, param_history): new_ind is a list of
+            individuals to evaluate next or None when finished
+    '''
+    toolbox = evo_params.toolbox
+    deap_params = evo_params.deap_params
+    param_history = []
+    new_ind = evo_init_func(evo_params)
+    assign_names(new_ind)
+    mu = len(new_ind)
+    max_evals = ngen * mu
+    initial_names = set(ind.name for ind in new_ind)
+    submitted, evaluated = mu, 0
+    pop, spare = [], []
+    eval_stop = None
+    can_breed = True
+    while True:
+        done = (yield (pop, new_ind, param_history))
+        if not isinstance(done, list) or not all(isinstance(d, tuple) and len(d) == 2 for d in done):
+            raise ValueError('Expected .send to be called with a list of (individual, fitness) tuples')
+        new_ind = []
+        for ind, fitness in done:
+            assign_check_fitness([ind], [fitness],
+                                 param_history, deap_params['choices'],
+                                 evo_params.score_weights)
+            evaluated += 1
+            # (mu + 1) replacement - also assigns crowding distance
+            pop = toolbox.select(pop + [ind], min(len(pop) + 1, mu))
+            if ind.name in initial_names:
+                initial_names.remove(ind.name)
+                if not initial_names:
+                    # Find the best in original population for
+                    # comparison on stop conditions
+                    temp_pop = copy.deepcopy(pop)
+                    original_fitness = toolbox.select(temp_pop, 1)[0].fitness.values
+                    del temp_pop
+                    eval_stop = eval_stop_wrapper(evo_params, original_fitness)
+            elif eval_stop is not None and eval_stop(ind.fitness.values):
+                logger.info('Stopping: early_stop: {}'.format(evo_params.early_stop))
+                logger.info('Evolutionary algorithm finished')
+                yield (pop, None, param_history)
+                return
+        while can_breed and len(new_ind) < len(done) and submitted < max_evals:
+            if not spare:
+                try:
+                    spare = _steady_state_offspring(toolbox, pop, cxpb, mutpb)
+                except ParamsSamplingError:
+                    logger.info('Evolutionary algorithm exited early (cannot find parameter set that has not been tried yet)')
+                    can_breed = False
+                    break
+            child = spare.pop()
+            assign_names([child])
+            new_ind.append(child)
+            submitted += 1
+        if not new_ind and evaluated >= submitted:
+            break
+    logger.info('Evolutionary algorithm finished')
+    yield (pop, None, param_history)
@@ -6,16 +6,16 @@
 '''
 
 import array
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 import copy
 import inspect
 from itertools import product
+from multiprocessing.pool import ThreadPool
 
 from deap import creator, base, tools
 from deap.tools.emo import selNSGA2
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans, MiniBatchKMeans
 from elm.model_selection.util import (get_args_kwargs_defaults,
                                       filter_kwargs_to_func)
 
@@ -43,7 +43,7 @@ def kmeans_aic(model, X, **kwargs):
 name_idx = 0
 def _next_name():
     global name_idx
-    n = 'kmeans-init-'.format(name_idx)
+    n = 'kmeans-init-{}'.format(name_idx)
     name_idx += 1
     return n
 
@@ -99,49 +99,62 @@ def kmeans_model_averaging(models, best_idxes=None, **kwargs):
         dropped = models[-drop_n:]
         models = models[:-drop_n]
 
-    name_idx = 0
-    new_models = []
+    if not evolve_n or not models:
+        return tuple(models)
+    # Group model indices by centroids shape once, keeping rank order,
+    # to avoid averaging models that have a different input
+    # feature column dimension shape, such as Pipelines
+    # with PCA before K-Means
+    shapes = [m._estimator.cluster_centers_.shape for _, m in models]
+    groups = OrderedDict()
+    for idx, shp in enumerate(shapes):
+        groups.setdefault(shp, []).append(idx)
+    # Choose a centroids shape for each new model from linear prob density
+    shape_draws = np.random.choice(len(models), size=evolve_n,
+                                   p=_linear_probs(len(models)))
+    tasks = []
+    for shp, idxes in groups.items():
+        n_new = int(np.sum([shapes[idx] == shp for idx in shape_draws]))
+        if not n_new:
+            continue
+        # Bootstrap reps models for every new model in one call
+        resampling = np.random.choice(idxes, size=(n_new, reps),
+                                      p=_linear_probs(len(idxes)))
+        centers = {idx: models[idx][1]._estimator.cluster_centers_
+                   for idx in np.unique(resampling)}
+        tasks.append((models, resampling, centers))
+    if len(tasks) > 1:
+        pool = ThreadPool(len(tasks))
+        try:
+            new_models = pool.map(_meta_cluster_one_shape, tasks)
+        finally:
+            pool.close()
+    else:
+        new_models = list(map(_meta_cluster_one_shape, tasks))
+    new_models = [(_next_name(), new_model)
+                  for group in new_models for new_model in group]
+    return tuple(new_models) + tuple(models)
+
+
+def _linear_probs(n):
+    '''Linear probability density preferring the first of n items'''
+    probs = np.linspace(n + 1, 1, n)
+    return probs / probs.sum()
 
-    def get_shape():
-        '''Get a random centroids shape from linear prob density'''
-        probs = np.linspace(len(models) + 1, 1, len(models))
-        probs /= probs.sum()
-        idx = np.random.choice(np.arange(len(models)), p=probs)
-        _, m = models[idx]
-        return m._estimator.cluster_centers_.shape
-
-    def get_best(shp):
-        '''Get the best of a given shape of centroids
-
-        The logic in these two functions is intended to avoid
-        selecting a model that has a different input
-        feature column dimension shape, such as Pipelines
-        with PCA before K-Means
-        '''
-        choices = [(tag, model) for tag, model in models
-                   if model._estimator.cluster_centers_.shape == shp]
-        assert choices, repr(models)
-        probs = np.linspace(len(choices) + 1, 1, len(choices))
-        probs /= probs.sum()
-
-        best_idx = np.random.choice(np.arange(len(choices)), p=probs)
-        best_tag, best = choices[best_idx]
-        if best._estimator.cluster_centers_.shape != shp:
-            return get_best(shp, simple=simple)
-        return best
-
-    for idx in range(evolve_n):
-        shp = get_shape()
-        resampling = [get_best(shp) for _ in range(reps)]
-        centroids = np.concatenate(tuple(m._estimator.cluster_centers_ for m in resampling))
-        meta_model = resampling[0]
+
+def _meta_cluster_one_shape(args):
+    '''Meta-clustering of bootstrapped centroids for all new models
+    with one centroids shape (see kmeans_model_averaging)'''
+    from sklearn.cluster import MiniBatchKMeans
+    models, resampling, centers = args
+    new_models = []
+    for draws in resampling:
+        centroids = np.concatenate([centers[idx] for idx in draws])
+        meta_model = copy.deepcopy(models[draws[0]][1])
         new_params = meta_model._estimator.get_params()
         est = MiniBatchKMeans(**new_params)
         est.partial_fit(centroids)
-        new_params.update({'init': est.cluster_centers_,
-                          'n_init': 1})
         meta_model.steps[-1] = (meta_model.steps[-1][0], est)
         meta_model._estimator = est
-        new_model = (_next_name(), meta_model)
-        new_models.append(new_model)
-    return tuple(new_models) + tuple(models)
+        new_models.append(meta_model)
+    return new_models
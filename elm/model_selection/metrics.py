@@ -1,16 +1,17 @@
 
-import sklearn.metrics as sk_metrics
+# Metrics are "module:callable" strings imported by
+# elm.model_selection.scoring.import_scorer when used
 
 #Classification
 suffixes = ('_weighted', '_samples', '_micro', '_macro')
 CLASSIFIER_METRICS = {
-    'accuracy_score':  sk_metrics.accuracy_score,
-    'average_precision': sk_metrics.average_precision_score,
-    'f1':    sk_metrics.f1_score, #    for binary targets
-    'log_loss':  sk_metrics.log_loss, #    requires predict_proba support
-    'precision': sk_metrics.precision_score,
-    'recall': sk_metrics.recall_score,
-    'roc_auc':   sk_metrics.roc_auc_score,
+    'accuracy_score':  'sklearn.metrics:accuracy_score',
+    'average_precision': 'sklearn.metrics:average_precision_score',
+    'f1':    'sklearn.metrics:f1_score', #    for binary targets
+    'log_loss':  'sklearn.metrics:log_loss', #    requires predict_proba support
+    'precision': 'sklearn.metrics:precision_score',
+    'recall': 'sklearn.metrics:recall_score',
+    'roc_auc':   'sklearn.metrics:roc_auc_score',
 }
 CLASSIFIER_METRICS.update({'f1' + suf: CLASSIFIER_METRICS['f1']
                            for suf in suffixes})
@@ -20,14 +21,14 @@ CLASSIFIER_METRICS.update({'recall' + suf: CLASSIFIER_METRICS['recall']
                            for suf in suffixes})
 #Clustering
 CLUSTERING_METRICS = {
-   'adjusted_rand_score': sk_metrics.adjusted_rand_score,
+   'adjusted_rand_score': 'sklearn.metrics:adjusted_rand_score',
 }
 #Regression
 REGRESSION_METRICS = {
-    'mean_absolute_error':   sk_metrics.mean_absolute_error,
-    'mean_squared_error':    sk_metrics.mean_squared_error,
-    'median_absolute_error': sk_metrics.median_absolute_error,
-    'r2':                    sk_metrics.r2_score,
+    'mean_absolute_error':   'sklearn.metrics:mean_absolute_error',
+    'mean_squared_error':    'sklearn.metrics:mean_squared_error',
+    'median_absolute_error': 'sklearn.metrics:median_absolute_error',
+    'r2':                    'sklearn.metrics:r2_score',
 }
 
 METRICS = {}
@@ -12,8 +12,8 @@ that can be used for sorted members of an ensemble
 
 import copy
 
-import sklearn.metrics as sk_metrics
 
+from elm.config.profiling import profile_task
 from elm.config.util import  import_callable
 from elm.model_selection.util import filter_kwargs_to_func
 from elm.model_selection.metrics import METRICS
@@ -34,6 +34,7 @@ def import_scorer(scoring):
 
 
 def make_scorer(scoring, **scoring_kwargs):
+    import sklearn.metrics as sk_metrics
     func_kwargs = filter_kwargs_to_func(scoring, **scoring_kwargs)
     score_weights = scoring_kwargs.get('score_weights')
     gb = scoring_kwargs.get('greater_is_better')
@@ -56,6 +57,7 @@ def _score_one_model_with_y_true(model,
                                 y_true,
                                 sample_weight=None,
                                 **kwargs):
+    import sklearn.metrics as sk_metrics
     if scoring is None:
         kw = copy.deepcopy(kwargs)
         kw['sample_weight'] = sample_weight
@@ -88,6 +90,7 @@ def _score_one_model_no_y_true(model,
 
 
 
+@profile_task('score')
 def score_one_model(model,
                     scoring,
                     X,
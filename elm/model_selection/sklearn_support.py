@@ -1,5 +1,66 @@
+'''
+----------------------------
+
+``elm.model_selection.sklearn_support``
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Registries of the sklearn estimators elm supports.
+
+The *_STR constants are "module:callable" strings.  The *_DICT
+and other registries derived from them import the estimators on
+first use, not when elm is imported, because importing all of
+sklearn is slow.
+'''
+from collections import Mapping, Sequence
+import threading
+
 from elm.config.util import import_callable
 from elm.model_selection.util import get_args_kwargs_defaults
+
+
+class _LazyRegistry(object):
+    '''Base for a registry built by calling make() on first use'''
+    def __init__(self, make):
+        self._make = make
+        self._value = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._make()
+        return self._value
+
+    def __repr__(self):
+        return repr(self._load())
+
+
+class _LazyDict(_LazyRegistry, Mapping):
+    '''Read-only dict built on first use'''
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+
+class _LazyList(_LazyRegistry, Sequence):
+    '''Read-only list built on first use'''
+    def __getitem__(self, idx):
+        return self._load()[idx]
+
+    def __len__(self):
+        return len(self._load())
+
+
+def _import_callables(strs):
+    return _LazyDict(lambda: {k: import_callable(k) for k in strs})
+
+
 PARTIAL_FIT_MODEL_STR = (
     'sklearn.naive_bayes:MultinomialNB',
     'sklearn.naive_bayes:BernoulliNB',
@@ -13,8 +74,7 @@ PARTIAL_FIT_MODEL_STR = (
     'sklearn.neural_network:BernoulliRBM'
 )
 
-PARTIAL_FIT_MODEL_DICT = {k: import_callable(k)
-                          for k in PARTIAL_FIT_MODEL_STR}
+PARTIAL_FIT_MODEL_DICT = _import_callables(PARTIAL_FIT_MODEL_STR)
 
 FIT_PREDICT_MODELS_STR = ['sklearn.tree:DecisionTreeClassifier',
                       'sklearn.tree:DecisionTreeRegressor',
@@ -68,7 +128,7 @@ FIT_TRANSFORM_MODELS_STR = ('sklearn.cluster:SpectralClustering',
                             )
 MODELS_WITH_PREDICT_STR = LINEAR_MODELS_WITH_PREDICT_STR + FIT_TRANSFORM_MODELS_STR + \
                  PARTIAL_FIT_MODEL_STR
-MODELS_WITH_PREDICT_DICT = {k: import_callable(k) for k in MODELS_WITH_PREDICT_STR}
+MODELS_WITH_PREDICT_DICT = _import_callables(MODELS_WITH_PREDICT_STR)
 
 #
 DECOMP_PARTIAL_FIT_MODEL_STR = (
@@ -88,13 +148,13 @@ DECOMP_MODEL_STR = (
     'sklearn.decomposition:DictionaryLearning',
     'sklearn.decomposition:LatentDirichletAllocation',
 ) + DECOMP_PARTIAL_FIT_MODEL_STR
-UNSUPERVISED_MODEL_STR = [k for k, v in MODELS_WITH_PREDICT_DICT.items()
-                          if hasattr(v, 'fit')
-                          and 'y' in get_args_kwargs_defaults(v.fit)[1]]
+UNSUPERVISED_MODEL_STR = _LazyList(lambda: [k for k, v in MODELS_WITH_PREDICT_DICT.items()
+                                             if hasattr(v, 'fit')
+                                             and 'y' in get_args_kwargs_defaults(v.fit)[1]])
 
 
-MODELS_WITH_PREDICT_ESTIMATOR_TYPES = {k: getattr(v, '_estimator_type', None)
-                              for k,v in MODELS_WITH_PREDICT_DICT.items()}
+MODELS_WITH_PREDICT_ESTIMATOR_TYPES = _LazyDict(lambda: {k: getattr(v, '_estimator_type', None)
+                                                         for k,v in MODELS_WITH_PREDICT_DICT.items()})
 
 
 
@@ -10,10 +10,87 @@ import array
 
 from deap import creator, base, tools
 from deap.tools.emo import selNSGA2
+import numpy as np
+
+
+def _dominates(wvalues):
+    '''Boolean matrix where [i, j] is True if row i of weighted
+    objectives wvalues Pareto dominates row j (maximization)'''
+    a, b = wvalues[:, None, :], wvalues[None, :, :]
+    return (a >= b).all(axis=2) & (a > b).any(axis=2)
+
+
+def _non_dominated_fronts(wvalues, k):
+    '''Fast non-dominated sort of the first k rows of weighted
+    objectives wvalues (as deap.tools.sortNondominated)
+
+    Returns:
+        :fronts: list of int arrays of row indices, best front first
+    '''
+    n = wvalues.shape[0]
+    if not n or not k:
+        return []
+    # Identical rows are sorted together, in order of first appearance
+    _, first, inverse = np.unique(wvalues, axis=0, return_index=True,
+                                  return_inverse=True)
+    appearance = np.argsort(first, kind='mergesort')
+    fit_rank = np.empty_like(appearance)
+    fit_rank[appearance] = np.arange(appearance.size)
+    fit_of_row = fit_rank[inverse.ravel()]
+    row_order = np.argsort(fit_of_row, kind='mergesort')
+    bounds = np.searchsorted(fit_of_row[row_order], np.arange(appearance.size + 1))
+    members = lambda fits: np.concatenate([row_order[bounds[f]:bounds[f + 1]]
+                                           for f in fits])
+    dom = _dominates(wvalues[first[appearance]])
+    remaining = dom.sum(axis=0)
+    current = np.flatnonzero(remaining == 0)
+    fronts = [members(current)]
+    pareto_sorted = fronts[-1].size
+    while pareto_sorted < min(n, k):
+        sub = dom[current]
+        remaining = remaining - sub.sum(axis=0)
+        candidates = np.flatnonzero((remaining == 0) & sub.any(axis=0))
+        # Order as deap: by the position of the last dominating
+        # fit in the current front, then by order of appearance
+        last = sub.shape[0] - 1 - np.argmax(sub[::-1][:, candidates], axis=0)
+        current = candidates[np.lexsort((candidates, last))]
+        fronts.append(members(current))
+        pareto_sorted += fronts[-1].size
+    return fronts
+
+
+def _crowding_distance(objectives):
+    '''Crowding distance of each row of objectives in one Pareto front
+    (as deap.tools.assignCrowdingDist)
+
+    Parameters:
+        :objectives: 2-D array of objective scores (unweighted)
+
+    Returns:
+        :distances: 1-D float array
+    '''
+    n, nobj = objectives.shape
+    distances = np.zeros(n)
+    order = np.arange(n)
+    for i in range(nobj):
+        order = order[np.argsort(objectives[order, i], kind='mergesort')]
+        vals = objectives[order, i]
+        distances[order[[0, -1]]] = np.inf
+        if vals[-1] == vals[0]:
+            continue
+        norm = nobj * float(vals[-1] - vals[0])
+        distances[order[1:-1]] += (vals[2:] - vals[:-2]) / norm
+    return distances
+
+
 
 def pareto_front(weights, objectives, take=None):
     '''Pareto argsort of objectives which may be multi-objective
 
+    Sorts by non-dominated front, then by descending crowding distance
+    within the last front taken, giving the same order as selNSGA2 from
+    deap without creating deap Individuals.
+
     Parameters:
         :weights:  list of weights, 1 for max, -1 for minimize
         :objectives: list of objective scores where each score is a sequence as long as weights
@@ -23,7 +100,22 @@ def pareto_front(weights, objectives, take=None):
         :best_idxes: argsort indices for fitness
 
     '''
+    objectives = np.atleast_2d(np.asarray(objectives, dtype=np.float64))
+    take = take or objectives.shape[0]
+    fronts = _non_dominated_fronts(objectives * np.asarray(weights, dtype=np.float64), take)
+    if not fronts:
+        return ()
+    chosen = [idx for front in fronts[:-1] for idx in front]
+    last = fronts[-1]
+    if take > len(chosen):
+        dist = _crowding_distance(objectives[last])
+        last = last[np.argsort(-dist, kind='mergesort')]
+        chosen.extend(last[:take - len(chosen)])
+    return tuple(int(idx) for idx in chosen)
+
 
+def _pareto_front_deap(weights, objectives, take=None):
+    '''pareto_front using deap Individuals and selNSGA2 (for benchmarks)'''
     toolbox = base.Toolbox()
     take = take or objectives.shape[0]
     creator.create("FitnessMulti", base.Fitness, weights=weights)
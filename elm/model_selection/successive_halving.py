@@ -0,0 +1,96 @@
+'''
+----------------------------
+
+``elm.model_selection.successive_halving``
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Budget-aware model selection for ensemble (fit_ensemble).  Each
+generation of ensemble is a "rung": all members are fit cheaply
+on the first rung, then only the best 1 / eta of members are kept
+and given eta times more partial_fit batches on the next rung.
+'''
+import math
+
+__all__ = ['successive_halving', 'successive_halving_batches',
+           'hyperband_brackets']
+
+
+def successive_halving(models, best_idxes=None, eta=3, min_keep=1,
+                       ngen=None, generation=None, **kwargs):
+    '''Keep the best 1 / eta of models on each generation (rung)
+
+    Use as the model_selection of ensemble / fit_ensemble with
+    the default pareto_front sort_fitness, typically with
+    partial_fit_batches from successive_halving_batches.
+
+    Parameters:
+        :models:     list of (tag, Pipeline) tuples
+        :best_idxes: argsort of fitness from sort_fitness (pareto_front).
+                     ValueError is raised if None (models not scored)
+        :eta:        int > 1 - proportion of models dropped on each rung
+        :min_keep:   keep at least min_keep models on each rung
+        :ngen:       number of generations (from ensemble)
+        :generation: current generation (from ensemble)
+        :kwargs:     placeholder - ignored
+
+    Returns:
+        :models: list of (tag, Pipeline) tuples, best first.  On the
+                 last generation models are sorted but not dropped
+    '''
+    if not isinstance(eta, int) or eta < 2:
+        raise ValueError('Expected eta to be an int > 1, got {}'.format(eta))
+    if best_idxes is None:
+        raise ValueError('successive_halving requires models ranked by '
+                         'fitness: give the Pipeline a scoring function '
+                         'and use a sort_fitness such as pareto_front')
+    models = [models[idx] for idx in best_idxes]
+    if ngen is not None and generation is not None and generation >= ngen - 1:
+        return models
+    keep = max(min_keep, len(models) // eta, 1)
+    return models[:keep]
+
+
+def successive_halving_batches(ngen, eta=3, min_batches=1):
+    '''partial_fit_batches for each generation (rung) of successive halving
+
+    Parameters:
+        :ngen:        number of generations (rungs)
+        :eta:         int > 1 - growth factor of batches on each rung
+        :min_batches: partial_fit batches on the first rung
+
+    Returns:
+        :batches: list of ints, e.g. [1, 3, 9] for ngen=3, eta=3
+    '''
+    return [min_batches * eta ** gen for gen in range(ngen)]
+
+
+def hyperband_brackets(max_batches, eta=3):
+    '''Hyperband brackets, each a successive halving run of ensemble
+
+    Each bracket trades off the number of members against the
+    partial_fit batches each member is given on the first rung.
+    Call fit_ensemble once per bracket, passing the bracket's
+    keyword arguments along with model_selection=successive_halving
+    and model_selection_kwargs={'eta': eta}.
+
+    Parameters:
+        :max_batches: max partial_fit batches for one member on one rung
+        :eta:         int > 1 - see successive_halving
+
+    Returns:
+        :brackets: list of dicts with keys init_ensemble_size, ngen
+                   and partial_fit_batches (a list - one int per rung)
+    '''
+    if not isinstance(eta, int) or eta < 2:
+        raise ValueError('Expected eta to be an int > 1, got {}'.format(eta))
+    s_max = int(math.log(max_batches) / math.log(eta) + 1e-9)
+    brackets = []
+    for s in range(s_max, -1, -1):
+        init_ensemble_size = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        min_batches = max(1, max_batches // eta ** s)
+        brackets.append({'init_ensemble_size': init_ensemble_size,
+                         'ngen': s + 1,
+                         'partial_fit_batches': successive_halving_batches(s + 1,
+                                                                           eta=eta,
+                                                                           min_batches=min_batches)})
+    return brackets
@@ -14,6 +14,7 @@ from elm.model_selection.evolve import (get_param_grid,
                                         ea_setup,
                                         evo_init_func,
                                         ea_general,
+                                        ea_steady_state,
                                         assign_check_fitness)
 from elm.model_selection.tests.evolve_example_config import CONFIG_STR
 
@@ -126,6 +127,44 @@ def test_ea_general(fitnesses, score_weights):
     assert original_pop != pop
 
 
+@pytest.mark.parametrize('fitnesses, score_weights',
+                         zip((min_fitnesses, max_fitnesses, min_max_fitnesses),
+                             score_weights))
+def test_ea_steady_state(fitnesses, score_weights):
+    '''Same synthetic fitnesses as test_ea_general, but with
+    fitnesses sent back to ea_steady_state one at a time
+    in reverse order of submission'''
+    config = yaml.load(CONFIG_STR)
+    config['model_scoring']['testing_model_scoring']['score_weights'] = score_weights
+    config['param_grids']['example_param_grid']['control']['early_stop'] = {'abs_change': [100,] * len(score_weights)}
+    config, evo_params = tst_evo_setup_evo_init_func(config=ConfigParser(config=config))
+    control = evo_params.deap_params['control']
+    ea_gen = ea_steady_state(evo_params,
+                             control['cxpb'],
+                             control['mutpb'],
+                             control['ngen'],
+                             control['k'])
+    pop, new_ind, param_history = next(ea_gen)
+    assert pop == []
+    assert len(new_ind) == control['mu']
+    best = fitnesses[1]
+    fitness_for = {ind.name: fit for ind, fit in zip(new_ind, fitnesses)}
+    pending = list(new_ind)
+    evaluated = 0
+    while new_ind is not None:
+        ind = pending.pop()
+        evaluated += 1
+        fit = fitness_for.get(ind.name, fitnesses[-1])
+        (pop, new_ind, param_history) = ea_gen.send([(ind, fit)])
+        if new_ind:
+            assert len(new_ind) == 1
+            assert not new_ind[0].fitness.valid
+            pending = new_ind + pending
+    assert 0 < len(pop) <= control['mu']
+    assert len(param_history) == evaluated <= control['mu'] * control['ngen']
+    assert tuple(ind for ind in pop if ind.fitness.values == best)
+
+
 def set_key_tst_bad_config_once(key, bad):
     config2 = yaml.load(CONFIG_STR)
     d = config2
@@ -0,0 +1,28 @@
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+from elm.model_selection.kmeans import kmeans_model_averaging
+from elm.pipeline import Pipeline, steps
+from elm.pipeline.tests.util import random_elm_store
+
+
+def test_kmeans_model_averaging_shapes():
+    '''New models are averaged only from models of the same
+    centroids shape and old models are not modified'''
+    X = random_elm_store(bands=4, height=20, width=20)
+    models = []
+    for idx, n_clusters in enumerate((3, 3, 4, 4, 5)):
+        pipe = Pipeline([steps.Flatten(),
+                         ('kmeans', MiniBatchKMeans(n_clusters=n_clusters))])
+        models.append(('tag_{}'.format(idx), pipe.fit(X)))
+    old_centers = [m._estimator.cluster_centers_.copy() for _, m in models]
+    new = kmeans_model_averaging(models, best_idxes=list(range(5)),
+                                 drop_n=1, evolve_n=6, reps=10,
+                                 ngen=3, generation=0)
+    assert len(new) == len(models) - 1 + 6
+    assert len(set(tag for tag, _ in new)) == len(new)
+    for tag, model in new[:6]:
+        assert model._estimator.cluster_centers_.shape[0] in (3, 4)
+        assert all(model is not m for _, m in models)
+    for (_, m), centers in zip(models, old_centers):
+        assert np.all(m._estimator.cluster_centers_ == centers)
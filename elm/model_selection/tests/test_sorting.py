@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from elm.model_selection.sorting import pareto_front, _pareto_front_deap
+
+weights = ([-1], [1], [-1, 1], [1, 1, -1])
+
+@pytest.mark.parametrize('weights', weights)
+@pytest.mark.parametrize('ties', (True, False))
+def test_pareto_front_same_as_deap(weights, ties):
+    '''pareto_front without deap gives the same argsort as selNSGA2'''
+    rng = np.random.RandomState(len(weights))
+    for _ in range(20):
+        n = rng.randint(1, 50)
+        if ties:
+            objectives = rng.randint(0, 4, size=(n, len(weights))).astype(float)
+        else:
+            objectives = rng.randn(n, len(weights))
+        for take in (None, rng.randint(1, n + 1)):
+            best_idxes = pareto_front(weights, objectives, take=take)
+            assert best_idxes == _pareto_front_deap(weights, objectives, take=take)
+            assert len(best_idxes) == (take or n)
+
+
+def test_pareto_front_minimize():
+    objectives = np.array([[3.], [1.], [2.]])
+    assert pareto_front([-1], objectives) == (1, 2, 0)
+    assert pareto_front([1], objectives, take=1) == (0,)
@@ -0,0 +1,34 @@
+import pytest
+
+from elm.model_selection.successive_halving import (successive_halving,
+                                                    successive_halving_batches,
+                                                    hyperband_brackets)
+
+
+def test_successive_halving_keeps_best():
+    models = [('tag_{}'.format(idx), idx) for idx in range(9)]
+    best_idxes = (8, 7, 6, 5, 4, 3, 2, 1, 0)
+    kept = successive_halving(models, best_idxes, eta=3, ngen=3, generation=0)
+    assert kept == [('tag_8', 8), ('tag_7', 7), ('tag_6', 6)]
+    kept = successive_halving(kept, (2, 1, 0), eta=3, ngen=3, generation=1)
+    assert kept == [('tag_6', 6)]
+    last = successive_halving(models, best_idxes, eta=3, ngen=3, generation=2)
+    assert len(last) == len(models) and last[0] == ('tag_8', 8)
+
+
+def test_successive_halving_bad_eta():
+    with pytest.raises(ValueError):
+        successive_halving([('a', 1)], eta=1)
+    with pytest.raises(ValueError):
+        successive_halving([('a', 1), ('b', 2)], best_idxes=None, ngen=3, generation=0)
+
+
+def test_hyperband_brackets():
+    assert successive_halving_batches(3, eta=3) == [1, 3, 9]
+    brackets = hyperband_brackets(27, eta=3)
+    assert [b['ngen'] for b in brackets] == [4, 3, 2, 1]
+    assert brackets[0]['init_ensemble_size'] == 27
+    assert brackets[0]['partial_fit_batches'] == [1, 3, 9, 27]
+    assert brackets[-1]['partial_fit_batches'] == [27]
+    for b in brackets:
+        assert len(b['partial_fit_batches']) == b['ngen']
@@ -0,0 +1,55 @@
+import gc
+
+import pytest
+
+from elm.config import ElmConfigError, import_callable
+from elm.config.util import _IMPORTED_CALLABLES
+from elm.model_selection.util import (get_args_kwargs_defaults,
+                                      filter_kwargs_to_func,
+                                      _SIGNATURES)
+
+
+class Estimator(object):
+    def __init__(self, a, b=2, **kw):
+        pass
+
+    def fit(self, X, y=None, sample_weight=None):
+        pass
+
+
+def func(X, y=None, **kwargs):
+    pass
+
+
+def test_signature_cache():
+    est = Estimator(1)
+    for _ in range(2):
+        assert get_args_kwargs_defaults(func) == (['X', 'kwargs'], {'y': None}, 'kwargs')
+        assert get_args_kwargs_defaults(est.fit) == (['X'], {'y': None, 'sample_weight': None}, None)
+        assert get_args_kwargs_defaults(Estimator.fit) == (['self', 'X'], {'y': None, 'sample_weight': None}, None)
+        assert get_args_kwargs_defaults(Estimator) == (['a', 'kw'], {'b': 2}, 'kw')
+    assert set(_SIGNATURES[Estimator.fit]) == {True, False}
+    # callers may modify the returned args and kwargs
+    args, kwargs, _ = get_args_kwargs_defaults(func)
+    args.append('z')
+    kwargs.clear()
+    assert get_args_kwargs_defaults(func) == (['X', 'kwargs'], {'y': None}, 'kwargs')
+    assert filter_kwargs_to_func(est.fit, y=1, z=2) == {'y': 1}
+
+
+def test_signature_cache_is_weak():
+    n = len(_SIGNATURES)
+    get_args_kwargs_defaults(lambda X, y=None: None)
+    gc.collect()
+    assert len(_SIGNATURES) == n
+
+
+def test_import_callable_cache():
+    spec = 'elm.model_selection.tests.test_util:func'
+    _IMPORTED_CALLABLES.pop(spec, None)
+    assert import_callable(spec) is func
+    assert _IMPORTED_CALLABLES[spec] is func
+    assert import_callable(spec) is func
+    with pytest.raises(ElmConfigError):
+        import_callable('elm.model_selection.tests.test_util:not_a_func')
+    assert 'elm.model_selection.tests.test_util:not_a_func' not in _IMPORTED_CALLABLES
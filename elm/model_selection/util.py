@@ -5,6 +5,14 @@
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 '''
 import inspect
+import threading
+import types
+import weakref
+
+# Parsed signatures in this process, keyed by function or class
+# (the function of a bound method) and whether func was bound
+_SIGNATURES = weakref.WeakKeyDictionary()
+_SIGNATURES_LOCK = threading.Lock()
 
 
 def get_args_kwargs_defaults(func):
@@ -16,7 +24,25 @@ def get_args_kwargs_defaults(func):
         :(args, kwargs, takes_var_keywords): where args are names /
         of required args, kwargs are keyword args with defaults, and
         takes_var_keywords indicates whether func has a \*\*param
+
+    Results for functions, methods and classes are cached (weakly,
+    so the cache does not keep them alive)
      '''
+    key = getattr(func, '__func__', func)
+    if not isinstance(key, (types.FunctionType, type)):
+        return _get_args_kwargs_defaults(func)
+    bound = key is not func
+    with _SIGNATURES_LOCK:
+        parsed = _SIGNATURES.get(key, {}).get(bound)
+    if parsed is None:
+        parsed = _get_args_kwargs_defaults(func)
+        with _SIGNATURES_LOCK:
+            _SIGNATURES.setdefault(key, {})[bound] = parsed
+    args, kwargs, takes_variable_keywords = parsed
+    return list(args), dict(kwargs), takes_variable_keywords
+
+
+def _get_args_kwargs_defaults(func):
     sig = inspect.signature(func)
     params = sig.parameters
     kwargs = {}
@@ -1,3 +1,4 @@
+from collections import Sequence
 from functools import partial, wraps
 from itertools import chain, product
 import copy
@@ -9,8 +10,12 @@ import dask
 
 from elm.config import import_callable
 from elm.config.dask_settings import _find_get_func_for_client
+from elm.config.profiling import profile_task
 from elm.pipeline.util import (_run_model_selection,
                                _next_name)
+from elm.pipeline.step_report import (_gather_step_reports,
+                                      _keep_step_report,
+                                      export_step_report)
 from elm.sample_util.samplers import make_samples_dask
 
 logger = logging.getLogger(__name__)
@@ -18,6 +23,7 @@ logger = logging.getLogger(__name__)
 __all__ = ['ensemble']
 
 
+@profile_task('fit')
 def _fit_once(method, model, fit_score_kwargs, args):
     '''Dask helper internal func to call a model's method
 
@@ -58,13 +64,46 @@ def _fit_once(method, model, fit_score_kwargs, args):
     return fitting_func(X, method_kwargs=kw)
 
 
+def _warm_start(model, method):
+    '''Set up a fitted Pipeline to start from its fitted state
+    on its next "fit", returning (model, method) where method may
+    become "partial_fit"
+
+    * KMeans / MiniBatchKMeans: init=cluster_centers_, n_init=1
+    * Estimators with a warm_start param (SGD, linear models,
+      ensembles of trees): warm_start=True, reusing coef_, etc.
+    * Otherwise estimators with partial_fit: method="partial_fit"
+
+    Transform steps with a warm_start param are also warm started.
+    '''
+    if method != 'fit':
+        return model, method
+    for _, step in model.steps[:-1]:
+        est = getattr(step, '_estimator', None)
+        if est is not None and 'warm_start' in est.get_params():
+            step.set_params(warm_start=True)
+    est = model._estimator
+    params = est.get_params()
+    if 'init' in params and getattr(est, 'cluster_centers_', None) is not None:
+        kw = {'init': est.cluster_centers_}
+        if 'n_init' in params:
+            kw['n_init'] = 1
+        est.set_params(**kw)
+    elif 'warm_start' in params:
+        est.set_params(warm_start=True)
+    elif hasattr(est, 'partial_fit'):
+        method = 'partial_fit'
+    return model, method
+
+
 def _one_generation_dask_graph(dsk,
                                models,
                                fit_score_kwargs,
                                sample_keys,
                                partial_fit_batches,
                                gen,
-                               method):
+                               method,
+                               warm_start=False):
 
     '''Run a group of models' fit method on a group of samples
     Parameters:
@@ -77,6 +116,8 @@ def _one_generation_dask_graph(dsk,
         partial_fit_batches: how many partial_fit's
         gen: which generation is it - passed to model_selection func
         method: One of: "fit", "fit_transform", "transform", "partial_fit"
+        warm_start: if True, models that have been fit are warm started
+                    (see _warm_start)
 
     Returns:
         tuple of (dsk, model_keys, new_models_name)
@@ -88,10 +129,16 @@ def _one_generation_dask_graph(dsk,
     model_keys = [_[0] for _ in models]
     collect_keys = []
     token = '{}-gen-{}'.format(method, gen)
+    methods = {}
     for (key, model), arg in product(models, sample_keys):
         name = _next_name(token)
-        dsk[name] = (partial(_fit_once, method, model, fit_score_kwargs), arg)
+        if warm_start:
+            model, model_method = _warm_start(model, method)
+        else:
+            model_method = method
+        dsk[name] = (partial(_fit_once, model_method, model, fit_score_kwargs), arg)
         collect_keys.append(name)
+        methods[name] = model_method
     if partial_fit_batches > 1:
         for idx in range(1, partial_fit_batches):
             token_pf = token + '_batch_{}'.format(idx)
@@ -99,8 +146,9 @@ def _one_generation_dask_graph(dsk,
             for key in collect_keys:
                 for sample_key in sample_keys:
                     name = _next_name(token_pf)
-                    dsk[name] = ((lambda model, arg: _fit_once(method, model, fit_score_kwargs, arg)), key, sample_key)
+                    dsk[name] = ((lambda model, arg, method=methods[key]: _fit_once(method, model, fit_score_kwargs, arg)), key, sample_key)
                     collect_keys2.append(name)
+                    methods[name] = methods[key]
             collect_keys = collect_keys2
     def tuple_of_args(*args):
         return tuple(args)
@@ -127,6 +175,8 @@ def ensemble(pipe,
              partial_fit_batches=1,
              classes=None,
              method_kwargs=None,
+             warm_start=False,
+             step_report_file=None,
              **data_source):
 
     '''Fit or partial_fit an ensemble of models to a series of samples
@@ -166,9 +216,21 @@ def ensemble(pipe,
                 See also elm.model_selection.scoring
         method: This is the method of Pipeline that called this ensemble
             function, typically "fit"
+        partial_fit_batches: int number of partial_fit calls per member
+            per generation, or a list with an int for each generation,
+            e.g. from elm.model_selection.successive_halving_batches
         classes: Unique sequence of class integers passed to supervised
             classifiers that need the known y classes.
         method_kwargs: any other arguments to pass to method
+        warm_start: If True, on generations after the first, start each
+            member from its fitted state: KMeans-like estimators are
+            initialized from cluster_centers_, estimators with a
+            warm_start param (e.g. SGDClassifier) reuse coef_, and
+            other estimators with partial_fit are partial_fit
+        step_report_file: None or a CSV (or .json) filename to which
+            the per-step timing / memory records of every member on
+            every generation are written.  The records are also set
+            as pipe.ensemble_step_report (see elm.pipeline.step_report)
         **data_source: keywords passed to "sampler" if given
     Returns:
 
@@ -182,7 +244,15 @@ def ensemble(pipe,
     model_selection_kwargs = model_selection_kwargs or {}
     ensemble_size = init_ensemble_size or 1
     partial_fit_batches = partial_fit_batches or 1
-    if partial_fit_batches > 1:
+    if isinstance(partial_fit_batches, Sequence):
+        if len(partial_fit_batches) < ngen:
+            raise ValueError('Expected partial_fit_batches to be an int or '
+                             'a list of ints as long as ngen ({}), but '
+                             'found {}'.format(ngen, partial_fit_batches))
+        batches_schedule = tuple(partial_fit_batches)
+    else:
+        batches_schedule = (partial_fit_batches,) * ngen
+    if max(batches_schedule) > 1:
         method = 'partial_fit'
     if not ensemble_init_func:
         models = tuple(copy.deepcopy(pipe) for _ in range(ensemble_size))
@@ -190,6 +260,9 @@ def ensemble(pipe,
         ensemble_init_func = import_callable(ensemble_init_func)
         models = ensemble_init_func(pipe, ensemble_size=ensemble_size)
     logger.info("Init ensemble: {} members".format(len(models)))
+    for model in models:
+        model.step_report = []
+    step_report = []
     if model_selection:
         model_selection = import_callable(model_selection)
     final_names = []
@@ -206,25 +279,34 @@ def ensemble(pipe,
         else:
             sample_keys_passed = sample_keys
         logger.info('Ensemble generation {} of {} - ({} estimators) '.format(gen + 1, ngen, len(models)))
+        partial_fit_batches = batches_schedule[gen]
         msg = (len(models), len(sample_keys_passed),
                partial_fit_batches, method,
                len(models) * len(sample_keys_passed) * partial_fit_batches,
                gen + 1,
                ngen)
         logger.info('Ensemble Generation {5} of {6}: ({0} members x {1} samples x {2} calls) = {4} {3} calls this gen'.format(*msg))
-        dsk, model_keys, new_models_name = _one_generation_dask_graph(dsk,
+        # Only this generation's samples and fits are in gen_dsk, so
+        # the get_func does not rerun earlier generations' fits
+        gen_dsk = {key: dsk[key] for key in sample_keys_passed}
+        for _, model in models:
+            # including members new from model_selection
+            _keep_step_report(model)
+        gen_dsk, model_keys, new_models_name = _one_generation_dask_graph(gen_dsk,
                                                       models,
                                                       fit_score_kwargs,
                                                       sample_keys_passed,
                                                       partial_fit_batches,
                                                       gen,
-                                                      method)
+                                                      method,
+                                                      warm_start=warm_start and gen > 0)
         if get_func is None:
-            new_models = tuple(dask.get(dsk, new_models_name))
+            new_models = tuple(dask.get(gen_dsk, new_models_name))
         else:
-            new_models = tuple(get_func(dsk, new_models_name))
+            new_models = tuple(get_func(gen_dsk, new_models_name))
         models = tuple(zip(model_keys, new_models))
         logger.info('Trained {} estimators'.format(len(models)))
+        step_report.extend(_gather_step_reports(models, gen))
         if model_selection:
             models = _run_model_selection(models,
                                           model_selection,
@@ -237,6 +319,9 @@ def ensemble(pipe,
             pass # Just training all ensemble members
                  # without replacing / re-ininializing / editing
                  # the model params
+    pipe.ensemble_step_report = step_report
+    if step_report_file:
+        export_step_report(step_report, step_report_file)
     if saved_ensemble_size:
         final_models = models[:saved_ensemble_size]
     else:
@@ -2,20 +2,30 @@ from collections import Sequence
 from functools import partial
 from pprint import pformat
 import logging
+import os
+import queue
 
+import dask
 import numpy as np
 import pandas as pd
 
 from elm.config import import_callable, ConfigParser
-from elm.config.dask_settings import _find_get_func_for_client
+from elm.config.dask_settings import (_find_get_func_for_client,
+                                      _find_submit_func_for_client)
 from elm.model_selection.evolve import (ea_general,
+                                        ea_steady_state,
                                         evo_init_func,
                                         assign_check_fitness,
                                         ind_to_new_pipe)
 from elm.model_selection.util import get_args_kwargs_defaults
 from elm.pipeline.util import _validate_ensemble_members
-from elm.pipeline.ensemble import _one_generation_dask_graph, ensemble
+from elm.pipeline.ensemble import (_one_generation_dask_graph,
+                                   _fit_once,
+                                   ensemble)
 from elm.pipeline.serialize import serialize_pipe
+from elm.pipeline.step_report import (_gather_step_reports,
+                                      _keep_step_report,
+                                      export_step_report)
 from elm.sample_util.samplers import make_samples_dask
 
 __all__ = ['evolve_train']
@@ -37,8 +47,9 @@ def _on_each_generation(base_model,
     new_models = []
     fit_kwargs = []
     for idx, ind in enumerate(invalid_ind):
-        model = ind_to_new_pipe(base_model, deap_params, ind)
+        model = _keep_step_report(ind_to_new_pipe(base_model, deap_params, ind))
         new_models.append((ind.name, model))
+    dsk = {key: dsk[key] for key in sample_keys}
     dsk, model_keys, new_models_name = _one_generation_dask_graph(dsk,
                                         new_models,
                                         method_kwargs,
@@ -59,6 +70,90 @@ def _on_each_generation(base_model,
     return models, fitnesses
 
 
+def _fit_one_individual(method, model, method_kwargs, partial_fit_batches, sample):
+    '''Fit one Pipeline (partial_fit_batches times) for ea_steady_state'''
+    for _ in range(partial_fit_batches):
+        model = _fit_once(method, model, method_kwargs, sample)
+    return model
+
+
+def _on_each_completion(base_model,
+                        deap_params,
+                        client,
+                        partial_fit_batches,
+                        method,
+                        method_kwargs,
+                        dsk,
+                        sample_keys,
+                        ea_gen,
+                        new_ind,
+                        step_report=None):
+    '''Drive ea_steady_state, submitting each individual as a future
+    and sending fitnesses back to ea_gen as the futures complete.
+    Step report records of each fitted model are appended to
+    step_report if given, with generation as (models finished // mu)
+
+    Returns:
+        :(pop, fitted_models): final population and dict of name: Pipeline
+    '''
+    submit = _find_submit_func_for_client(client)
+    mu = len(new_ind)
+    samples = {}
+    futures = {}
+    fitted_models = {}
+    done = queue.Queue()
+    n_submitted = 0
+    n_finished = 0
+    def get_sample(idx):
+        # Individuals share a sample for each mu (one "generation")
+        key = sample_keys[(idx // mu) % len(sample_keys)]
+        if key not in samples:
+            samples[key] = submit(dask.get, {key: dsk[key]}, key)
+        return samples[key]
+    def submit_all(new_ind):
+        nonlocal n_submitted
+        for ind in new_ind:
+            model = _keep_step_report(ind_to_new_pipe(base_model, deap_params, ind))
+            fut = submit(_fit_one_individual, method, model, method_kwargs,
+                         partial_fit_batches, get_sample(n_submitted))
+            futures[fut] = ind
+            n_submitted += 1
+            fut.add_done_callback(done.put)
+    submit_all(new_ind)
+    try:
+        while True:
+            completed = [done.get()]
+            while not done.empty():
+                completed.append(done.get_nowait())
+            results = []
+            for fut in completed:
+                ind = futures.pop(fut)
+                model = fut.result()
+                fitted_models[ind.name] = model
+                if step_report is not None:
+                    step_report.extend(_gather_step_reports([(ind.name, model)],
+                                                            n_finished // mu))
+                n_finished += 1
+                fitness = model._score
+                fitness = fitness if isinstance(fitness, Sequence) else [fitness]
+                results.append((ind, fitness))
+            logger.info('Trained {} estimators ({} of {} submitted are '
+                        'finished)'.format(len(results),
+                                           n_submitted - len(futures),
+                                           n_submitted))
+            pop, new_ind, _ = ea_gen.send(results)
+            pop_names = [ind.name for ind in pop]
+            fitted_models = {k: v for k, v in fitted_models.items()
+                             if k in pop_names}
+            if new_ind is None:
+                break
+            submit_all(new_ind)
+    finally:
+        for fut in futures:
+            fut.cancel()
+    return pop, fitted_models
+
+
 def evolve_train(pipe,
                  evo_params,
                  X=None,
@@ -75,6 +170,8 @@ def evolve_train(pipe,
                  partial_fit_batches=1,
                  classes=None,
                  method_kwargs=None,
+                 steady_state=None,
+                 step_report_file=None,
                  **data_source):
     '''evolve_train runs an evolutionary algorithm to
     find the most fit elm.pipeline.Pipeline instances
@@ -87,6 +184,18 @@ def evolve_train(pipe,
                           param_grid_name='param_grid_example',
                           score_weights=[-1]) # minimization
 
+        steady_state: if True, use the asynchronous steady-state EA
+            (elm.model_selection.evolve.ea_steady_state), submitting
+            each model fit as a future and updating the population as
+            each fit finishes.  Defaults to the "steady_state" key of
+            the param_grid's control, or False.
+
+        step_report_file: None or a CSV (or .json) filename for the
+            per-step timing / memory records of every model fit.
+            Relative filenames are written next to the param_history
+            (evo_params.history_file).  The records are also set as
+            pipe.ensemble_step_report (see elm.pipeline.step_report)
+
         See also the help from (elm.pipeline.ensemble) where
         most arguments are interpretted similary.
 
@@ -96,6 +205,8 @@ def evolve_train(pipe,
     scoring_kwargs = scoring_kwargs or {}
     get_func = _find_get_func_for_client(client)
     control = evo_params.deap_params['control']
+    if steady_state is None:
+        steady_state = bool(control.get('steady_state', False))
     required_args, _, _ = get_args_kwargs_defaults(ea_general)
     evo_args = [evo_params,]
     data_source = dict(X=X,y=y, sample_weight=sample_weight, sampler=sampler,
@@ -119,6 +230,7 @@ def evolve_train(pipe,
         gen_to_sample_key = lambda gen: sample_keys
     sample_keys = tuple(sample_keys)
 
+    step_report = []
     try:
         param_history = []
         for a in required_args[1:]:
@@ -127,49 +239,70 @@ def evolve_train(pipe,
                                  'to evolutionary '
                                  'algorithm)'.format(a, control))
             evo_args.append(control[a])
-        ea_gen = ea_general(*evo_args)
-        pop, _, _ = next(ea_gen)
-        sample_keys_passed = gen_to_sample_key(0)
-        def log_once(len_models, sample_keys_passed, gen):
-            total_calls = len_models * len(sample_keys_passed) * partial_fit_batches
-            msg = (len_models, len(sample_keys_passed), partial_fit_batches, method, gen, total_calls)
-            fmt = 'Evolve generation {4}: {0} models x {1} samples x {2} {3} calls = {5} calls in total'
-            logger.info(fmt.format(*msg))
-        log_once(len(pop), sample_keys_passed, 0)
-        pop_names = [ind.name for ind in pop]
-        models, fitnesses = fit_one_generation(dsk, 0, sample_keys_passed, pop)
-        assign_check_fitness(pop,
-                         fitnesses,
-                         param_history,
-                         evo_params.deap_params['choices'],
-                         evo_params.score_weights)
-        invalid_ind = True
-        fitted_models = {n: m for n, (_, m) in zip(pop_names, models)}
         ngen = evo_params.deap_params['control'].get('ngen') or None
         if not ngen and not evo_params.early_stop:
             raise ValueError('param_grids: pg_name: control: has neither '
                              'ngen or early_stop keys')
         elif not ngen:
             ngen = 1000000
-        for gen in range(ngen):
-            # on last generation invalid_ind becomes None
-            # and breaks this loop
-            if models_share_sample:
-                sample_keys_passed = (gen_to_sample_key(gen % len(sample_keys)),)
-            else:
-                sample_keys_passed = sample_keys
-
-            if gen > 0:
-                log_once(len(invalid_ind), sample_keys_passed, gen)
-                names = [ind.name for ind in invalid_ind]
-                models, fitnesses = fit_one_generation(dsk, gen, sample_keys_passed, invalid_ind)
-                fitted_models.update({n: m for n, (_, m) in zip(names,models)})
-            (pop, invalid_ind, param_history) = ea_gen.send(fitnesses)
+        if steady_state:
+            evo_args[required_args.index('ngen')] = ngen
+            ea_gen = ea_steady_state(*evo_args)
+            pop, new_ind, param_history = next(ea_gen)
+            logger.info('Evolve (steady-state): {} models initially, up to '
+                        '{} models in total'.format(len(new_ind),
+                                                    len(new_ind) * ngen))
+            pop, fitted_models = _on_each_completion(pipe,
+                                                     evo_params.deap_params,
+                                                     client,
+                                                     partial_fit_batches,
+                                                     method,
+                                                     method_kwargs,
+                                                     dsk,
+                                                     sample_keys,
+                                                     ea_gen,
+                                                     new_ind,
+                                                     step_report=step_report)
+        else:
+            ea_gen = ea_general(*evo_args)
+            pop, _, _ = next(ea_gen)
+            sample_keys_passed = gen_to_sample_key(0)
+            def log_once(len_models, sample_keys_passed, gen):
+                total_calls = len_models * len(sample_keys_passed) * partial_fit_batches
+                msg = (len_models, len(sample_keys_passed), partial_fit_batches, method, gen, total_calls)
+                fmt = 'Evolve generation {4}: {0} models x {1} samples x {2} {3} calls = {5} calls in total'
+                logger.info(fmt.format(*msg))
+            log_once(len(pop), sample_keys_passed, 0)
             pop_names = [ind.name for ind in pop]
-            fitted_models = {k: v for k, v in fitted_models.items()
-                             if k in pop_names}
-            if not invalid_ind:
-                break # If there are no new solutions to try, break
+            models, fitnesses = fit_one_generation(dsk, 0, sample_keys_passed, pop)
+            step_report.extend(_gather_step_reports(zip(pop_names, (m for _, m in models)), 0))
+            assign_check_fitness(pop,
+                             fitnesses,
+                             param_history,
+                             evo_params.deap_params['choices'],
+                             evo_params.score_weights)
+            invalid_ind = True
+            fitted_models = {n: m for n, (_, m) in zip(pop_names, models)}
+            for gen in range(ngen):
+                # on last generation invalid_ind becomes None
+                # and breaks this loop
+                if models_share_sample:
+                    sample_keys_passed = gen_to_sample_key(gen % len(sample_keys))
+                else:
+                    sample_keys_passed = sample_keys
+
+                if gen > 0:
+                    log_once(len(invalid_ind), sample_keys_passed, gen)
+                    names = [ind.name for ind in invalid_ind]
+                    models, fitnesses = fit_one_generation(dsk, gen, sample_keys_passed, invalid_ind)
+                    step_report.extend(_gather_step_reports(zip(names, (m for _, m in models)), gen))
+                    fitted_models.update({n: m for n, (_, m) in zip(names,models)})
+                (pop, invalid_ind, param_history) = ea_gen.send(fitnesses)
+                pop_names = [ind.name for ind in pop]
+                fitted_models = {k: v for k, v in fitted_models.items()
+                                 if k in pop_names}
+                if not invalid_ind:
+                    break # If there are no new solutions to try, break
         pop = evo_params.toolbox.select(pop, saved_ensemble_size)
         pop_names = [ind.name for ind in pop]
         models = [(k, v) for k, v in fitted_models.items()
@@ -185,5 +318,11 @@ def evolve_train(pipe,
                                          columns=columns)
             param_history.to_csv(evo_params.history_file,
                                  index_label='parameter_set')
+        pipe.ensemble_step_report = step_report
+        if step_report_file:
+            if not os.path.isabs(step_report_file):
+                history_dir = os.path.dirname(evo_params.history_file)
+                step_report_file = os.path.join(history_dir, step_report_file)
+            export_step_report(step_report, step_report_file)
     return models
 
@@ -82,7 +82,8 @@ def config_to_pipeline(config, client=None):
             if 'classes' in train:
                 method_kwargs['classes'] = train['classes']
             ensemble_kwargs['method_kwargs'] = method_kwargs
-            pipe = Pipeline(pipe_steps, scoring=scoring, scoring_kwargs=scoring_kwargs)
+            pipe = Pipeline(pipe_steps, scoring=scoring, scoring_kwargs=scoring_kwargs,
+                            dtype=getattr(config, 'ELM_FLOAT_DTYPE', None) or None)
             evo_params = idx_to_evo_params.get(idx, None)
             if evo_params:
                 kw = dict(evo_params=evo_params)
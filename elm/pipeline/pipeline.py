@@ -37,13 +37,19 @@ import numpy as np
 import xarray as xr
 from sklearn.exceptions import NotFittedError
 
+from elm.config.dtype_policy import (as_float_dtype, check_float_dtype,
+                                     float_dtype_context)
 from elm.model_selection import get_args_kwargs_defaults
 from elm.model_selection.scoring import score_one_model
-from elm.readers import ElmStore
+from elm.readers import (ElmStore, FlatStore, as_elm_store, as_flat_store,
+                         decode_packed)
 from elm.pipeline.predict_many import predict_many
 from elm.pipeline import steps as STEPS
 from elm.pipeline.ensemble import ensemble as _ensemble
-from elm.pipeline.util import _next_name
+from elm.pipeline.step_cache import (_as_step_cache, _sample_token,
+                                     _step_key)
+from elm.pipeline.step_report import _run_step, step_report_frame
+from elm.pipeline.util import _next_name, _predict_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -63,10 +69,15 @@ class Pipeline(object):
                   http://scikit-learn.org/stable/modules/model_evaluation.html.
                   Also see a custom scoring example in :any:``elm.model_selection.kmeans.kmeans_aic``
         :scoring_kwargs: Keyword args passed to scoring
+        :memory: None, a directory name or an elm.pipeline.step_cache.StepCache
+                 to cache the output of transform steps
+        :dtype: None, 'float32' or 'float64' - float dtype policy while
+                running the Pipeline (see elm.config.dtype_policy)
     '''
 
 
-    def __init__(self, steps, scoring=None, scoring_kwargs=None):
+    def __init__(self, steps, scoring=None, scoring_kwargs=None, memory=None,
+                 dtype=None):
         '''
         Pipeline of transformation, fit steps for
         ensemble, evolutionary and/or partial_fit with dask
@@ -92,13 +103,30 @@ class Pipeline(object):
                         :func:``elm.model_selection.kmeans.kmeans_aic``
 
             :scoring_kwargs: Keyword args passed to scoring
+
+            :memory: None (default) to not cache transform steps, or
+                     a directory name for a DiskStepCache, or a
+                     MemoryStepCache or DiskStepCache from
+                     elm.pipeline.step_cache.  Copies of the Pipeline,
+                     such as ensemble members, share the cache
+
+            :dtype: None (default) to use the float dtype policy set
+                    globally, or 'float32' or 'float64' to read samples,
+                    reshape them and run the steps with that float dtype.
+                    See elm.config.dtype_policy
         '''
-        self._re_init_args_kwargs = copy.deepcopy(((steps,), dict(scoring=scoring, scoring_kwargs=scoring_kwargs)))
+        memory = _as_step_cache(memory)
+        check_float_dtype(dtype)
+        self._re_init_args_kwargs = copy.deepcopy(((steps,), dict(scoring=scoring, scoring_kwargs=scoring_kwargs, dtype=dtype)))
+        self._re_init_args_kwargs[1]['memory'] = memory
         self.steps = steps
         self._validate_steps()
         self._names = [_[0] for _ in self.steps]
         self.scoring_kwargs = scoring_kwargs
         self.scoring = scoring
+        self.memory = memory
+        self.dtype = dtype
+        self.step_report = []
 
     def new_with_params(self, **new_params):
         '''Return a copy of this Pipeline as it was initialized,
@@ -113,15 +141,26 @@ class Pipeline(object):
         return Pipeline(*self._re_init_args_kwargs[0],
                         **self._re_init_args_kwargs[1])
 
-    def _run_steps(self, X=None, y=None,
-                  sample_weight=None,
-                  sampler=None, args_list=None,
-                  sklearn_method='fit',
-                  method_kwargs=None,
-                  new_params=None,
-                  partial_fit_batches=1,
-                  return_X=False,
-                  **data_source):
+    def _run_steps(self, *args, **kwargs):
+        '''Evaluate each fit/transform step in self.steps with the
+        float dtype policy of self.dtype, if given'''
+        if not getattr(self, '_keep_step_report', False):
+            # only the records of this call (see elm.pipeline.step_report)
+            self.step_report = []
+        with float_dtype_context(getattr(self, 'dtype', None)):
+            return self._run_steps_in_dtype(*args, **kwargs)
+
+    def _run_steps_in_dtype(self, X=None, y=None,
+                           sample_weight=None,
+                           sampler=None, args_list=None,
+                           sklearn_method='fit',
+                           method_kwargs=None,
+                           new_params=None,
+                           partial_fit_batches=1,
+                           return_X=False,
+                           chunk_size=None,
+                           n_jobs=None,
+                           **data_source):
         '''Evaluate each fit/transform step in self.steps.  Used
         by fit, transform, predict and related methods'''
         from elm.sample_util.sample_pipeline import _split_pipeline_output
@@ -143,7 +182,11 @@ class Pipeline(object):
                                                      **data_source)
         else:
             X, y, sample_weight = _split_pipeline_output(X, X, y, sample_weight, sklearn_method)
-        for idx, (_, step_cls) in enumerate(self.steps[:-1]):
+        X = as_float_dtype(X)
+        memory = getattr(self, 'memory', None)
+        if memory is not None and len(self.steps) > 1:
+            token = _sample_token(X, y, sample_weight)
+        for idx, (step_name, step_cls) in enumerate(self.steps[:-1]):
 
             if prepare_for == 'train':
                 fit_func = step_cls.fit_transform
@@ -152,11 +195,23 @@ class Pipeline(object):
                 if not hasattr(getattr(step_cls, '_estimator', None), 'transform'):
                     # Estimator such as TSNE with no transform method, just fit_transform
                     fit_func = step_cls.fit_transform
-            func_out = fit_func(X, y=y, sample_weight=sample_weight)
+            if getattr(step_cls, '_flat_store_ok', False):
+                X = as_flat_store(X)
+            else:
+                X = as_elm_store(X)
+            if not getattr(step_cls, '_packed_ok', False):
+                X = decode_packed(X)
+            if memory is None:
+                func_out = self._run_step(fit_func, step_name, X, y=y,
+                                          sample_weight=sample_weight)
+            else:
+                func_out, token = self._run_cached_step(memory, idx, fit_func,
+                                                        token, X, y=y,
+                                                        sample_weight=sample_weight)
             if func_out is not None:
                 X, y, sample_weight = _split_pipeline_output(func_out, X, y,
                                                        sample_weight, repr(fit_func))
-        if fit_func and not isinstance(X, (ElmStore, xr.Dataset)):
+        if fit_func and not isinstance(X, (ElmStore, xr.Dataset, FlatStore)):
             raise ValueError('Expected the return value of {} to be an '
                              'elm.readers:ElmStore'.format(fit_func))
         fitter_or_predict = getattr(self._estimator, sklearn_method, None)
@@ -174,21 +229,80 @@ class Pipeline(object):
 
 
         else:
+            if not getattr(self._estimator, '_flat_store_ok', False):
+                X = as_elm_store(X)
             kwargs = {'y': y, 'sample_weight': sample_weight}
             args = (X,)
+        step_name = self.steps[-1][0]
         if 'predict' in sklearn_method:
             X = args[0]
-            pred = fitter_or_predict(X.flat.values, **kwargs)
+            if not sklearn_method.startswith('fit'):
+                fitter_or_predict = _predict_chunks(fitter_or_predict,
+                                                    chunk_size=chunk_size,
+                                                    n_jobs=n_jobs)
+            pred = self._run_step(fitter_or_predict, step_name,
+                                  X.flat.values, **kwargs)
             if return_X:
                 return pred, X
             return pred
 
-        output = fitter_or_predict(*args, **kwargs)
+        output = self._run_step(fitter_or_predict, step_name, *args, **kwargs)
         if sklearn_method in ('fit', 'partial_fit', 'fit_predict'):
             self._score_estimator(X, y=y, sample_weight=sample_weight)
             return self
         # transform or fit_transform most likely
-        return _split_pipeline_output(output, X, y, sample_weight, 'fit_transform')
+        X, y, sample_weight = _split_pipeline_output(output, X, y, sample_weight,
+                                                     'fit_transform')
+        return (as_elm_store(X), y, sample_weight)
+
+    def _run_step(self, func, step_name, *args, **kwargs):
+        '''Call func(*args, **kwargs), appending timing / memory
+        of the call to self.step_report (see elm.pipeline.step_report)'''
+        method = getattr(func, '__name__', repr(func))
+        output, record = _run_step(func, step_name, method, *args, **kwargs)
+        self.__dict__.setdefault('step_report', []).append(record)
+        return output
+
+    def _run_cached_step(self, memory, idx, func, token, X, y=None,
+                         sample_weight=None):
+        '''Run transform step idx with memory (a StepCache), returning
+        (output, key) where key is the input token of the next step'''
+        step_name, step_cls = self.steps[idx]
+        fit = func == step_cls.fit_transform
+        method = 'fit_transform' if fit else 'transform'
+        key = _step_key(step_cls, method, token)
+        cached_key, cached = memory.lookup(key)
+        if cached is None:
+            output = self._run_step(func, step_name, X, y=y,
+                                    sample_weight=sample_weight)
+            memory.set(key, (output, step_cls if fit else None))
+            if fit:
+                memory.alias(_step_key(step_cls, 'transform', token), key)
+            self.step_report[-1]['cache'] = 'miss'
+            return output, key
+        output, fitted = cached
+        if fit and fitted is not None:
+            self.steps[idx] = (step_name, fitted)
+        self._run_step(lambda *args, **kwargs: output, step_name, X, y=y,
+                       sample_weight=sample_weight)
+        self.step_report[-1].update(method=func.__name__, cache='hit')
+        return output, cached_key
+
+    def step_report_frame(self, ensemble=False):
+        '''Per-step timing / memory of this Pipeline's fit, transform
+        and predict calls as a pandas.DataFrame
+
+        Parameters:
+            :ensemble: if True, return the records gathered from every
+                       member on every generation of the last
+                       fit_ensemble or fit_ea call
+
+        Returns:
+            :df: pandas.DataFrame - see elm.pipeline.step_report
+        '''
+        if ensemble:
+            return step_report_frame(getattr(self, 'ensemble_step_report', []))
+        return step_report_frame(getattr(self, 'step_report', []))
 
     def _post_run_pipeline(self, fitter_or_predict, estimator,
                            X, y=None, sample_weight=None, prepare_for='train',
@@ -334,6 +448,8 @@ class Pipeline(object):
                      partial_fit_batches=1,
                      serialize_pipe=None,
                      method_kwargs=None,
+                     warm_start=False,
+                     step_report_file=None,
                      **data_source):
         '''Run ensemble approach to fitting
 
@@ -359,6 +475,8 @@ class Pipeline(object):
                          method=method, partial_fit_batches=partial_fit_batches,
                          serialize_pipe=serialize_pipe,
                          method_kwargs=method_kwargs,
+                         warm_start=warm_start,
+                         step_report_file=step_report_file,
                          **data_source)
         return self
 
@@ -371,6 +489,8 @@ class Pipeline(object):
                partial_fit_batches=1,
                serialize_pipe=None,
                method_kwargs=None,
+               steady_state=None,
+               step_report_file=None,
                **data_source):
 
         '''Passes the Pipeline to :any:``elm.pipeline.evolve_train``
@@ -400,6 +520,9 @@ class Pipeline(object):
                         'ngen':  2,   # number of generations
                         'mu':    4,   # population size (number of Pipeline instances)
                         'k':     4,   # select top k (NSGA-2)
+                        # Update the population as each fit finishes
+                        # rather than once per generation (optional)
+                        'steady_state': False,
                         # Control stopping on absolute change in objectives
                         # (agg controls application of abs change check to each
                            objective, is using multi-objective scoring)
@@ -443,11 +566,14 @@ class Pipeline(object):
                              method=method,
                              partial_fit_batches=partial_fit_batches,
                              method_kwargs=method_kwargs,
+                             steady_state=steady_state,
+                             step_report_file=step_report_file,
                              **data_source)
         self.ensemble = models
         return self
 
-    def predict(self, X=None, method_kwargs=None, return_X=False, **data_source):
+    def predict(self, X=None, method_kwargs=None, return_X=False,
+                chunk_size=None, n_jobs=None, **data_source):
         '''Call the final estimator's predict method
 
         This does not predict from all fitted ensemble members
@@ -460,9 +586,17 @@ class Pipeline(object):
             :X: ElmStore or None if "data_source" in kwargs has
                a sampler and sampler_args keys/values
             :method_kwargs: kwargs to predict if any
-            :return_X: also return the final X ElmStore ( the
-                      X ElmStore with a Dataset "flat" whose
-                      values are used in prediction)
+            :return_X: also return the final X (a FlatStore or an
+                      ElmStore with a DataArray "flat", whose values
+                      are used in prediction - see
+                      elm.readers.as_elm_store)
+            :chunk_size: None to predict all rows of X in one call of
+               the final estimator's predict, or an integer number of
+               rows per call.  Predictions of the chunks are written
+               into one array, so memory used by predict scales with
+               chunk_size rather than the size of X
+            :n_jobs: number of threads predicting chunks at once
+               (default: number of cpus)
             :data_source: if X is None, data_source must have a
                sampler_func and sampler_args
         Returns:
@@ -471,7 +605,8 @@ class Pipeline(object):
 
         '''
         kw = dict(sklearn_method='predict', method_kwargs=method_kwargs,
-                  return_X=return_X, **data_source)
+                  return_X=return_X, chunk_size=chunk_size, n_jobs=n_jobs,
+                  **data_source)
         return self._run_steps(X, **kw)
 
     def fit_and_predict(self, *args, **kwargs):
@@ -487,7 +622,8 @@ class Pipeline(object):
     def predict_many(self, X=None, sampler=None, args_list=None,
                      client=None, ensemble=None, to_raster=True,
                      saved_model_tag=None,
-                     serialize=None, **data_source):
+                     serialize=None, chunk_size=None, n_jobs=None,
+                     **data_source):
         '''
         Predict from an ensemble of models for fixed X or series of
         sampler calls.
@@ -508,7 +644,8 @@ class Pipeline(object):
 
                See also ``elm.readers.inverse_flatten`` which converts
                1-D y to 2-D Dataset and ElmStore.  inverse_flatten is
-               called if to_raster is True
+               called if to_raster is True, otherwise predictions are
+               FlatStores (see elm.readers.as_elm_store)
             :saved_model_tag: This is a tag for an ensemble. An ensemble
                is a list of ``(tag, Pipeline)`` tuples and ``saved_model_tag`` is
                the higher level tag.  This argument is used in the
@@ -531,6 +668,9 @@ class Pipeline(object):
                     :elm_predict_path: is the root dir for serialization
                         output, defaulting to ELM_PREDICT_PATH from environment
                         variables
+            :chunk_size: rows per call of predict - see Pipeline.predict
+            :n_jobs: threads predicting chunks at once in each
+               prediction task - see Pipeline.predict
             :\*\*data_source: keyword args passed to the sampler on each call
 
         Returns:
@@ -547,7 +687,9 @@ class Pipeline(object):
                  client=client,
                  serialize=serialize,
                  to_raster=to_raster,
-                 saved_model_tag=saved_model_tag)
+                 saved_model_tag=saved_model_tag,
+                 chunk_size=chunk_size,
+                 n_jobs=n_jobs)
 
 
     def _score_estimator(self, X, y=None, sample_weight=None):
@@ -560,7 +702,7 @@ class Pipeline(object):
         kw = self.scoring_kwargs or {}
         kw['y'] = y
         kw['sample_weight'] = sample_weight
-        fit_args = (X,)
+        fit_args = (as_elm_store(X),)
         score_one_model(self, self.scoring, *fit_args, **kw)
 
     def __repr__(self):
@@ -5,13 +5,15 @@ import itertools
 import logging
 import os
 
-import dask
 import numpy as np
 import xarray as xr
 
 
 from elm.config import import_callable, parse_env_vars
-from elm.readers import inverse_flatten, ElmStore
+from elm.config.dask_settings import _find_get_func_for_client
+from elm.config.profiling import profile_task
+from elm.readers import (as_elm_store, as_flat_store, inverse_flatten,
+                         ElmStore, FlatStore)
 from elm.sample_util.samplers import make_samples_dask
 from elm.pipeline.util import _next_name
 
@@ -20,17 +22,22 @@ logger = logging.getLogger(__name__)
 __all__ = ['predict_many',]
 
 
+@profile_task('predict')
 def _predict_one_sample_one_arg(estimator,
                                 serialize,
                                 to_raster,
                                 predict_tag,
                                 elm_predict_path,
+                                chunk_size,
+                                n_jobs,
                                 X_y_sample_weight):
     X, y, sample_weight = X_y_sample_weight
-    if not isinstance(X, (ElmStore, xr.Dataset)):
-        raise ValueError('Expected an ElmStore or xarray.Dataset')
+    if not isinstance(X, (ElmStore, xr.Dataset, FlatStore)):
+        raise ValueError('Expected an ElmStore, xarray.Dataset or FlatStore')
     out = []
-    prediction, X_final = estimator.predict(X, return_X=True)
+    prediction, X_final = estimator.predict(X, return_X=True,
+                                            chunk_size=chunk_size,
+                                            n_jobs=n_jobs)
     if prediction.ndim == 1:
         prediction = prediction[:, np.newaxis]
         ndim = 2
@@ -39,25 +46,33 @@ def _predict_one_sample_one_arg(estimator,
     else:
         raise ValueError('Expected 1- or 2-d output of model.predict but found ndim of prediction: {}'.format(prediction.ndim))
 
-    bands = ['predict']
-    attrs = X_final.attrs
+    X_final = as_flat_store(X_final)
+    attrs = dict(X_final.attrs)
     attrs.update(X_final.flat.attrs)
     attrs['elm_predict_date'] = datetime.datetime.utcnow().isoformat()
     attrs['band_order'] = ['predict',]
-    logger.debug('Predict X shape {} X.flat.dims {} '
-                 '- y shape {}'.format(X_final.flat.shape, X_final.flat.dims, prediction.shape))
-    prediction = ElmStore({'flat': xr.DataArray(prediction,
-                                     coords=[('space', X_final.flat.space),
-                                             ('band', bands)],
-                                     dims=('space', 'band'),
-                                     attrs=attrs)},
-                             attrs=attrs)
+    logger.debug('Predict X shape {} - y shape {}'.format(X_final.flat.shape,
+                                                          prediction.shape))
+    if isinstance(X_final, FlatStore):
+        # rows of the prediction are the rows (mask) of X_final - an
+        # ElmStore is built only by inverse_flatten or serialize
+        prediction = FlatStore(prediction, ['predict'], mask=X_final.mask,
+                               canvas=X_final.canvas, attrs=attrs)
+    else:
+        # e.g. rows of X_final were shuffled
+        prediction = ElmStore({'flat': xr.DataArray(prediction,
+                                         coords=[('space', X_final.flat.space),
+                                                 ('band', ['predict'])],
+                                         dims=('space', 'band'),
+                                         attrs=attrs)},
+                                 attrs=attrs)
     if to_raster:
         new_es = inverse_flatten(prediction)
     else:
         new_es = prediction
     if serialize:
-        new_es = serialize(y=new_es, X=X_final, tag=predict_tag,
+        new_es = serialize(y=as_elm_store(new_es), X=as_elm_store(X_final),
+                           tag=predict_tag,
                            elm_predict_path=elm_predict_path)
     out.append(new_es)
     return out
@@ -69,7 +84,9 @@ def predict_many(data_source,
                  client=None,
                  serialize=None,
                  to_raster=True,
-                 elm_predict_path=None):
+                 elm_predict_path=None,
+                 chunk_size=None,
+                 n_jobs=None):
     '''See elm.pipeline.Pipeline.predict_many method
 
     '''
@@ -100,6 +117,8 @@ def predict_many(data_source,
                      to_raster,
                      predict_tag,
                      elm_predict_path,
+                     chunk_size,
+                     n_jobs,
                      sample_key,)
 
 
@@ -109,8 +128,6 @@ def predict_many(data_source,
                                          len(sample_keys),
                                          len(args_list)))
     preds = []
-    if client is None:
-        new = dask.get(dsk, keys)
-    else:
-        new = client.get(dsk, keys)
+    get_func = _find_get_func_for_client(client)
+    new = get_func(dsk, keys)
     return tuple(itertools.chain.from_iterable(new))
@@ -14,6 +14,8 @@ import attr
 import dill
 import numpy as np
 
+from elm.config.profiling import profile_task
+
 
 __all__ = ['serialize_pipe', 'serialize_prediction']
 
@@ -32,6 +34,7 @@ def mkdir_p(path):
         os.makedirs(os.path.dirname(path))
 
 
+@profile_task('serialize')
 def serialize_pipe(pipe, elm_train_path, tag, **meta):
     '''Save a Pipeline to a tag in elm_train_path
 
@@ -88,6 +91,7 @@ def predict_file_name(elm_predict_path, tag, bounds):
                                    bounds.top))
 
 
+@profile_task('serialize')
 def serialize_prediction(config, y, X, tag, **kwargs):
     '''This function is called by elm.pipeline.parse_run_config
     to serialize the prediction outputs of models run through
@@ -0,0 +1,261 @@
+'''
+----------------------
+
+``elm.pipeline.step_cache``
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Caches of the outputs of Pipeline transform steps, used by
+Pipeline(..., memory=...).
+
+Each call of a step before the final estimator is keyed by a
+hash of the step's pickled state (its params and any fitted
+attributes) before the call, whether it is a fit_transform or
+transform, and a hash of its input sample.  The input hash of a
+step after the first is the key of the step before it, so the
+sample is only hashed once per pass through the Pipeline.
+
+On a cache hit, the step's output (X, y, sample_weight) is loaded
+and, for fit_transform, the fitted step replaces the step in the
+Pipeline.  A fit_transform also stores its output as that of
+transform for the fitted step, so fit followed by predict on the
+same sample (fit_and_predict) transforms it once.
+
+ * MemoryStepCache: in this process, LRU eviction by total bytes.
+   Pipelines copied or unpickled in the same process share it;
+   each dask worker process has its own.
+ * DiskStepCache: files in a directory, evicting the least
+   recently used files by total bytes.  Use a directory on a
+   shared filesystem for dask-distributed workers to share it.
+
+Steps with random fitting (no random_state) return the output of
+the cached fit, as with sklearn's Pipeline memory.
+'''
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import uuid
+import weakref
+
+import dill
+from dask.base import tokenize
+import numpy as np
+import xarray as xr
+
+__all__ = ['StepCache', 'MemoryStepCache', 'DiskStepCache']
+
+logger = logging.getLogger(__name__)
+
+_MEMORY_CACHES = weakref.WeakValueDictionary()
+_MEMORY_CACHES_LOCK = threading.Lock()
+
+_ALIAS = b'elm.pipeline.step_cache alias:'
+
+
+class StepCache(object):
+    '''Base class of step caches.  Inheriting classes define
+    _get(key), returning bytes or None, and _set(key, data)'''
+    hits = 0
+    misses = 0
+
+    def get(self, key):
+        '''Return the cached value for key or None'''
+        return self.lookup(key)[1]
+
+    def lookup(self, key):
+        '''Return (key, value) where value is the cached value for key
+        or None, and key is the key of the value if key is an alias'''
+        data = self._get(key)
+        if data is not None and data.startswith(_ALIAS):
+            key = data[len(_ALIAS):].decode()
+            data = self._get(key)
+        if data is None:
+            self.misses += 1
+            return key, None
+        self.hits += 1
+        return key, dill.loads(data)
+
+    def set(self, key, value):
+        '''Cache value (pickled with dill) for key'''
+        self._set(key, dill.dumps(value))
+
+    def alias(self, key, target):
+        '''Make key return the value cached for target'''
+        self._set(key, _ALIAS + target.encode())
+
+
+class MemoryStepCache(StepCache):
+    '''Cache step outputs in this process
+
+    Parameters:
+        :max_bytes: evict least recently used outputs when the
+                    pickled outputs total more than max_bytes
+    '''
+    def __init__(self, max_bytes=2 ** 29, cache_id=None):
+        self.max_bytes = max_bytes
+        self.cache_id = cache_id or uuid.uuid4().hex
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        with _MEMORY_CACHES_LOCK:
+            _MEMORY_CACHES[self.cache_id] = self
+
+    def _get(self, key):
+        with self._lock:
+            data = self._data.get(key)
+            if data is not None:
+                self._data.move_to_end(key)
+            return data
+
+    def _set(self, key, data):
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self._data[key] = data
+            self.nbytes += len(data)
+            while self.max_bytes is not None and self.nbytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __reduce__(self):
+        # Copies (copy.deepcopy, pickling to a worker) share the
+        # cache with the same cache_id in that process
+        return (_memory_step_cache, (self.cache_id, self.max_bytes))
+
+    def __repr__(self):
+        return '<MemoryStepCache> {} outputs, {} bytes'.format(len(self), self.nbytes)
+
+
+def _memory_step_cache(cache_id, max_bytes):
+    with _MEMORY_CACHES_LOCK:
+        cache = _MEMORY_CACHES.get(cache_id)
+    if cache is None:
+        cache = MemoryStepCache(max_bytes=max_bytes, cache_id=cache_id)
+    return cache
+
+
+class DiskStepCache(StepCache):
+    '''Cache step outputs as files in a directory
+
+    Parameters:
+        :path:      directory, created if needed
+        :max_bytes: evict least recently used files when the files
+                    total more than max_bytes (None for no limit)
+    '''
+    def __init__(self, path, max_bytes=2 ** 32):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+    def _fname(self, key):
+        return os.path.join(self.path, key + '.pkl')
+
+    def _get(self, key):
+        fname = self._fname(key)
+        try:
+            with open(fname, 'rb') as f:
+                data = f.read()
+            os.utime(fname)
+        except (IOError, OSError):
+            return None
+        return data
+
+    def _set(self, key, data):
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._fname(key))
+        if self.max_bytes is not None:
+            self._evict()
+
+    def _evict(self):
+        files = []
+        for fname in self._files():
+            try:
+                st = os.stat(fname)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, fname))
+        total = sum(size for _, size, _ in files)
+        for _, size, fname in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+            total -= size
+
+    def _files(self):
+        return [os.path.join(self.path, fname) for fname in os.listdir(self.path)
+                if fname.endswith('.pkl')]
+
+    def clear(self):
+        for fname in self._files():
+            os.remove(fname)
+
+    def __repr__(self):
+        return '<DiskStepCache> {}'.format(self.path)
+
+
+def _as_step_cache(memory):
+    '''Return a StepCache for the Pipeline "memory" argument: None,
+    a directory name or a StepCache'''
+    if memory is None or isinstance(memory, StepCache):
+        return memory
+    if isinstance(memory, str):
+        return DiskStepCache(memory)
+    raise ValueError('Expected memory to be None, a directory name or an '
+                     'elm.pipeline.step_cache.StepCache.  Got {}'.format(memory))
+
+
+def _array_token(arr):
+    # dask's tokenize does not hash the data of non-contiguous arrays
+    return tokenize(np.ascontiguousarray(arr))
+
+
+def _normalize(obj):
+    '''Convert a sample or attrs to a tuple for dask's tokenize,
+    hashing array data rather than repr'ing it'''
+    if isinstance(obj, xr.Dataset):
+        return (type(obj).__name__, _normalize(obj.attrs),
+                tuple((name, _normalize(obj[name])) for name in obj.data_vars))
+    if isinstance(obj, xr.DataArray):
+        coords = tuple((name, _array_token(obj.coords[name].values))
+                       for name in sorted(obj.coords))
+        return ('DataArray', obj.dims, _array_token(obj.values), coords,
+                _normalize(obj.attrs))
+    if isinstance(obj, np.ndarray):
+        return _array_token(obj)
+    if isinstance(obj, dict):
+        return tuple((repr(k), _normalize(v)) for k, v in sorted(obj.items(), key=lambda item: repr(item[0])))
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__,) + tuple(_normalize(v) for v in obj)
+    return repr(obj)
+
+
+def _sample_token(X, y=None, sample_weight=None):
+    '''Hash of a sample (X, y, sample_weight)'''
+    return tokenize(_normalize(X), _normalize(y), _normalize(sample_weight))
+
+
+def _step_token(step):
+    '''Hash of a step's params and fitted state'''
+    return hashlib.sha1(dill.dumps(step)).hexdigest()
+
+
+def _step_key(step, method, input_token):
+    return tokenize(_step_token(step), method, input_token)
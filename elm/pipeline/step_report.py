@@ -0,0 +1,210 @@
+'''
+----------------------
+
+``elm.pipeline.step_report``
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Per-step timing and memory records for Pipeline._run_steps.
+
+Each call of a step's fit_transform / transform and each call
+of the final estimator's fit / partial_fit / predict appends one
+record (a dict with keys STEP_REPORT_COLUMNS) to the Pipeline's
+"step_report" list.  The list is reset on each fit, transform,
+predict... call of the Pipeline, so it holds the records of the
+last call only (predicting many tiles does not grow it).
+
+ensemble and evolve_train keep the records of all calls of their
+members during a generation (see _keep_step_report), then gather
+them with "generation" and "tag" added, clearing the members' lists.
+
+Memory notes:
+
+ * max_rss_delta is the increase in the process's peak resident
+   set size during the step (0 if the step did not raise the peak).
+   It is process wide, so steps running at the same time in a
+   ThreadPool share it.
+ * bytes_allocated is the net change in memory traced by
+   tracemalloc during the step, only recorded if tracemalloc has
+   been started (tracemalloc.start()), else None.
+
+With Pipeline(..., memory=...), "cache" is "hit" or "miss" for
+transform steps (see elm.pipeline.step_cache), else None.
+'''
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+__all__ = ['STEP_REPORT_COLUMNS', 'step_report_frame',
+           'summarize_step_report', 'export_step_report']
+
+logger = logging.getLogger(__name__)
+
+STEP_REPORT_COLUMNS = ['generation', 'tag', 'step', 'method',
+                       'wall_time', 'cpu_time', 'max_rss_delta',
+                       'bytes_allocated', 'input_shape', 'input_dtype',
+                       'output_shape', 'output_dtype', 'cache']
+
+# ru_maxrss is in kilobytes on Linux, bytes on Mac OS X
+_MAXRSS_UNITS = 1 if sys.platform == 'darwin' else 1024
+
+
+def _max_rss():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNITS
+
+
+def _traced_memory():
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _shape_dtype(X):
+    '''Return (shape, dtype) strings for an ElmStore, Dataset,
+    array or tuple of (X, y, sample_weight)'''
+    if isinstance(X, tuple) and X:
+        X = X[0]
+    if isinstance(X, xr.Dataset):
+        if 'flat' in X.data_vars:
+            X = X.flat
+        else:
+            bands = list(X.data_vars)
+            if not bands:
+                return None, None
+            first = X[bands[0]]
+            shape = '{} bands x {}'.format(len(bands), tuple(first.shape))
+            dtypes = sorted(set(str(X[b].dtype) for b in bands))
+            return shape, ','.join(dtypes)
+    shape = getattr(X, 'shape', None)
+    dtype = getattr(X, 'dtype', None)
+    if shape is None:
+        return None, None
+    return str(tuple(shape)), str(dtype) if dtype is not None else None
+
+
+def _run_step(func, step, method, X, *args, **kwargs):
+    '''Call func(X, *args, **kwargs), returning (output, record)
+    where record is a dict of timing / memory for the step'''
+    input_shape, input_dtype = _shape_dtype(X)
+    rss = _max_rss()
+    traced = _traced_memory()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    output = func(X, *args, **kwargs)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    if rss is not None:
+        rss = _max_rss() - rss
+    if traced is not None:
+        after = _traced_memory()
+        traced = None if after is None else after - traced
+    output_shape, output_dtype = _shape_dtype(output)
+    record = {'generation': None, 'tag': None,
+              'step': step, 'method': method,
+              'wall_time': wall, 'cpu_time': cpu,
+              'max_rss_delta': rss, 'bytes_allocated': traced,
+              'input_shape': input_shape, 'input_dtype': input_dtype,
+              'output_shape': output_shape, 'output_dtype': output_dtype,
+              'cache': None}
+    return output, record
+
+
+def _keep_step_report(model):
+    '''Keep the step report records of all calls of an ensemble /
+    evolve_train member Pipeline until _gather_step_reports'''
+    model._keep_step_report = True
+    return model
+
+
+def _gather_step_reports(models, generation):
+    '''Collect the records of (tag, Pipeline) models not gathered on
+    an earlier generation, setting "generation" and "tag" in them,
+    and clear the models' records (later calls of the models, e.g.
+    predict, keep the records of the last call only)'''
+    records = []
+    for tag, model in models:
+        for record in getattr(model, 'step_report', None) or ():
+            if record['generation'] is None:
+                record['generation'] = generation
+                record['tag'] = tag
+                records.append(record)
+        model.step_report = []
+        model._keep_step_report = False
+    return records
+
+
+def step_report_frame(records):
+    '''Convert a list of step report records to a pandas.DataFrame
+
+    Parameters:
+        :records: list of dicts, e.g. Pipeline.step_report
+
+    Returns:
+        :df: pandas.DataFrame with columns STEP_REPORT_COLUMNS
+    '''
+    return pd.DataFrame(list(records), columns=STEP_REPORT_COLUMNS)
+
+
+def summarize_step_report(records):
+    '''Sum the timing / memory of step report records by step and method
+
+    Parameters:
+        :records: list of dicts or DataFrame from step_report_frame
+
+    Returns:
+        :df: pandas.DataFrame indexed by (step, method) with
+             the count of calls and the total and mean wall_time
+             and cpu_time, and the max of max_rss_delta and
+             bytes_allocated, sorted by total wall_time, slowest first
+    '''
+    if not isinstance(records, pd.DataFrame):
+        records = step_report_frame(records)
+    numeric = ['wall_time', 'cpu_time', 'max_rss_delta', 'bytes_allocated']
+    records = records.copy()
+    records[numeric] = records[numeric].astype(np.float64)
+    groups = records.groupby(['step', 'method'], sort=False)
+    summary = pd.DataFrame({'calls': groups.size(),
+                            'wall_time': groups.wall_time.sum(),
+                            'wall_time_mean': groups.wall_time.mean(),
+                            'cpu_time': groups.cpu_time.sum(),
+                            'cpu_time_mean': groups.cpu_time.mean(),
+                            'max_rss_delta': groups.max_rss_delta.max(),
+                            'bytes_allocated': groups.bytes_allocated.max()})
+    return summary.sort_values('wall_time', ascending=False)
+
+
+def export_step_report(records, filename):
+    '''Write step report records to filename, as JSON if filename
+    ends with ".json", otherwise CSV
+
+    Parameters:
+        :records: list of dicts, e.g. Pipeline.step_report
+        :filename: path of CSV or JSON file
+
+    Returns:
+        :filename: the filename written
+    '''
+    dirname = os.path.dirname(filename)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname)
+    if filename.endswith('.json'):
+        with open(filename, 'w') as f:
+            json.dump([{k: r.get(k) for k in STEP_REPORT_COLUMNS}
+                       for r in records], f, indent=1)
+    else:
+        step_report_frame(records).to_csv(filename, index=False)
+    logger.info('Wrote step report of {} records to {}'.format(len(records), filename))
+    return filename
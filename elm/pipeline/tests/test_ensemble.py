@@ -16,7 +16,7 @@ import copy
 from itertools import product
 import os
 
-from sklearn.cluster import MiniBatchKMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.linear_model import SGDClassifier
 from sklearn.decomposition import IncrementalPCA
 from sklearn.feature_selection import f_classif
@@ -30,6 +30,8 @@ from elm.readers import *
 from elm.pipeline import Pipeline, steps
 from elm.pipeline.tests.util import random_elm_store
 from elm.model_selection.kmeans import kmeans_model_averaging, kmeans_aic
+from elm.model_selection.successive_halving import (successive_halving,
+                                                    successive_halving_batches)
 
 ENSEMBLE_KWARGS = dict(ngen=2, init_ensemble_size=2,
                        saved_ensemble_size=2,
@@ -184,3 +186,37 @@ def test_kmeans_model_selection(client=None):
     assert len(fitted.ensemble) == en['saved_ensemble_size']
     preds = fitted.predict_many(**sa)
     assert len(preds) == len(fitted.ensemble) * len(SAMPLER_DATA_SOURCE['args_list'])
+
+
+@dist_test
+def test_kmeans_successive_halving(client=None):
+    pipe = Pipeline([steps.Flatten(),
+                    ('kmeans', MiniBatchKMeans(n_clusters=5))],
+                    scoring=kmeans_aic,
+                    scoring_kwargs={'score_weights': [-1]})
+    def init(pipe, **kwargs):
+        return [pipe.new_with_params(kmeans__n_clusters=n_clusters)
+                for n_clusters in range(2, 11)]
+    en = dict(ngen=3, saved_ensemble_size=1,
+              ensemble_init_func=init,
+              model_selection=successive_halving,
+              model_selection_kwargs=dict(eta=3),
+              partial_fit_batches=successive_halving_batches(3, eta=3))
+    en.update(SAMPLER_DATA_SOURCE)
+    fitted = pipe.fit_ensemble(**en)
+    _train_asserts(fitted, en['saved_ensemble_size'])
+
+
+@dist_test
+def test_warm_start(client=None):
+    pipe = Pipeline([steps.Flatten(),
+                    ('kmeans', KMeans(n_clusters=4))])
+    en = dict(ngen=3, init_ensemble_size=2, saved_ensemble_size=2,
+              warm_start=True)
+    en.update(SAMPLER_DATA_SOURCE)
+    fitted = pipe.fit_ensemble(**en)
+    _train_asserts(fitted, en['saved_ensemble_size'])
+    for tag, model in fitted.ensemble:
+        est = model._estimator
+        assert est.n_init == 1
+        assert est.init.shape == est.cluster_centers_.shape
@@ -37,7 +37,8 @@ def synthetic_centers(n_clusters, n_features):
             for nc in range(1, 1 + n_clusters * 10000, 10000)]
 
 
-def tst_finds_true_n_clusters_once(n_clusters, n_features, early_stop):
+def tst_finds_true_n_clusters_once(n_clusters, n_features, early_stop,
+                                   steady_state=False):
     pfile = 'kmeans.csv' # EA parameters output CSV from config
     if os.path.exists(pfile):
         os.remove(pfile)
@@ -58,10 +59,13 @@ def tst_finds_true_n_clusters_once(n_clusters, n_features, early_stop):
     syn['sampler_args'] = None
     tag = 'test_sklearn_finds_n_clusters_{}'
     tag = tag.format(n_clusters) + '_' + '_'.join(early_stop.keys() if early_stop else "None")
+    if steady_state:
+        tag += '_steady_state'
     pg = config['param_grids']['example_param_grid']
     pg = {k: v for k, v in pg.items() if not k.startswith('pca')}
     pg['control']['mu'] = 16
     pg['control']['k'] = 8
+    pg['control']['steady_state'] = steady_state
     if not early_stop:
         pg['control']['ngen'] = 3
     else:
@@ -97,6 +101,11 @@ def test_finds_true_num_clusters_fast():
     tst_finds_true_n_clusters_once(*pytest_args[0])
 
 
+@pytest.mark.flaky(3)
+def test_finds_true_num_clusters_steady_state():
+    tst_finds_true_n_clusters_once(*pytest_args[0], steady_state=True)
+
+
 @pytest.mark.slow
 @pytest.mark.parametrize('n_clusters, n_features, early_stop', pytest_args)
 def test_finds_true_num_clusters_slow(n_clusters, n_features, early_stop):
@@ -0,0 +1,34 @@
+import subprocess as sp
+import sys
+
+import pytest
+
+from elm.model_selection.sklearn_support import (MODELS_WITH_PREDICT_DICT,
+                                                 MODELS_WITH_PREDICT_STR,
+                                                 UNSUPERVISED_MODEL_STR)
+
+# Imported on first use, not by "import elm.pipeline"
+LAZY_MODULES = ('gdal', 'rasterio', 'netCDF4', 'matplotlib', 'numba',
+                'sklearn.cluster', 'sklearn.decomposition',
+                'sklearn.feature_selection')
+
+CODE = '''
+import sys
+import {}
+print(' '.join(m for m in {} if m in sys.modules))
+'''
+
+
+@pytest.mark.parametrize('module', ['elm.pipeline', 'elm.scripts.main'])
+def test_heavy_modules_not_imported(module):
+    out = sp.check_output([sys.executable, '-c',
+                           CODE.format(module, repr(LAZY_MODULES))])
+    assert out.decode().split() == []
+
+
+def test_lazy_sklearn_registries():
+    from sklearn.cluster import MiniBatchKMeans
+    assert MODELS_WITH_PREDICT_DICT['sklearn.cluster:MiniBatchKMeans'] is MiniBatchKMeans
+    assert sorted(MODELS_WITH_PREDICT_DICT) == sorted(set(MODELS_WITH_PREDICT_STR))
+    assert 'sklearn.cluster:MiniBatchKMeans' in UNSUPERVISED_MODEL_STR
+    assert len(list(UNSUPERVISED_MODEL_STR)) == len(UNSUPERVISED_MODEL_STR)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from sklearn.cluster import MiniBatchKMeans
+
+from elm.pipeline import Pipeline, steps
+from elm.pipeline.tests.util import random_elm_store
+from elm.pipeline.util import _predict_chunks
+
+
+@pytest.mark.parametrize('n_jobs', [None, 1, 3])
+def test_predict_chunked(n_jobs):
+    X = random_elm_store(bands=3, height=20, width=30)
+    pipe = Pipeline([steps.Flatten(),
+                     MiniBatchKMeans(n_clusters=3, random_state=0)]).fit(X)
+    pred = pipe.predict(X)
+    pred2, X2 = pipe.predict(X, chunk_size=7, n_jobs=n_jobs, return_X=True)
+    assert np.array_equal(pred, pred2)
+    assert X2.flat.values.shape == (600, 3)
+    preds = pipe.predict_many(X=X, to_raster=False, ensemble=[('tag', pipe)],
+                              chunk_size=100, n_jobs=n_jobs)
+    assert np.array_equal(preds[0].flat.values[:, 0], pred)
+
+
+def test_predict_chunks_wrapper():
+    calls = []
+    def predict(X):
+        calls.append(X.shape[0])
+        return np.array(['a' * int(x) for x in X[:, 0]])
+    assert _predict_chunks(predict) is predict
+    X = np.arange(10)[:, np.newaxis]
+    pred = _predict_chunks(predict, chunk_size=4, n_jobs=1)(X)
+    assert sorted(calls) == [2, 4, 4]
+    assert list(pred) == ['a' * i for i in range(10)]
+    assert pred.dtype == np.dtype('<U9')
+    pred = _predict_chunks(predict, chunk_size=4.)(X)
+    assert pred.dtype == predict(X).dtype
+    for chunk_size in (-1, 2.5):
+        with pytest.raises(ValueError):
+            _predict_chunks(predict, chunk_size=chunk_size)
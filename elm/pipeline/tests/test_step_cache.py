@@ -0,0 +1,90 @@
+import copy
+import os
+
+import dill
+import numpy as np
+import pytest
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import PCA
+
+from elm.pipeline import Pipeline, steps
+from elm.pipeline.step_cache import (MemoryStepCache, DiskStepCache,
+                                     _sample_token)
+from elm.pipeline.tests.util import random_elm_store
+
+
+def _pipeline(memory, n_components=2):
+    return Pipeline([('flat', steps.Flatten()),
+                     ('pca', steps.Transform(PCA(n_components=n_components))),
+                     ('kmeans', MiniBatchKMeans(n_clusters=3, random_state=0))],
+                    memory=memory)
+
+
+@pytest.mark.parametrize('disk', [False, True])
+def test_fit_and_predict_cached(tmpdir, disk):
+    memory = DiskStepCache(str(tmpdir)) if disk else MemoryStepCache()
+    X = random_elm_store(bands=3, height=20, width=30)
+    pred = _pipeline(None).fit(X).predict(X)
+    pipe = _pipeline(memory).fit(X)
+    assert list(pipe.step_report_frame().cache) == ['miss', 'miss', None]
+    assert np.array_equal(pipe.predict(X), pred)
+    # transform of the sample the steps were fit on is cached
+    assert list(pipe.step_report_frame().cache[-3:]) == ['hit', 'hit', None]
+    pipe2 = pipe.unfitted_copy()
+    assert pipe2.memory is memory or disk
+    pipe2.fit(X)
+    assert list(pipe2.step_report_frame().cache) == ['hit', 'hit', None]
+    # the fitted PCA was restored from the cache
+    assert np.array_equal(pipe2.steps[1][1]._estimator.components_,
+                          pipe.steps[1][1]._estimator.components_)
+    assert np.array_equal(pipe2.predict(X), pred)
+    # different params or sample are not hits
+    _pipeline(memory, n_components=1).fit(X)
+    pipe3 = _pipeline(memory).fit(random_elm_store(bands=3, height=20, width=30))
+    assert list(pipe3.step_report_frame().cache) == ['miss', 'miss', None]
+
+
+def test_ensemble_cached():
+    memory = MemoryStepCache()
+    X = random_elm_store(bands=3, height=20, width=30)
+    sampler = lambda *args, **kwargs: X
+    pipe = _pipeline(memory)
+    pipe.fit_ensemble(sampler=sampler, args_list=[()], ngen=2,
+                      init_ensemble_size=3)
+    df = pipe.step_report_frame(ensemble=True)
+    # one sample, so the members share transform outputs
+    assert (df.cache[df.step != 'kmeans'] == 'hit').sum() > 0
+    assert memory.hits > 0
+
+
+def test_memory_cache_shared_and_evicted():
+    memory = MemoryStepCache(max_bytes=int(len(dill.dumps(np.ones(4))) * 1.5))
+    pipe = _pipeline(memory)
+    assert copy.deepcopy(pipe).memory is memory
+    assert dill.loads(dill.dumps(pipe)).memory is memory
+    memory.set('a', np.ones(4))
+    assert np.array_equal(memory.get('a'), np.ones(4))
+    memory.set('b', np.ones(4))
+    assert memory.get('a') is None
+    assert len(memory) == 1 and memory.nbytes <= memory.max_bytes
+    memory.alias('c', 'b')
+    assert memory.lookup('c')[0] == 'b'
+
+
+def test_disk_cache_evicted(tmpdir):
+    memory = DiskStepCache(str(tmpdir), max_bytes=300)
+    for key in 'abcd':
+        memory.set(key, np.ones(10))
+    assert len(os.listdir(str(tmpdir))) < 4
+    assert memory.get('d') is not None
+    pipe = Pipeline([steps.Flatten(), MiniBatchKMeans()], memory=str(tmpdir))
+    assert pipe.memory.path == str(tmpdir)
+
+
+def test_sample_token():
+    X = random_elm_store(bands=2, height=10, width=10)
+    X2 = copy.deepcopy(X)
+    assert _sample_token(X) == _sample_token(X2)
+    X2.band_1.values[5, 5] += 1
+    assert _sample_token(X) != _sample_token(X2)
+    assert _sample_token(X, y=np.ones(3)) != _sample_token(X)
@@ -0,0 +1,106 @@
+import json
+import os
+import tracemalloc
+
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+import pandas as pd
+import pytest
+
+from elm.pipeline import Pipeline, steps
+from elm.pipeline.step_report import (STEP_REPORT_COLUMNS,
+                                      summarize_step_report,
+                                      export_step_report)
+from elm.pipeline.tests.util import random_elm_store
+from elm.model_selection.evolve import ea_setup
+from elm.model_selection.kmeans import kmeans_aic
+
+
+def _pipeline():
+    return Pipeline([('flat', steps.Flatten()),
+                     ('pca', steps.Transform(IncrementalPCA(n_components=2))),
+                     ('kmeans', MiniBatchKMeans(n_clusters=3))],
+                    scoring=kmeans_aic,
+                    scoring_kwargs={'score_weights': [-1]})
+
+
+def sampler(*args, **kwargs):
+    return random_elm_store(bands=3, height=20, width=30)
+
+
+def test_pipeline_step_report():
+    X = sampler()
+    pipe = _pipeline().fit(X)
+    df = pipe.step_report_frame()
+    assert list(df.columns) == STEP_REPORT_COLUMNS
+    assert list(df.step) == ['flat', 'pca', 'kmeans']
+    assert list(df.method) == ['fit_transform', 'fit_transform', 'fit']
+    assert df.input_shape.iloc[0] == '3 bands x (20, 30)'
+    assert df.output_shape.iloc[0] == '(600, 3)'
+    assert df.output_shape.iloc[1] == '(600, 2)'
+    assert (df.wall_time >= 0).all()
+    assert df.bytes_allocated.isnull().all()
+    pipe.predict(X)
+    df = pipe.step_report_frame()
+    assert list(df.method[-2:]) == ['transform', 'predict']
+    assert df.output_shape.iloc[-1] == '(600,)'
+    summary = summarize_step_report(pipe.step_report)
+    assert summary.calls.sum() == len(df)
+    # only the records of the last call are kept
+    for _ in range(3):
+        pipe.predict(X)
+    assert list(pipe.step_report_frame().method)[1:] == ['transform', 'predict']
+
+
+def test_tracemalloc_bytes_allocated():
+    tracemalloc.start()
+    try:
+        pipe = _pipeline().fit(sampler())
+    finally:
+        tracemalloc.stop()
+    assert pipe.step_report_frame().bytes_allocated.notnull().all()
+
+
+@pytest.mark.parametrize('ext', ['.csv', '.json'])
+def test_ensemble_step_report(tmpdir, ext):
+    fname = os.path.join(str(tmpdir), 'step_report' + ext)
+    pipe = _pipeline()
+    pipe.fit_ensemble(sampler=sampler, args_list=[()] * 2, ngen=2,
+                      init_ensemble_size=2, step_report_file=fname)
+    df = pipe.step_report_frame(ensemble=True)
+    # 2 generations x 2 members x 3 steps
+    assert len(df) == 12
+    assert sorted(set(df.generation)) == [0, 1]
+    assert df.tag.notnull().all()
+    if ext == '.csv':
+        saved = pd.read_csv(fname)
+        assert len(saved) == 12
+    else:
+        with open(fname) as f:
+            assert len(json.load(f)) == 12
+    # records are only gathered once
+    assert len(export_step_report(pipe.ensemble_step_report, fname + ext)) > 0
+
+
+def test_fit_ea_step_report(tmpdir):
+    param_grid = {'kmeans__n_clusters': [2, 3, 4],
+                  'pca__n_components': [1, 2],
+                  'control': {'select_method': 'selNSGA2',
+                              'crossover_method': 'cxTwoPoint',
+                              'mutate_method': 'mutUniformInt',
+                              'init_pop': 'random',
+                              'indpb': 0.5, 'mutpb': 0.9, 'cxpb': 0.3,
+                              'eta': 20, 'ngen': 2, 'mu': 4, 'k': 4}}
+    evo_params = ea_setup(param_grid=param_grid,
+                          param_grid_name='step_report_grid',
+                          score_weights=[-1])
+    evo_params.history_file = os.path.join(str(tmpdir), 'history.csv')
+    pipe = _pipeline()
+    pipe.fit_ea(sampler=sampler, args_list=[()] * 2, evo_params=evo_params,
+                step_report_file='step_report.csv')
+    fname = os.path.join(str(tmpdir), 'step_report.csv')
+    assert os.path.exists(fname)
+    df = pipe.step_report_frame(ensemble=True)
+    assert len(df) == len(pd.read_csv(fname))
+    assert len(df) % 3 == 0 and len(df) >= 12
+    assert set(df.generation) <= {0, 1}
@@ -7,6 +7,12 @@
 Internal helpers for elm.pipeline'''
 
 from collections import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+import itertools
+import os
+
+import numpy as np
 
 from elm.model_selection.evolve import ea_setup
 from elm.config import import_callable
@@ -19,14 +25,56 @@ NO_ENSEMBLE = {'init_ensemble_size': 1,
                'partial_fit_batches': 1,
                'saved_ensemble_size': 1,}
 
-_next_idx = 0
+_next_idx = itertools.count()
 
 def _next_name(token):
-    '''name in a dask graph'''
-    global _next_idx
-    n = '{}-{}'.format(token, _next_idx)
-    _next_idx += 1
-    return n
+    '''name in a dask graph (unique across threads)'''
+    return '{}-{}'.format(token, next(_next_idx))
+
+
+def _predict_chunks(predict, chunk_size=None, n_jobs=None):
+    '''Wrap predict to predict on chunks of up to chunk_size rows,
+    on n_jobs threads (default: number of cpus), writing each chunk's
+    output into one array.  Memory for predict's copies of X
+    (e.g. in sklearn's check_array) scales with chunk_size * n_jobs
+    rather than the number of rows.  The returned function is
+    predict if chunk_size is None'''
+    if not chunk_size:
+        return predict
+    if int(chunk_size) != chunk_size or chunk_size < 1:
+        raise ValueError('Expected chunk_size to be None or an integer '
+                         '> 0 (got {})'.format(chunk_size))
+    chunk_size = int(chunk_size)
+    @wraps(predict)
+    def predict_chunks(X, **kwargs):
+        nrows = X.shape[0]
+        if nrows <= chunk_size:
+            return predict(X, **kwargs)
+        first = np.asarray(predict(X[:chunk_size], **kwargs))
+        # string labels of later chunks may be longer than the first's
+        kind = first.dtype.kind
+        dtype = object if kind in 'SU' else first.dtype
+        out = np.empty((nrows,) + first.shape[1:], dtype=dtype)
+        out[:chunk_size] = first
+        del first
+        def predict_chunk(start):
+            stop = start + chunk_size
+            out[start:stop] = predict(X[start:stop], **kwargs)
+        starts = range(chunk_size, nrows, chunk_size)
+        workers = min(n_jobs or os.cpu_count() or 1, len(starts))
+        if workers == 1:
+            for start in starts:
+                predict_chunk(start)
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                for _ in pool.map(predict_chunk, starts):
+                    pass
+        if kind in 'SU':
+            # back to a fixed width string dtype, as from an unchunked predict
+            return out.astype(kind)
+        return out
+    return predict_chunks
+
 
 def _validate_ensemble_members(models):
     '''Take a list of estimators or a list of (tag, estimator) tuples
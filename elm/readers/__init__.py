@@ -1,11 +1,16 @@
 '''Package of readers from common satellite and weather data formats'''
 # The modules below use __all__
 from elm.readers.elm_store import *
+from elm.readers.flat_store import *
 from elm.readers.hdf4 import *
 from elm.readers.hdf5 import *
 from elm.readers.netcdf import *
 from elm.readers.tif import *
 from elm.readers.util import *
+from elm.readers.packed import *
 from elm.readers.reshape import *
 from elm.readers.load_array import *
 from elm.readers.local_file_iterators import *
+from elm.readers.granule_index import *
+from elm.readers.band_stats import *
+from elm.readers.ts_cube import *
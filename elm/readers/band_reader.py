@@ -0,0 +1,166 @@
+'''
+---------------------------
+
+``elm.readers.band_reader``
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Concurrent reading of the bands of a file (or TIF directory).
+
+The HDF4, HDF5 and GeoTiff readers first work out what to read for
+each band, then call read_bands to read all bands on a thread pool,
+each band into its own preallocated array, then assemble the ElmStore.
+GDAL and rasterio release the GIL while reading and decompressing,
+so the time to load a file with N bands is close to the time to read
+its largest band rather than the sum over bands.
+
+The number of threads is, in order of precedence, the n_threads
+argument of the load_*_array functions, the ELM_READ_THREADS
+environment variable, or the number of bands (at most the number
+of cpus).
+
+Reduced resolution reads: when buf_xsize / buf_ysize of a BandSpec
+are smaller than the band (or window), GDAL reads from the coarsest
+overview at least as fine as the requested resolution, so a read at
+1/8 resolution only decodes the 1/8 overview level if the file has
+one.  With ``BandSpec(..., build_overviews=True)`` a file without
+overviews gets external ".ovr" overviews (factors 2, 4, 8... up to
+the requested reduction) built on first use, then cached on disk
+for later reads.
+'''
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+
+import numpy as np
+
+from elm.readers.handle_pool import open_gdal
+
+__all__ = ['read_bands', 'gdal_read_array',
+           'overview_factors', 'build_overviews']
+
+logger = logging.getLogger(__name__)
+
+# nearest neighbor, like reads without overviews, keeps fill values
+# of packed bands intact
+OVERVIEW_RESAMPLING = 'NEAREST'
+
+
+def _n_threads(n_threads, n_bands):
+    if not n_threads:
+        n_threads = int(os.environ.get('ELM_READ_THREADS') or 0)
+    if not n_threads:
+        n_threads = os.cpu_count() or 1
+    return max(1, min(n_threads, n_bands))
+
+
+def read_bands(readers, n_threads=None):
+    '''Call each of readers (functions taking no arguments, each
+    reading one band) on a thread pool
+
+    Parameters:
+        :readers:   list of callables
+        :n_threads: number of bands read at once, default: the
+                    ELM_READ_THREADS environment variable or the
+                    number of cpus.  1 reads bands one at a time
+                    in this thread
+
+    Returns:
+        :outputs:   list of outputs of readers (in order of readers)
+    '''
+    readers = list(readers)
+    n_threads = _n_threads(n_threads, len(readers))
+    logger.debug('Read {} bands with {} threads'.format(len(readers), n_threads))
+    if n_threads == 1:
+        return [reader() for reader in readers]
+    with ThreadPoolExecutor(n_threads) as pool:
+        futures = [pool.submit(reader) for reader in readers]
+        return [future.result() for future in futures]
+
+
+def overview_factors(size, buf_size):
+    '''Overview factors (2, 4, 8...) at least as fine as a read of
+    size (xsize, ysize) into buf_size (buf_xsize, buf_ysize)
+
+    Returns:
+        :factors: list of ints, empty if buf_size is not at least
+                  2 times smaller than size (in x and y)
+    '''
+    reductions = [s / float(b) for s, b in zip(size, buf_size) if b]
+    if not reductions:
+        return []
+    reduction = min(reductions)
+    factors = []
+    factor = 2
+    while factor <= reduction:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+def _build_overviews(data_file, name, **reader_kwargs):
+    size = (reader_kwargs.get('xsize') or data_file.RasterXSize,
+            reader_kwargs.get('ysize') or data_file.RasterYSize)
+    buf_size = (reader_kwargs.get('buf_xsize'), reader_kwargs.get('buf_ysize'))
+    factors = overview_factors(size, buf_size)
+    if not factors or data_file.GetRasterBand(1).GetOverviewCount():
+        return False
+    logger.info('Build overviews {} of {}'.format(factors, name))
+    try:
+        built = data_file.BuildOverviews(OVERVIEW_RESAMPLING, factors) == 0
+    except RuntimeError as e:
+        # e.g. a read only directory, with gdal.UseExceptions()
+        logger.info('Failed to build overviews of {}: {}'.format(name, repr(e)))
+        return False
+    if not built:
+        logger.info('Failed to build overviews of {}'.format(name))
+    return built
+
+
+def build_overviews(name, **reader_kwargs):
+    '''Build external (.ovr) overviews of a GDAL dataset or
+    subdataset that has none, if reader_kwargs read it at
+    2 times (or more) reduced resolution
+
+    Parameters:
+        :name:          filename or subdataset name for gdal.Open
+        :reader_kwargs: kwargs to ReadAsArray (xsize, ysize,
+                        buf_xsize, buf_ysize...)
+
+    Returns:
+        :built: True if overviews were built
+    '''
+    with open_gdal(name) as data_file:
+        return _build_overviews(data_file, name, **reader_kwargs)
+
+
+def gdal_read_array(subdataset, build_overviews=False, **reader_kwargs):
+    '''Read a GDAL dataset or subdataset into a preallocated array,
+    using a handle from elm.readers.handle_pool
+
+    Parameters:
+        :subdataset:      filename or subdataset name for gdal.Open
+        :build_overviews: build external overviews on first use if
+                          reading at reduced resolution (see
+                          elm.readers.band_reader.build_overviews)
+        :reader_kwargs:   kwargs to ReadAsArray, e.g. from
+                          elm.readers.util.window_to_gdal_read_kwargs
+
+    Returns:
+        :(raster, geo_transform): numpy array of dataset's bands and
+                          geo_transform of the dataset from GDAL
+    '''
+    import gdal_array
+    with open_gdal(subdataset) as data_file:
+        if build_overviews:
+            _build_overviews(data_file, subdataset, **reader_kwargs)
+        band = data_file.GetRasterBand(1)
+        dtype = gdal_array.GDALTypeCodeToNumericTypeCode(band.DataType)
+        shape = (reader_kwargs.get('buf_ysize') or reader_kwargs.get('ysize') or data_file.RasterYSize,
+                 reader_kwargs.get('buf_xsize') or reader_kwargs.get('xsize') or data_file.RasterXSize)
+        if data_file.RasterCount > 1:
+            shape = (data_file.RasterCount,) + shape
+        raster = np.empty(shape, dtype=dtype)
+        data_file.ReadAsArray(buf_obj=raster, **reader_kwargs)
+        geo_transform = data_file.GetGeoTransform()
+        del band
+    return raster, geo_transform
@@ -0,0 +1,209 @@
+'''
+--------------------------
+
+``elm.readers.band_stats``
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Per-file, per-band statistics computed in one catalog pass over
+files, so that scalers can be initialized and mostly-NaN files can be
+skipped without loading samples again.
+
+For each band of each file a BandStats holds the number of values,
+the number of NaNs, the mean and sum of squared deviations (Welford /
+Chan et al. streaming updates, mergeable across chunks and files),
+min, max and optionally a histogram with fixed bins (the same bins for
+all files, given by hist_range, so histograms can be added).
+
+band_stats_catalog computes the stats of many files on a thread pool.
+The stats are stored in a GranuleIndex (see
+elm.readers.granule_index) with GranuleIndex.add_band_stats, saved
+with it, and merged with GranuleIndex.band_stats, e.g. for
+``steps.StandardScaler().fit_from_stats(stats)``.
+'''
+from collections import OrderedDict
+from functools import partial
+import logging
+
+import numpy as np
+
+from elm.readers.band_reader import read_bands
+from elm.readers.util import set_na_from_meta
+
+__all__ = ['BandStats', 'file_band_stats', 'band_stats_catalog',
+           'merge_band_stats']
+
+logger = logging.getLogger(__name__)
+
+HIST_BINS = 64
+CHUNK_SIZE = 2 ** 20
+
+
+class BandStats(object):
+    '''Streaming statistics of the values of a band
+
+    Parameters:
+        :hist_range: (min, max) of the histogram bins, or None for no
+                     histogram
+        :bins:       number of histogram bins
+    '''
+    def __init__(self, hist_range=None, bins=HIST_BINS):
+        self.size = 0
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.min = np.inf
+        self.max = -np.inf
+        self.hist_range = tuple(hist_range) if hist_range is not None else None
+        self.bins = bins
+        self.hist = np.zeros(bins, dtype=np.int64) if hist_range is not None else None
+
+    def _add(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def update(self, values, chunk_size=CHUNK_SIZE):
+        '''Add values (numpy array, NaN for missing) chunk by chunk'''
+        values = np.asarray(values).reshape(-1)
+        self.size += values.size
+        for start in range(0, values.size, chunk_size):
+            chunk = values[start:start + chunk_size]
+            if chunk.dtype.kind == 'f':
+                chunk = chunk[~np.isnan(chunk)]
+            if not chunk.size:
+                continue
+            chunk = chunk.astype(np.float64)
+            mean = chunk.mean()
+            self._add(chunk.size, mean, ((chunk - mean) ** 2).sum())
+            self.min = min(self.min, chunk.min())
+            self.max = max(self.max, chunk.max())
+            if self.hist is not None:
+                self.hist += np.histogram(chunk, bins=self.bins,
+                                          range=self.hist_range)[0]
+        return self
+
+    def merge(self, other):
+        '''Return a new BandStats of the values of self and other'''
+        if (self.hist is None) != (other.hist is None) or \
+                (self.hist is not None and (self.hist_range, self.bins) != (other.hist_range, other.bins)):
+            raise ValueError('Cannot merge BandStats with different histogram '
+                             'bins ({} {}, {} {})'.format(self.hist_range, self.bins,
+                                                          other.hist_range, other.bins))
+        new = BandStats(self.hist_range, self.bins)
+        for stats in (self, other):
+            new.size += stats.size
+            if stats.count:
+                new._add(stats.count, stats.mean, stats.m2)
+            new.min = min(new.min, stats.min)
+            new.max = max(new.max, stats.max)
+            if new.hist is not None:
+                new.hist += stats.hist
+        return new
+
+    @property
+    def nan_fraction(self):
+        return 1. - self.count / self.size if self.size else 0.
+
+    @property
+    def var(self):
+        return self.m2 / self.count if self.count else np.NaN
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    def to_dict(self):
+        '''JSON serializable dict of the stats (see from_dict)'''
+        return {'size': int(self.size), 'count': int(self.count),
+                'mean': float(self.mean), 'm2': float(self.m2),
+                'min': float(self.min), 'max': float(self.max),
+                'hist_range': None if self.hist_range is None else [float(v) for v in self.hist_range],
+                'bins': self.bins,
+                'hist': None if self.hist is None else self.hist.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        '''BandStats from BandStats.to_dict output'''
+        stats = cls(d.get('hist_range'), d.get('bins', HIST_BINS))
+        for k in ('size', 'count', 'mean', 'm2', 'min', 'max'):
+            setattr(stats, k, d[k])
+        if d.get('hist') is not None:
+            stats.hist = np.array(d['hist'], dtype=np.int64)
+        return stats
+
+    def __repr__(self):
+        return ('<elm.readers.BandStats> count: {} nan_fraction: {:.3f} mean: {} '
+                'std: {} min: {} max: {}'.format(self.count, self.nan_fraction,
+                                                 self.mean, self.std, self.min, self.max))
+
+
+def merge_band_stats(stats_list):
+    '''Merge a list of dicts of band name to BandStats (e.g. one per
+    file) into one dict of band name to BandStats'''
+    merged = OrderedDict()
+    for stats in stats_list:
+        for band, band_stats in stats.items():
+            if band in merged:
+                merged[band] = merged[band].merge(band_stats)
+            else:
+                merged[band] = band_stats
+    return merged
+
+
+def file_band_stats(filename, band_specs=None, load_array=None, reader=None,
+                    hist_range=None, bins=HIST_BINS):
+    '''Load a file and return the BandStats of each band, after
+    set_na_from_meta (fill values and values outside "valid_range"
+    are counted as NaN)
+
+    Parameters:
+        :filename:   filename (or TIF directory)
+        :band_specs: band_specs for load_array
+        :load_array: function like elm.readers.load_array (the default)
+        :reader:     reader for load_array, e.g. "hdf4"
+        :hist_range: (min, max) of histogram bins, or dict of band name
+                     to (min, max), or None for no histograms
+        :bins:       number of histogram bins
+
+    Returns:
+        :stats:      OrderedDict of band name to BandStats
+    '''
+    if load_array is None:
+        from elm.readers.load_array import load_array
+    X = load_array(filename, band_specs=band_specs, reader=reader)
+    # decode packed bands and set NaN for fill values / invalid ranges
+    set_na_from_meta(X)
+    stats = OrderedDict()
+    for band in X.band_order:
+        band_range = hist_range.get(band) if isinstance(hist_range, dict) else hist_range
+        stats[band] = BandStats(band_range, bins).update(X[band].values)
+    return stats
+
+
+def _file_band_stats_or_none(filename, **kwargs):
+    try:
+        return file_band_stats(filename, **kwargs)
+    except Exception as e:
+        logger.info('No band stats (failed to load) {}: {}'.format(filename, repr(e)))
+
+
+def band_stats_catalog(filenames, n_threads=None, **kwargs):
+    '''BandStats of each band of each file, computed on a thread pool
+
+    Parameters:
+        :filenames: filenames (or TIF directories)
+        :n_threads: number of files read at once, default: the
+                    ELM_READ_THREADS environment variable or the
+                    number of cpus
+        :kwargs:    passed to file_band_stats
+
+    Returns:
+        :catalog:   OrderedDict of filename to OrderedDict of band name
+                    to BandStats (files that failed to load are omitted)
+    '''
+    filenames = list(filenames)
+    stats = read_bands([partial(_file_band_stats_or_none, f, **kwargs)
+                        for f in filenames], n_threads=n_threads)
+    return OrderedDict((f, s) for f, s in zip(filenames, stats) if s is not None)
@@ -32,6 +32,7 @@ onto the same coordinate system, for example::
 from collections import OrderedDict
 import logging
 
+import numpy as np
 import xarray as xr
 
 from elm.readers.util import (_extract_valid_xy, Canvas,
@@ -0,0 +1,191 @@
+'''
+--------------------------
+
+``elm.readers.flat_store``
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+FlatStore is a light weight alternative to a flattened ElmStore
+(an ElmStore with a DataArray "flat" with dims ("space", "band"))
+for passing samples between steps of an elm.pipeline.Pipeline.
+
+A FlatStore holds:
+
+ * :values: the 2-D (space, band) numpy array
+ * :band:   list of band (column) names
+ * :mask:   None if values has a row for every pixel of the canvas,
+            otherwise a boolean array, one element per pixel, True
+            for the pixels that are rows of values (e.g. after
+            drop_na_rows)
+ * :canvas: the elm.readers.Canvas shared with the flattened ElmStore
+ * :attrs:  attrs dict shared with the flattened ElmStore
+
+Flatten (and flatten(es, flat_store=True)) build a FlatStore directly
+from the bands of an ElmStore.  Steps that take a FlatStore (Flatten,
+DropNaRows, Transform and the sklearn preprocessing / feature selection
+steps) return a new FlatStore with new values and band names, sharing
+the mask, canvas and attrs, without building xarray indexes or copying
+attrs.  A Pipeline converts a flattened ElmStore to a FlatStore before
+such steps and converts back to an ElmStore before other steps and in
+X returned by transform.  Predictions of predict_many are FlatStores
+until inverse_flatten or serialize.
+
+A FlatStore also has the "flat", "space", "dims" and "band_order"
+attributes of a flattened ElmStore, so ``X.flat.values`` works on
+either.
+'''
+import copy
+
+import numpy as np
+import xarray as xr
+
+from elm.readers.elm_store import ElmStore
+
+__all__ = ['FlatStore', 'as_flat_store', 'as_elm_store']
+
+
+class FlatStore(object):
+    '''A 2-D (space, band) sample for elm.pipeline.Pipeline steps
+
+    Parameters:
+        :values: 2-D numpy array (space, band)
+        :band:   list of band names, one per column of values
+        :mask:   None or boolean array, True for pixels that are rows
+                 of values
+        :canvas: elm.readers.Canvas or None
+        :attrs:  dict of attrs as in a flattened ElmStore
+    '''
+    __slots__ = ('values', 'band', 'mask', 'canvas', 'attrs')
+
+    dims = ('space', 'band')
+
+    def __init__(self, values, band, mask=None, canvas=None, attrs=None):
+        if values.ndim != 2 or values.shape[1] != len(band):
+            raise ValueError('Expected 2-D values with one column per band '
+                             '(values.shape {}, {} bands)'.format(values.shape, len(band)))
+        if mask is not None and mask.sum() != values.shape[0]:
+            raise ValueError('Expected mask to have as many True elements '
+                             'as rows in values ({})'.format(values.shape[0]))
+        self.values = values
+        self.band = list(band)
+        self.mask = mask
+        self.canvas = canvas
+        self.attrs = {} if attrs is None else attrs
+
+    @classmethod
+    def from_elm_store(cls, X):
+        '''FlatStore from a flattened ElmStore X (values not copied)'''
+        from elm.readers.reshape import check_is_flat
+        check_is_flat(X)
+        values = X.flat.values
+        space = X.flat.space.values
+        attrs = dict(X.attrs)
+        attrs.update(X.flat.attrs)
+        shp = attrs.pop('shape_before_drop_na_rows', None)
+        attrs.pop('drop_na_rows', None)
+        size = shp[0] if shp else space.size
+        if size == space.size and np.array_equal(space, np.arange(size)):
+            mask = None
+        else:
+            if space.size and (space[-1] >= size or np.any(np.diff(space) <= 0)):
+                raise ValueError('Expected "space" coordinate of X to be '
+                                 'increasing row indices')
+            mask = np.zeros(size, dtype=np.bool_)
+            mask[space] = True
+        return cls(values, X.flat.band.values, mask=mask,
+                   canvas=attrs.get('canvas'), attrs=attrs)
+
+    @property
+    def flat(self):
+        return self
+
+    @property
+    def band_order(self):
+        return self.band
+
+    @property
+    def space(self):
+        if self.mask is None:
+            return np.arange(self.values.shape[0])
+        return np.flatnonzero(self.mask)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    def new(self, values, band=None):
+        '''New FlatStore with the same rows (mask), canvas and attrs
+
+        Parameters:
+            :values: 2-D numpy array, e.g. output of a transform
+            :band:   band names, default: those of self if values
+                     has as many columns, else "band_0", "band_1"...
+        '''
+        values = np.atleast_2d(values)
+        if band is None:
+            if values.shape[1] == len(self.band):
+                band = self.band
+            else:
+                band = ['band_{}'.format(idx) for idx in range(values.shape[1])]
+        return FlatStore(values, band, mask=self.mask, canvas=self.canvas,
+                         attrs=self.attrs)
+
+    def drop_na_rows(self):
+        '''New FlatStore without rows of values that have a NaN'''
+        if self.values.dtype.kind not in 'fc':
+            return self
+        keep = ~np.isnan(self.values).any(axis=1)
+        if keep.all():
+            return self
+        if self.mask is None:
+            mask = keep
+        else:
+            mask = self.mask.copy()
+            mask[self.mask] = keep
+        return FlatStore(self.values[keep], self.band, mask=mask,
+                         canvas=self.canvas, attrs=self.attrs)
+
+    def to_elm_store(self):
+        '''Return the flattened ElmStore equivalent to this FlatStore'''
+        attrs = copy.deepcopy(self.attrs)
+        attrs['band_order'] = list(self.band)
+        if self.canvas is not None:
+            attrs['canvas'] = self.canvas
+        if self.mask is not None:
+            attrs['shape_before_drop_na_rows'] = (self.mask.size, len(self.band))
+            attrs['drop_na_rows'] = self.mask.size - self.values.shape[0]
+        flat = xr.DataArray(self.values,
+                            coords=[('space', self.space),
+                                    ('band', list(self.band))],
+                            dims=self.dims,
+                            attrs=attrs)
+        return ElmStore({'flat': flat}, attrs=attrs)
+
+    def __repr__(self):
+        return '<elm.readers.FlatStore> {} rows of {} bands ({})'.format(
+                    self.values.shape[0], len(self.band), self.values.dtype)
+
+
+def as_flat_store(X):
+    '''Return a FlatStore from a flattened ElmStore X, or X itself
+    if X is a FlatStore or not flattened'''
+    from elm.readers.reshape import check_is_flat
+    if isinstance(X, FlatStore) or not isinstance(X, xr.Dataset):
+        return X
+    if not check_is_flat(X, raise_err=False) or X.flat.ndim != 2:
+        return X
+    try:
+        return FlatStore.from_elm_store(X)
+    except ValueError:
+        # e.g. rows of X were shuffled
+        return X
+
+
+def as_elm_store(X):
+    '''Return a flattened ElmStore if X is a FlatStore, else X'''
+    if isinstance(X, FlatStore):
+        return X.to_elm_store()
+    return X
@@ -0,0 +1,541 @@
+'''
+-----------------------------
+
+``elm.readers.granule_index``
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+An index of the bounds, acquisition time and day / night flag of
+files (granules), so a run over a region of interest or time range
+only opens the relevant files.
+
+The index is built once from the metadata of each file
+(elm.readers.load_meta, no arrays are read), can be saved to and
+loaded from a csv file, and is queried by bounding box, polygon,
+time range and day / night flag with a grid spatial index.
+
+Granules whose bounds, time or day / night flag are not found in
+their metadata are kept by the queries on that field.
+
+The index can also hold per-file BandStats (see
+elm.readers.band_stats) of each band, in a "stats:<band name>"
+column, for skipping files with too many NaNs (max_nan_fraction) and
+initializing scalers from the stats merged over files.  The
+"stats_read" column marks the files whose stats were computed (or
+failed to load), so they are not read again.
+
+With the config interface use iter_granules as the "args_list" of a
+data source, e.g.::
+
+    data_sources: {
+      NPP_DSRF1KD_L2GD: {
+        reader: hdf4,
+        sampler: "elm.sample_util.band_selection:select_from_file",
+        args_list: "elm.readers.granule_index:iter_granules",
+        top_dir: "env:ELM_EXAMPLE_DATA_PATH",
+        file_pattern: "\\.hdf",
+        granule_index: "granules.csv",
+        bbox: [-125, 24, -66, 50],
+        time_range: ["2016-01-01", "2016-02-01"],
+        is_day: true,
+        max_nan_fraction: 0.5,
+      }
+    }
+'''
+from collections import defaultdict, OrderedDict
+import json
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from elm.readers.band_stats import (band_stats_catalog, BandStats,
+                                    merge_band_stats)
+from elm.readers.util import row_col_to_xy
+from elm.sample_util.metadata_selection import meta_is_day
+
+__all__ = ['GranuleIndex', 'granule_from_meta', 'iter_granules']
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('filename', 'left', 'bottom', 'right', 'top', 'time', 'is_day')
+
+GRID_CELLS = 32
+
+STATS_PREFIX = 'stats:'
+STATS_READ = 'stats_read'
+
+BOUNDS_WORDS = (('^WESTBOUNDING', '^WESTERNMOSTLON'),
+                ('^SOUTHBOUNDING', '^SOUTHERNMOSTLAT'),
+                ('^EASTBOUNDING', '^EASTERNMOSTLON'),
+                ('^NORTHBOUNDING', '^NORTHERNMOSTLAT'))
+
+# (date, time) key patterns, time optional
+TIME_WORDS = (('^RANGEBEGINNINGDATE$', '^RANGEBEGINNINGTIME$'),
+              ('^DATE_ACQUIRED$', '^SCENE_CENTER_TIME$'),
+              ('^STARTGRANULEDATETIME$', None),
+              ('^TIME_COVERAGE_START$', None),
+              ('^BEGINNINGDATETIME$', None))
+
+DAY_NIGHT_WORDS = ('DAY.?NIGHT', '^DAY$', '^NIGHT$')
+
+
+def _find_value(meta, patterns):
+    '''First value of a key of a nested dict matching one of patterns'''
+    dicts = []
+    for pattern in patterns:
+        for k, v in meta.items():
+            if isinstance(v, dict):
+                dicts.append(v)
+            elif isinstance(k, str) and re.search(pattern, k, re.IGNORECASE):
+                return v
+    for d in dicts:
+        v = _find_value(d, patterns)
+        if v is not None:
+            return v
+
+
+def _bounds_from_geo_transform(geo_transform, width, height):
+    xs, ys = row_col_to_xy(np.array([0, 0, height, height]),
+                           np.array([0, width, 0, width]),
+                           geo_transform)
+    return (xs.min(), ys.min(), xs.max(), ys.max())
+
+
+def _bounds_from_meta(meta):
+    '''(left, bottom, right, top) of a file from its metadata, or None'''
+    band_meta = meta.get('band_meta') or [{}]
+    for m in (meta, band_meta[0]):
+        if not isinstance(m, dict):
+            continue
+        canvas = m.get('canvas')
+        if canvas is not None:
+            return _bounds_from_geo_transform(canvas.geo_transform,
+                                              canvas.buf_xsize,
+                                              canvas.buf_ysize)
+        if m.get('bounds') is not None:
+            left, bottom, right, top = m['bounds']
+            return (min(left, right), min(bottom, top),
+                    max(left, right), max(bottom, top))
+        if m.get('geo_transform') is not None and m.get('height') and m.get('width'):
+            return _bounds_from_geo_transform(m['geo_transform'],
+                                              m['width'], m['height'])
+    bounds = [_find_value(meta, words) for words in BOUNDS_WORDS]
+    if any(b is None for b in bounds):
+        return None
+    try:
+        return tuple(float(b) for b in bounds)
+    except (TypeError, ValueError):
+        return None
+
+
+def _time_from_meta(meta):
+    for date_word, time_word in TIME_WORDS:
+        date = _find_value(meta, (date_word,))
+        if date is None:
+            continue
+        time = _find_value(meta, (time_word,)) if time_word else None
+        text = '{} {}'.format(date, time) if time is not None else str(date)
+        try:
+            return pd.Timestamp(text.strip().rstrip('Z'))
+        except ValueError:
+            logger.debug('Could not parse time {} from {}'.format(text, date_word))
+
+
+def _time_from_filename(filename, time_from_filename):
+    match = re.search(time_from_filename, os.path.basename(filename))
+    if match:
+        try:
+            return pd.Timestamp(''.join(match.groups()) or match.group(0))
+        except ValueError:
+            logger.debug('Could not parse time from {}'.format(filename))
+
+
+def granule_from_meta(filename, meta, time_from_filename=None):
+    '''Return the row of a GranuleIndex (a dict) for a file
+
+    Parameters:
+        :filename: filename or TIF directory
+        :meta:     metadata from elm.readers.load_meta
+        :time_from_filename: regex whose match (or groups joined) in
+                   the file's basename is its time, if not found in meta
+
+    Returns:
+        :granule:  dict with keys filename, left, bottom, right, top
+                   (NaN if not known), time (NaT if not known) and
+                   is_day (None if not known)
+    '''
+    bounds = _bounds_from_meta(meta) or (np.NaN,) * 4
+    time = _time_from_meta(meta)
+    if time is None and time_from_filename:
+        time = _time_from_filename(filename, time_from_filename)
+    if _find_value(meta, DAY_NIGHT_WORDS) is None:
+        is_day = None
+    else:
+        is_day = meta_is_day(meta)
+    granule = dict(zip(COLUMNS[1:5], bounds))
+    granule.update({'filename': filename,
+                    'time': pd.NaT if time is None else time,
+                    'is_day': is_day})
+    return granule
+
+
+def _as_xy(polygon):
+    '''x, y arrays of polygon vertices: a list of (x, y) or (xs, ys)'''
+    polygon = np.asarray(polygon, dtype=np.float64)
+    if polygon.ndim != 2 or 2 not in polygon.shape:
+        raise ValueError('Expected polygon as a list of (x, y) vertices')
+    if polygon.shape[1] != 2:
+        polygon = polygon.T
+    return polygon[:, 0], polygon[:, 1]
+
+
+def _points_in_polygon(px, py, xs, ys):
+    '''Even-odd rule: are points (px, py) inside polygon (xs, ys)?'''
+    x1, y1 = xs[:, None], ys[:, None]
+    x2, y2 = np.roll(xs, -1)[:, None], np.roll(ys, -1)[:, None]
+    crosses = (y1 > py) != (y2 > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+    return (crosses & (px < x_cross)).sum(axis=0) % 2 == 1
+
+
+def _segments_intersect(a1, a2, b1, b2):
+    '''Do segments a1-a2 (arrays of points) intersect segments b1-b2?'''
+    def orient(p, q, r):
+        return np.sign((q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1]) -
+                       (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0]))
+    a1, a2 = a1[:, None], a2[:, None]
+    b1, b2 = b1[None], b2[None]
+    return ((orient(a1, a2, b1) != orient(a1, a2, b2)) &
+            (orient(b1, b2, a1) != orient(b1, b2, a2)))
+
+
+def _box_intersects_polygon(box, xs, ys):
+    left, bottom, right, top = box
+    if np.any((xs >= left) & (xs <= right) & (ys >= bottom) & (ys <= top)):
+        return True
+    corners_x = np.array([left, right, right, left])
+    corners_y = np.array([bottom, bottom, top, top])
+    if np.any(_points_in_polygon(corners_x, corners_y, xs, ys)):
+        return True
+    box_pts = np.column_stack((corners_x, corners_y))
+    poly_pts = np.column_stack((xs, ys))
+    return bool(np.any(_segments_intersect(box_pts, np.roll(box_pts, -1, axis=0),
+                                           poly_pts, np.roll(poly_pts, -1, axis=0))))
+
+
+class GranuleIndex(object):
+    '''Spatio-temporal index of granules (files)
+
+    Parameters:
+        :granules:  list of dicts from granule_from_meta, or a
+                    pandas.DataFrame with columns COLUMNS (and "stats:<band>"
+                    and "stats_read" columns, see add_band_stats)
+        :grid_cells: number of cells of the spatial grid index along
+                    x and y (over the bounds of all granules)
+    '''
+    def __init__(self, granules=None, grid_cells=GRID_CELLS):
+        stats_columns = [c for c in getattr(granules, 'columns', [])
+                         if str(c).startswith(STATS_PREFIX) or c == STATS_READ]
+        granules = pd.DataFrame(granules if granules is not None else [],
+                                columns=list(COLUMNS) + stats_columns)
+        self.granules = granules.reset_index(drop=True)
+        self.grid_cells = grid_cells
+        self._build_grid()
+
+    @classmethod
+    def from_files(cls, filenames, load_meta=None, time_from_filename=None,
+                   grid_cells=GRID_CELLS, **meta_kwargs):
+        '''Build a GranuleIndex from the metadata of files
+
+        Parameters:
+            :filenames: filenames (or TIF directories)
+            :load_meta: function like elm.readers.load_meta (the default)
+            :time_from_filename: see granule_from_meta
+            :grid_cells: see GranuleIndex
+            :meta_kwargs: passed to load_meta, e.g. "reader"
+        '''
+        if load_meta is None:
+            from elm.readers.load_array import load_meta
+        granules = []
+        for filename in filenames:
+            try:
+                meta = load_meta(filename, **meta_kwargs)
+            except Exception as e:
+                logger.info('Not indexed (failed to load meta): {} {}'.format(filename, repr(e)))
+                continue
+            granules.append(granule_from_meta(filename, meta,
+                                              time_from_filename=time_from_filename))
+        return cls(granules, grid_cells=grid_cells)
+
+    def update_files(self, filenames, load_meta=None, time_from_filename=None,
+                     **meta_kwargs):
+        '''Index the files of filenames that are not in the index and
+        drop the granules whose file is not in filenames
+
+        Parameters:
+            :filenames: all the filenames (or TIF directories) to index
+            :load_meta, time_from_filename, meta_kwargs: see from_files
+
+        Returns:
+            :changed:   True if granules were added or dropped
+        '''
+        filenames = list(filenames)
+        indexed = self.granules['filename']
+        keep = indexed.isin(filenames).values
+        new = sorted(set(filenames) - set(indexed))
+        added = GranuleIndex.from_files(new, load_meta=load_meta,
+                                        time_from_filename=time_from_filename,
+                                        **meta_kwargs).granules
+        if keep.all() and not len(added):
+            return False
+        logger.info('Add {} and drop {} granules'.format(len(added), (~keep).sum()))
+        granules = pd.concat([self.granules[keep], added], ignore_index=True)
+        self.granules = granules[list(self.granules.columns)]
+        self._build_grid()
+        return True
+
+    def _build_grid(self):
+        bounds = self.granules[list(COLUMNS[1:5])].values.astype(np.float64)
+        self._bounds = bounds
+        known = ~np.isnan(bounds).any(axis=1)
+        self._unknown = np.flatnonzero(~known)
+        self._cells = defaultdict(list)
+        if not known.any():
+            self._origin, self._cell_size = (0., 0.), (1., 1.)
+            return
+        left, bottom = bounds[known, 0].min(), bounds[known, 1].min()
+        right, top = bounds[known, 2].max(), bounds[known, 3].max()
+        self._origin = (left, bottom)
+        self._cell_size = ((right - left) / self.grid_cells or 1.,
+                           (top - bottom) / self.grid_cells or 1.)
+        for row in np.flatnonzero(known):
+            for cell in self._cells_of(bounds[row]):
+                self._cells[cell].append(row)
+
+    def _cells_of(self, box):
+        '''Grid cells (ix, iy) overlapping box, clipped to the grid'''
+        (x0, y0), (dx, dy) = self._origin, self._cell_size
+        last = self.grid_cells - 1
+        ix0, ix1 = (int(np.clip((v - x0) // dx, 0, last)) for v in (box[0], box[2]))
+        iy0, iy1 = (int(np.clip((v - y0) // dy, 0, last)) for v in (box[1], box[3]))
+        return ((ix, iy) for ix in range(ix0, ix1 + 1) for iy in range(iy0, iy1 + 1))
+
+    def __len__(self):
+        return len(self.granules)
+
+    def _rows_in_box(self, box):
+        rows = set()
+        for cell in self._cells_of(box):
+            rows.update(self._cells.get(cell, ()))
+        rows = np.array(sorted(rows), dtype=np.int64)
+        if rows.size:
+            b = self._bounds[rows]
+            rows = rows[(b[:, 0] <= box[2]) & (b[:, 2] >= box[0]) &
+                        (b[:, 1] <= box[3]) & (b[:, 3] >= box[1])]
+        return rows
+
+    @property
+    def stats_bands(self):
+        '''Names of bands with BandStats in the index'''
+        return [c[len(STATS_PREFIX):] for c in self.granules.columns
+                if c.startswith(STATS_PREFIX)]
+
+    def stats_missing(self, filenames=None):
+        '''Filenames (default: all files) whose BandStats have not been
+        computed (or tried, see add_band_stats)'''
+        granules = self.granules
+        if filenames is not None:
+            granules = granules[granules['filename'].isin(list(filenames))]
+        if STATS_READ in granules:
+            granules = granules[~granules[STATS_READ].fillna(False).astype(bool)]
+        return granules['filename'].tolist()
+
+    def add_band_stats(self, catalog, filenames=None):
+        '''Store BandStats of files in the index
+
+        Parameters:
+            :catalog:   dict of filename to dict of band name to
+                        BandStats, from elm.readers.band_stats_catalog
+            :filenames: files the catalog was computed for, default:
+                        those of catalog.  Files not in catalog
+                        (failed to load) are marked as read, without
+                        stats, so they are not read again
+        '''
+        if filenames is None:
+            filenames = list(catalog)
+        if STATS_READ not in self.granules:
+            self.granules[STATS_READ] = False
+        read = self.granules['filename'].isin(list(filenames))
+        self.granules[STATS_READ] = self.granules[STATS_READ].fillna(False).astype(bool) | read
+        for filename, stats in catalog.items():
+            rows = self.granules['filename'] == filename
+            for band, band_stats in stats.items():
+                column = STATS_PREFIX + band
+                if column not in self.granules:
+                    self.granules[column] = None
+                self.granules.loc[rows, column] = json.dumps(band_stats.to_dict())
+
+    def _file_stats(self, granules):
+        bands = self.stats_bands
+        for _, row in granules.iterrows():
+            yield OrderedDict((band, BandStats.from_dict(json.loads(row[STATS_PREFIX + band])))
+                              for band in bands
+                              if isinstance(row[STATS_PREFIX + band], str))
+
+    def band_stats(self, filenames=None):
+        '''BandStats of each band merged over files
+
+        Parameters:
+            :filenames: files to merge, default: all files with stats
+
+        Returns:
+            :stats:     OrderedDict of band name to BandStats
+        '''
+        granules = self.granules
+        if filenames is not None:
+            granules = granules[granules['filename'].isin(list(filenames))]
+        return merge_band_stats(self._file_stats(granules))
+
+    def nan_fraction(self):
+        '''Array of the fraction of NaN values (all bands) of each file,
+        NaN for files without stats'''
+        fractions = []
+        for stats in self._file_stats(self.granules):
+            size = sum(s.size for s in stats.values())
+            count = sum(s.count for s in stats.values())
+            fractions.append(1. - count / size if size else np.NaN)
+        return np.array(fractions, dtype=np.float64)
+
+    def query(self, bbox=None, polygon=None, time_range=None, is_day=None,
+              max_nan_fraction=None):
+        '''Filenames of granules matching all of the arguments given
+
+        Parameters:
+            :bbox:       (left, bottom, right, top) the granule intersects
+            :polygon:    list of (x, y) vertices of a polygon the
+                         granule's bounds intersect
+            :time_range: (start, stop) - time >= start and < stop, either
+                         None for no limit (strings or datetimes)
+            :is_day:     True for day, False for night granules
+            :max_nan_fraction: largest fraction of NaN values of a file
+                         (see add_band_stats)
+
+        Returns:
+            :filenames:  list of filenames (in the order of the index)
+        '''
+        keep = np.ones(len(self.granules), dtype=np.bool_)
+        if bbox is not None or polygon is not None:
+            spatial = np.zeros_like(keep)
+            spatial[self._unknown] = True
+            if polygon is not None:
+                xs, ys = _as_xy(polygon)
+                box = (xs.min(), ys.min(), xs.max(), ys.max())
+                if bbox is not None:
+                    box = (max(box[0], bbox[0]), max(box[1], bbox[1]),
+                           min(box[2], bbox[2]), min(box[3], bbox[3]))
+                rows = [row for row in self._rows_in_box(box)
+                        if _box_intersects_polygon(self._bounds[row], xs, ys)]
+            else:
+                rows = self._rows_in_box(bbox)
+            spatial[rows] = True
+            keep &= spatial
+        if time_range is not None:
+            start, stop = time_range
+            times = pd.to_datetime(self.granules['time'])
+            unknown = times.isnull().values
+            in_range = np.ones_like(keep)
+            if start is not None:
+                in_range &= (times >= pd.Timestamp(start)).values
+            if stop is not None:
+                in_range &= (times < pd.Timestamp(stop)).values
+            keep &= unknown | in_range
+        if is_day is not None:
+            flags = self.granules['is_day']
+            keep &= (flags.isnull() | (flags == bool(is_day))).values
+        if max_nan_fraction is not None and len(self.granules):
+            fractions = self.nan_fraction()
+            keep &= np.isnan(fractions) | (fractions <= max_nan_fraction)
+        return self.granules['filename'][keep].tolist()
+
+    def save(self, path):
+        '''Save the index to a csv file'''
+        self.granules.to_csv(path, index=False)
+
+    @classmethod
+    def load(cls, path, grid_cells=GRID_CELLS):
+        '''Load an index saved with GranuleIndex.save'''
+        granules = pd.read_csv(path, parse_dates=['time'])
+        flags = granules['is_day']
+        granules['is_day'] = [None if pd.isnull(f) else str(f).lower() in ('true', '1', '1.0')
+                              for f in flags]
+        return cls(granules, grid_cells=grid_cells)
+
+    def __repr__(self):
+        return '<elm.readers.GranuleIndex> {} granules'.format(len(self))
+
+
+def iter_granules(**kwargs):
+    '''"args_list" function for a data source, yielding the files of a
+    GranuleIndex matching the bbox, polygon, time_range and is_day
+    keys of the data source (or its "geo_filters" dict)
+
+    Parameters:
+        :kwargs: data source dict, with:
+
+            - **granule_index**: a GranuleIndex, or the csv file of one
+              (built from the files of iter_files_recursively(**kwargs)
+              and saved there if it does not exist).  With a "top_dir",
+              a saved index is updated (and saved again) when files were
+              added to or removed from top_dir, see
+              GranuleIndex.update_files
+            - **bbox**, **polygon**, **time_range**, **is_day**,
+              **max_nan_fraction**: see GranuleIndex.query
+            - **time_from_filename**: see granule_from_meta
+            - **band_stats**: if True (or max_nan_fraction is given),
+              compute the BandStats of the files matching the other
+              keys that have none yet (reading each file with the
+              band_specs, load_array and reader of the data source, see
+              elm.readers.band_stats_catalog) and save them with the
+              index
+            - **hist_range**: histogram range of the BandStats
+    '''
+    from elm.readers.local_file_iterators import iter_files_recursively
+    index = path = kwargs.get('granule_index')
+    if not isinstance(index, GranuleIndex):
+        meta_kwargs = {'reader': kwargs['reader']} if kwargs.get('reader') else {}
+        meta_kwargs.update(load_meta=kwargs.get('load_meta'),
+                           time_from_filename=kwargs.get('time_from_filename'))
+        if path and os.path.exists(path):
+            index = GranuleIndex.load(path)
+            if kwargs.get('top_dir'):
+                if index.update_files(iter_files_recursively(**kwargs), **meta_kwargs):
+                    index.save(path)
+        else:
+            index = GranuleIndex.from_files(iter_files_recursively(**kwargs),
+                                            **meta_kwargs)
+            if path:
+                index.save(path)
+    geo_filters = kwargs.get('geo_filters') or {}
+    query = {k: kwargs.get(k, geo_filters.get(k))
+             for k in ('bbox', 'polygon', 'time_range', 'is_day',
+                       'max_nan_fraction')}
+    want_stats = kwargs.get('band_stats') or query['max_nan_fraction'] is not None
+    if want_stats:
+        # stats of the files matching the spatial / time query only
+        candidates = index.query(**dict(query, max_nan_fraction=None))
+        to_read = index.stats_missing(candidates)
+        if to_read:
+            catalog = band_stats_catalog(to_read,
+                                         band_specs=kwargs.get('band_specs'),
+                                         load_array=kwargs.get('load_array'),
+                                         reader=kwargs.get('reader'),
+                                         hist_range=kwargs.get('hist_range'))
+            index.add_band_stats(catalog, filenames=to_read)
+            if isinstance(path, str):
+                index.save(path)
+    filenames = index.query(**query)
+    logger.info('{} of {} granules match {}'.format(len(filenames), len(index), query))
+    yield from filenames
@@ -0,0 +1,179 @@
+'''
+---------------------------
+
+``elm.readers.handle_pool``
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+A bounded LRU pool of open GDAL / rasterio dataset handles, shared by
+the load_*_meta and load_*_array functions of elm.readers in a process
+(e.g. a dask worker), so a file or subdataset whose metadata was
+loaded is not opened again to read its array.  On network file
+systems each open may cost a round trip or more.
+
+A handle is used by one thread at a time: it is checked out of the
+pool while in use, so a thread reading a file another thread is using
+opens a new handle for it.  When more than max_handles idle handles
+are in the pool the least recently used ones are closed.
+
+Example::
+
+    from elm.readers.handle_pool import open_gdal
+
+    with open_gdal(subdataset_name) as data_file:
+        arr = data_file.ReadAsArray()
+'''
+from collections import OrderedDict
+from contextlib import contextmanager
+import logging
+import threading
+
+__all__ = ['HandlePool', 'handle_pool', 'open_gdal', 'open_rasterio',
+           'open_netcdf', 'open_h5py']
+
+logger = logging.getLogger(__name__)
+
+MAX_HANDLES = 64
+
+
+def _close(handle):
+    '''Close a rasterio handle, or drop the reference to a GDAL
+    Dataset (closed when garbage collected)'''
+    close = getattr(handle, 'close', None)
+    if callable(close):
+        try:
+            close()
+        except Exception as e:
+            logger.info('Failed to close {}: {}'.format(handle, repr(e)))
+
+
+class HandlePool(object):
+    '''Bounded LRU pool of open dataset handles
+
+    Parameters:
+        :max_handles: max number of idle handles kept open
+    '''
+    def __init__(self, max_handles=MAX_HANDLES):
+        self.max_handles = max_handles
+        self._idle = OrderedDict()  # key -> list of idle handles
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(handles) for handles in self._idle.values())
+
+    def _take(self, key):
+        with self._lock:
+            handles = self._idle.get(key)
+            if not handles:
+                self.misses += 1
+                return None
+            handle = handles.pop()
+            if not handles:
+                del self._idle[key]
+            self.hits += 1
+            return handle
+
+    def _put(self, key, handle):
+        evicted = []
+        with self._lock:
+            self._idle.setdefault(key, []).append(handle)
+            self._idle.move_to_end(key)
+            count = sum(len(handles) for handles in self._idle.values())
+            while count > self.max_handles:
+                old_key, handles = next(iter(self._idle.items()))
+                evicted.append(handles.pop(0))
+                if not handles:
+                    del self._idle[old_key]
+                count -= 1
+        for old in evicted:
+            _close(old)
+
+    @contextmanager
+    def checkout(self, key, opener):
+        '''Context manager giving an open handle for key from the pool,
+        or from opener() (a function taking no arguments) if none is
+        idle.  The handle goes back to the pool on exit, or is closed
+        if an exception was raised'''
+        handle = self._take(key)
+        if handle is None:
+            handle = opener()
+        try:
+            yield handle
+        except BaseException:
+            _close(handle)
+            raise
+        self._put(key, handle)
+
+    def discard(self, key):
+        '''Close the idle handles for key, e.g. after files (such as
+        .ovr overviews) were added that handles opened before would
+        not see'''
+        with self._lock:
+            handles = self._idle.pop(key, [])
+        for handle in handles:
+            _close(handle)
+
+    def close_all(self):
+        '''Close all idle handles'''
+        with self._lock:
+            handles = [h for hs in self._idle.values() for h in hs]
+            self._idle.clear()
+        for handle in handles:
+            _close(handle)
+
+
+_POOL = HandlePool()
+
+
+def handle_pool():
+    '''Return the HandlePool shared by elm.readers in this process'''
+    return _POOL
+
+
+def _gdal_open(name):
+    import gdal
+    from gdalconst import GA_ReadOnly
+    data_file = gdal.Open(name, GA_ReadOnly)
+    if data_file is None:
+        raise ValueError('gdal.Open failed on {}'.format(name))
+    return data_file
+
+
+def _rasterio_open(name):
+    import rasterio as rio
+    return rio.open(name)
+
+
+def _netcdf_open(name):
+    import xarray as xr
+    return xr.open_dataset(name, decode_cf=False)
+
+
+def _h5py_open(name):
+    import h5py
+    return h5py.File(name, 'r')
+
+
+def open_gdal(name):
+    '''Context manager giving a GDAL Dataset (read only) for a file or
+    subdataset name from the shared HandlePool'''
+    return _POOL.checkout(('gdal', name), lambda: _gdal_open(name))
+
+
+def open_rasterio(name):
+    '''Context manager giving a rasterio dataset (read mode) for a
+    filename from the shared HandlePool'''
+    return _POOL.checkout(('rasterio', name), lambda: _rasterio_open(name))
+
+
+def open_netcdf(name):
+    '''Context manager giving an xarray.Dataset (lazily loaded, not
+    CF decoded) for a NetCDF filename from the shared HandlePool'''
+    return _POOL.checkout(('netcdf', name), lambda: _netcdf_open(name))
+
+
+def open_h5py(name):
+    '''Context manager giving an h5py.File (read only) for an HDF5
+    filename from the shared HandlePool'''
+    return _POOL.checkout(('h5py', name), lambda: _h5py_open(name))
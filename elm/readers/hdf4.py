@@ -13,11 +13,10 @@ Tools for reading HDF4 files.  Typically use the interface through
 
 from collections import OrderedDict
 import copy
+from functools import partial
 import gc
 import logging
 
-import gdal
-from gdalconst import GA_ReadOnly
 import numpy as np
 import xarray as xr
 
@@ -30,6 +29,9 @@ from elm.readers.util import (geotransform_to_bounds,
                               READ_ARRAY_KWARGS,
                               take_geo_transform_from_meta,
                               window_to_gdal_read_kwargs)
+from elm.readers.band_reader import gdal_read_array, read_bands
+from elm.readers.handle_pool import open_gdal
+from elm.readers.packed import pack_band
 
 __all__ = [
     'load_hdf4_meta',
@@ -40,17 +42,17 @@ logger = logging.getLogger(__name__)
 
 def load_hdf4_meta(datafile):
     '''Load meta and band_meta for a datafile'''
-    f = gdal.Open(datafile, GA_ReadOnly)
-    sds = f.GetSubDatasets()
+    with open_gdal(datafile) as f:
+        sds = f.GetSubDatasets()
+        file_meta = f.GetMetadata()
 
-    dat0 = gdal.Open(sds[0][0], GA_ReadOnly)
     band_metas = []
     for s in sds:
-        f2 = gdal.Open(s[0], GA_ReadOnly)
-        band_metas.append(f2.GetMetadata())
+        with open_gdal(s[0]) as f2:
+            band_metas.append(f2.GetMetadata())
         band_metas[-1]['sub_dataset_name'] = s[0]
     meta = {
-             'meta': f.GetMetadata(),
+             'meta': file_meta,
              'band_meta': band_metas,
              'sub_datasets': sds,
              'name': datafile,
@@ -58,7 +60,7 @@ def load_hdf4_meta(datafile):
     return meta
 
 
-def load_hdf4_array(datafile, meta, band_specs=None):
+def load_hdf4_array(datafile, meta, band_specs=None, n_threads=None):
     '''Return an ElmStore where each subdataset is a DataArray
 
     Parameters:
@@ -67,6 +69,8 @@ def load_hdf4_array(datafile, meta, band_specs=None):
         :band_specs: list of elm.readers.BandSpec objects,
                     defaulting to reading all subdatasets
                     as bands
+        :n_threads: number of subdatasets read at once
+                    (see elm.readers.band_reader)
 
     Returns:
         :Elmstore: Elmstore of teh hdf4 data
@@ -74,7 +78,6 @@ def load_hdf4_array(datafile, meta, band_specs=None):
     from elm.readers import ElmStore
     from elm.sample_util.metadata_selection import match_meta
     logger.debug('load_hdf4_array: {}'.format(datafile))
-    f = gdal.Open(datafile, GA_ReadOnly)
 
     sds = meta['sub_datasets']
     band_metas = meta['band_meta']
@@ -97,6 +100,7 @@ def load_hdf4_array(datafile, meta, band_specs=None):
     elm_store_data = OrderedDict()
 
     band_order = []
+    to_read = []
     for _, band_meta, s, band_spec in band_order_info:
         attrs = copy.deepcopy(meta)
         attrs.update(copy.deepcopy(band_meta))
@@ -111,11 +115,17 @@ def load_hdf4_array(datafile, meta, band_specs=None):
             name = band_spec
             geo_transform = None
         reader_kwargs = window_to_gdal_read_kwargs(**reader_kwargs)
-        dat0 = gdal.Open(s[0], GA_ReadOnly)
         band_meta.update(reader_kwargs)
-        raster = raster_as_2d(dat0.ReadAsArray(**reader_kwargs))
+        to_read.append((name, band_spec, attrs, geo_transform,
+                        partial(gdal_read_array, s[0],
+                                build_overviews=getattr(band_spec, 'build_overviews', False),
+                                **reader_kwargs)))
+    rasters = read_bands([read for _, _, _, _, read in to_read],
+                         n_threads=n_threads)
+    for (name, band_spec, attrs, geo_transform, _), (raster, gdal_geo_transform) in zip(to_read, rasters):
+        raster = raster_as_2d(raster)
         if geo_transform is None:
-            geo_transform = dat0.GetGeoTransform()
+            geo_transform = gdal_geo_transform
         attrs['geo_transform'] = geo_transform
         if hasattr(band_spec, 'store_coords_order'):
             if band_spec.stored_coords_order[0] == 'y':
@@ -140,9 +150,10 @@ def load_hdf4_array(datafile, meta, band_specs=None):
                                        ('x', coord_x)],
                                dims=native_dims,
                                attrs=attrs)
+        if getattr(band_spec, 'packed', False):
+            pack_band(elm_store_data[name])
 
         band_order.append(name)
-    del dat0
     attrs = copy.deepcopy(attrs)
     attrs['band_order'] = band_order
     gc.collect()
@@ -9,16 +9,26 @@ Tools for reading HDF5 files.  Typically use the interface through
     - :func:`elm.readers.load_array`
     - :func:`elm.readers.load_meta`
 
+There are two backends:
+
+ * "gdal" (default): subdatasets and metadata from GDAL
+ * "h5py": ``load_hdf5_meta(datafile, backend='h5py')`` (or
+   ``load_array(datafile, reader='h5py')``) reads attributes of the
+   file, groups and datasets natively, and load_hdf5_array then reads
+   the BandSpec window of each 2-D dataset as a hyperslab, decoding
+   only the chunks the window overlaps.  Windows are read exactly as
+   given, not aligned to chunks.  Use tile_windows to tile a chunked
+   grid (e.g. IMERG) with windows aligned to its chunks, so each chunk
+   is decoded for one tile only.
 '''
 
 
 from collections import OrderedDict
 import copy
+from functools import partial
 import gc
 import logging
 
-import gdal
-from gdalconst import GA_ReadOnly
 import numpy as np
 import xarray as xr
 
@@ -30,14 +40,19 @@ from elm.readers.util import (geotransform_to_bounds,
                               raster_as_2d,
                               READ_ARRAY_KWARGS,
                               take_geo_transform_from_meta,
+                              window_geo_transform,
                               window_to_gdal_read_kwargs)
 
 from elm.readers import ElmStore
+from elm.readers.band_reader import gdal_read_array, read_bands
+from elm.readers.handle_pool import open_gdal, open_h5py
+from elm.readers.packed import pack_band
 from elm.sample_util.metadata_selection import match_meta
 
 __all__ = [
     'load_hdf5_meta',
     'load_hdf5_array',
+    'tile_windows',
 ]
 
 logger = logging.getLogger(__name__)
@@ -48,22 +63,78 @@ def _nc_str_to_dict(nc_str):
     return dict([g for g in str_list if len(g) == 2])
 
 
-def load_hdf5_meta(datafile):
-    '''Load dataset and subdataset metadata from HDF5 file'''
-    f = gdal.Open(datafile, GA_ReadOnly)
-    sds = f.GetSubDatasets()
+def _h5_value(value):
+    '''Python value of an h5py attribute, with "key=value;\n" strings
+    (e.g. a GridHeader) as dicts'''
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    elif isinstance(value, np.ndarray):
+        if value.dtype.kind == 'S':
+            value = np.char.decode(value, 'utf-8', 'replace')
+        value = value.item() if value.size == 1 else value.tolist()
+    if isinstance(value, str) and '=' in value and \
+            (';\n' in value or value.rstrip().endswith(';')):
+        return _nc_str_to_dict(value.rstrip().rstrip(';')) or value
+    return value
+
+
+def _h5_attrs(obj):
+    return {k: _h5_value(v) for k, v in obj.attrs.items()}
+
+
+def _load_hdf5_meta_h5py(datafile):
+    import h5py
+    meta = {}
+    sds = []
+    band_metas = []
+    def visit(name, obj):
+        if not isinstance(obj, h5py.Dataset):
+            meta.update(_h5_attrs(obj))
+        elif obj.ndim >= 2:
+            name = '/' + name
+            band_meta = _h5_attrs(obj)
+            band_meta.update({'sub_dataset_name': name,
+                              'shape': obj.shape,
+                              'chunks': obj.chunks})
+            sds.append((name, '{} {} ({})'.format(list(obj.shape), name, obj.dtype)))
+            band_metas.append(band_meta)
+    with open_h5py(datafile) as f:
+        meta.update(_h5_attrs(f))
+        f.visititems(visit)
+    return dict(meta=meta,
+                band_meta=band_metas,
+                sub_datasets=sds,
+                name=datafile,
+                backend='h5py')
+
+
+def load_hdf5_meta(datafile, backend='gdal'):
+    '''Load dataset and subdataset metadata from HDF5 file
+
+    Parameters:
+        :datafile: filename
+        :backend:  "gdal" or "h5py" (see elm.readers.hdf5)
+    '''
+    if backend == 'h5py':
+        return _load_hdf5_meta_h5py(datafile)
+    if backend != 'gdal':
+        raise ValueError('Expected backend "gdal" or "h5py", not {}'.format(backend))
+    with open_gdal(datafile) as f:
+        sds = f.GetSubDatasets()
+        file_meta = f.GetMetadata()
     band_metas = []
     for s in sds:
-        f2 = gdal.Open(s[0], GA_ReadOnly)
+        with open_gdal(s[0]) as f2:
+            sd_meta = f2.GetMetadata()
         bm = dict()
-        for k, v in f2.GetMetadata().items():
+        for k, v in sd_meta.items():
             vals = _nc_str_to_dict(v)
             bm.update(vals)
         band_metas.append(bm)
         band_metas[-1]['sub_dataset_name'] = s[0]
 
     meta = dict()
-    for k, v in f.GetMetadata().items():
+    for k, v in file_meta.items():
         vals = _nc_str_to_dict(v)
         meta.update(vals)
 
@@ -74,8 +145,94 @@ def load_hdf5_meta(datafile):
 
 def load_subdataset(subdataset, attrs, band_spec, **reader_kwargs):
     '''Load a single subdataset'''
-    data_file = gdal.Open(subdataset)
-    raster = raster_as_2d(data_file.ReadAsArray(**reader_kwargs))
+    raster, geo_transform = gdal_read_array(subdataset, **reader_kwargs)
+    return _subdataset_to_data_array(raster, geo_transform, attrs, band_spec)
+
+
+def _h5_band_shape(shape):
+    if len(shape) < 2 or any(size != 1 for size in shape[:-2]):
+        raise ValueError('Expected a 2-D HDF5 dataset, or one with leading '
+                         'dimensions of size 1.  Shape: {}'.format(shape))
+    return shape[-2:]
+
+
+def tile_windows(band_meta, tile_shape):
+    '''Windows (for BandSpec window) tiling the 2-D grid of a dataset
+    from load_hdf5_meta(datafile, backend='h5py'), with the tile shape
+    rounded up to whole chunks of a chunked dataset
+
+    Parameters:
+        :band_meta:  an element of meta['band_meta']
+        :tile_shape: (rows, cols) of tiles (the last tiles of a
+                     row or column may be smaller)
+
+    Returns:
+        :windows:    list of ((row_start, row_stop), (col_start, col_stop))
+    '''
+    rows, cols = _h5_band_shape(tuple(band_meta['shape']))
+    tile_shape = list(tile_shape)
+    chunks = band_meta.get('chunks')
+    if chunks:
+        for idx, chunk in enumerate(chunks[-2:]):
+            tile_shape[idx] = -(-tile_shape[idx] // chunk) * chunk
+    return [((r, min(r + tile_shape[0], rows)), (c, min(c + tile_shape[1], cols)))
+            for r in range(0, rows, tile_shape[0])
+            for c in range(0, cols, tile_shape[1])]
+
+
+def h5py_read_array(datafile, name, window=None, buf_xsize=None, buf_ysize=None):
+    '''Read the window of a 2-D HDF5 dataset with a hyperslab selection
+
+    Parameters:
+        :datafile:  filename
+        :name:      dataset name (sub_dataset_name from load_hdf5_meta)
+        :window:    ((row_start, row_stop), (col_start, col_stop)) or None,
+                    read as given (see tile_windows for chunk-aligned
+                    windows)
+        :buf_xsize: number of columns to read, taking every n-th
+                    column of the window (nearest neighbor)
+        :buf_ysize: number of rows, as for buf_xsize
+
+    Returns:
+        :(raster, offsets, steps): 2-D array, (row, col) of the window's
+                    corner and (row, col) steps
+    '''
+    with open_h5py(datafile) as f:
+        dset = f[name]
+        rows, cols = _h5_band_shape(dset.shape)
+        (row_start, row_stop), (col_start, col_stop) = window or ((0, rows), (0, cols))
+        row_step = max(1, (row_stop - row_start) // buf_ysize) if buf_ysize else 1
+        col_step = max(1, (col_stop - col_start) // buf_xsize) if buf_xsize else 1
+        if buf_ysize:
+            row_stop = min(row_stop, row_start + row_step * buf_ysize)
+        if buf_xsize:
+            col_stop = min(col_stop, col_start + col_step * buf_xsize)
+        row_sel = slice(row_start, min(row_stop, rows), row_step)
+        col_sel = slice(col_start, min(col_stop, cols), col_step)
+        shape = (len(range(rows)[row_sel]), len(range(cols)[col_sel]))
+        raster = np.empty(shape, dtype=dset.dtype)
+        selection = (0,) * (dset.ndim - 2) + (row_sel, col_sel)
+        dset.read_direct(raster, source_sel=selection)
+    return raster, (row_start, col_start), (row_step, col_step)
+
+
+def _read_h5py_band(datafile, name, attrs, band_spec, **reader_kwargs):
+    raster, offsets, steps = h5py_read_array(datafile, name, **reader_kwargs)
+    geo_transform = take_geo_transform_from_meta(band_spec, **attrs)
+    if geo_transform is None:
+        raise ValueError('No geo_transform found in metadata of {} {} (see '
+                         'BandSpec meta_to_geotransform)'.format(datafile, name))
+    if getattr(band_spec, 'stored_coords_order', ['y', 'x'])[0] == 'x':
+        offsets, steps = offsets[::-1], steps[::-1]
+    geo_transform = window_geo_transform(geo_transform, offsets, steps)
+    return _subdataset_to_data_array(raster, None, attrs, band_spec,
+                                     geo_transform=geo_transform)
+
+
+def _subdataset_to_data_array(raster, data_file_geo_transform, attrs, band_spec,
+                              geo_transform=None):
+    '''DataArray from a raster read by gdal_read_array'''
+    raster = raster_as_2d(raster)
     #raster = raster.T
     if getattr(band_spec, 'stored_coords_order', ['y', 'x'])[0] == 'y':
         rows, cols = raster.shape
@@ -83,9 +240,10 @@ def load_subdataset(subdataset, attrs, band_spec, **reader_kwargs):
     else:
         rows, cols = raster.T.shape
         dims = ('x', 'y')
-    geo_transform = take_geo_transform_from_meta(band_spec, **attrs)
     if geo_transform is None:
-        geo_transform = data_file.GetGeoTransform()
+        geo_transform = take_geo_transform_from_meta(band_spec, **attrs)
+    if geo_transform is None:
+        geo_transform = data_file_geo_transform
     coord_x, coord_y = geotransform_to_coords(cols,
                                               rows,
                                               geo_transform)
@@ -111,22 +269,26 @@ def load_subdataset(subdataset, attrs, band_spec, **reader_kwargs):
                         attrs=attrs)
 
 
-def load_hdf5_array(datafile, meta, band_specs):
+def load_hdf5_array(datafile, meta, band_specs, n_threads=None):
     '''Return an ElmStore where each subdataset is a DataArray
 
     Parameters:
         :datafile: filename
-        :meta:     meta from elm.readers.load_hdf5_meta
+        :meta:     meta from elm.readers.load_hdf5_meta, read with
+                   the backend (gdal or h5py) of the meta
         :band_specs: list of elm.readers.BandSpec objects,
                     defaulting to reading all subdatasets
-                    as bands
+                    as bands.  With the h5py backend, BandSpec
+                    windows are read exactly as given (not aligned
+                    to chunks, see tile_windows)
+        :n_threads: number of subdatasets read at once
+                    (see elm.readers.band_reader)
 
     Returns:
         :es: An ElmStore
     '''
-
     logger.debug('load_hdf5_array: {}'.format(datafile))
-    f = gdal.Open(datafile, GA_ReadOnly)
+    h5py_backend = meta.get('backend') == 'h5py'
     sds = meta['sub_datasets']
     band_metas = meta['band_meta']
     band_order_info = []
@@ -146,6 +308,7 @@ def load_hdf5_array(datafile, meta, band_specs):
     band_order_info.sort(key=lambda x:x[0])
     elm_store_data = OrderedDict()
     band_order = []
+    to_read = []
     for _, band_meta, sd, band_spec in band_order_info:
         if isinstance(band_spec, BandSpec):
             name = band_spec.name
@@ -155,10 +318,28 @@ def load_hdf5_array(datafile, meta, band_specs):
         else:
             reader_kwargs = {}
             name = band_spec
-        reader_kwargs = window_to_gdal_read_kwargs(**reader_kwargs)
         attrs = copy.deepcopy(meta)
         attrs.update(copy.deepcopy(band_meta))
-        elm_store_data[name] = load_subdataset(sd[0], attrs, band_spec, **reader_kwargs)
+        if h5py_backend:
+            read = partial(_read_h5py_band, datafile, sd[0], attrs,
+                           band_spec, **reader_kwargs)
+        else:
+            reader_kwargs = window_to_gdal_read_kwargs(**reader_kwargs)
+            read = partial(gdal_read_array, sd[0],
+                           build_overviews=getattr(band_spec, 'build_overviews', False),
+                           **reader_kwargs)
+        to_read.append((name, attrs, band_spec, read))
+    rasters = read_bands([read for _, _, _, read in to_read],
+                         n_threads=n_threads)
+    for (name, attrs, band_spec, _), raster in zip(to_read, rasters):
+        if h5py_backend:
+            elm_store_data[name] = raster
+        else:
+            raster, geo_transform = raster
+            elm_store_data[name] = _subdataset_to_data_array(raster, geo_transform,
+                                                             attrs, band_spec)
+        if getattr(band_spec, 'packed', False):
+            pack_band(elm_store_data[name])
 
         band_order.append(name)
     attrs = copy.deepcopy(attrs)
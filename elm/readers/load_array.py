@@ -43,14 +43,17 @@ def _find_file_type(filename):
     return ftype
 
 
-def load_array(filename, meta=None, band_specs=None, reader=None):
+def load_array(filename, meta=None, band_specs=None, reader=None, n_threads=None):
     '''Create ElmStore from HDF4 / 5 or NetCDF files or TIF directories
 
     Parameters:
         :filename:   filename (HDF4 / 5 or NetCDF) or directory name (TIF)
         :meta:       meta data from "filename" already loaded
         :band_specs: list of strings or elm.readers.BandSpec objects
-        :reader:     named reader from elm.readers - one of:  ('tif', 'hdf4', 'hdf5', 'netcdf')
+        :reader:     named reader from elm.readers - one of:  ('tif', 'hdf4', 'hdf5', 'h5py', 'netcdf')
+                     where 'h5py' reads HDF5 with h5py (see elm.readers.hdf5)
+        :n_threads:  number of bands of HDF4 / 5 or TIF read at once
+                     (see elm.readers.band_reader)
 
     Returns:
         :es:         ElmStore (xarray.Dataset) with bands specified by band_specs as DataArrays in "data_vars" attribute
@@ -63,18 +66,23 @@ def load_array(filename, meta=None, band_specs=None, reader=None):
             meta = _load_meta(filename, ftype)
     if ftype == 'netcdf':
         return load_netcdf_array(filename, meta, band_specs=band_specs)
-    elif ftype == 'hdf5':
-        return load_hdf5_array(filename, meta, band_specs=band_specs)
+    elif ftype in ('hdf5', 'h5py'):
+        return load_hdf5_array(filename, meta, band_specs=band_specs,
+                               n_threads=n_threads)
     elif ftype == 'hdf4':
-        return load_hdf4_array(filename, meta, band_specs=band_specs)
+        return load_hdf4_array(filename, meta, band_specs=band_specs,
+                               n_threads=n_threads)
     elif ftype == 'tif':
-        return load_dir_of_tifs_array(filename, meta, band_specs=band_specs)
+        return load_dir_of_tifs_array(filename, meta, band_specs=band_specs,
+                                      n_threads=n_threads)
     elif ftype == 'hdf':
         try:
-            es = load_hdf4_array(filename, meta, band_specs=band_specs)
+            es = load_hdf4_array(filename, meta, band_specs=band_specs,
+                                 n_threads=n_threads)
         except Exception as e:
             logger.info('NOTE: guessed HDF4 type. Failed: {}. \nTrying HDF5'.format(repr(e)))
-            es = load_hdf5_array(filename, meta, band_specs=band_specs)
+            es = load_hdf5_array(filename, meta, band_specs=band_specs,
+                                 n_threads=n_threads)
         return es
 
 
@@ -84,6 +92,8 @@ def _load_meta(filename, ftype, **kwargs):
         return load_netcdf_meta(filename)
     elif ftype == 'hdf5':
         return load_hdf5_meta(filename)
+    elif ftype == 'h5py':
+        return load_hdf5_meta(filename, backend='h5py')
     elif ftype == 'hdf4':
         return load_hdf4_meta(filename)
     elif ftype == 'tif':
@@ -9,6 +9,23 @@ Tools for reading NetCDF files.  Typically use the interface through
     - :func:`elm.readers.load_array`
     - :func:`elm.readers.load_meta`
 
+load_netcdf_meta reads metadata with a handle from
+elm.readers.handle_pool.  load_netcdf_array opens its own handle
+for the bands, which are dask arrays chunked along the variable's
+on-disk chunks (multiples of them along the leading dimensions,
+e.g. time, up to about CHUNK_SIZE elements per chunk), so nothing is
+read until the values of a band are used.  The bands read from that
+handle after load_netcdf_array returns, so it is not a pooled handle
+(used by one thread at a time); it is closed when the bands are
+garbage collected.
+
+A BandSpec window selects part of a variable before it is read.
+The window is either:
+
+ * ``((row_start, row_stop), (col_start, col_stop))`` - indices on
+   the y and x dimensions, as for GeoTiff / HDF files, or
+ * a dict of dimension name to (start, stop) indices, e.g.
+   ``{'time': (0, 12), 'lat': (100, 300)}``
 '''
 from __future__ import print_function
 
@@ -16,19 +33,25 @@ from collections import OrderedDict
 import logging
 
 from affine import Affine
-import netCDF4 as nc
+import numpy as np
 import xarray as xr
 
+from elm.config.dtype_policy import as_float_dtype
 from elm.readers.util import (geotransform_to_bounds,
                               VALID_X_NAMES, VALID_Y_NAMES,
-                              take_geo_transform_from_meta)
+                              take_geo_transform_from_meta,
+                              window_geo_transform)
 from elm.readers import ElmStore
+from elm.readers.handle_pool import open_netcdf
+from elm.readers.packed import pack_band
 from elm.sample_util.metadata_selection import match_meta
 
 __all__ = ['load_netcdf_meta', 'load_netcdf_array']
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 2 ** 22
+
 
 def _nc_str_to_dict(nc_str):
     if isinstance(nc_str, str):
@@ -42,17 +65,70 @@ def _nc_str_to_dict(nc_str):
 
 def _get_nc_attrs(nc_dataset):
 
-    return {k: _nc_str_to_dict(nc_dataset.getncattr(k))
-            for k in nc_dataset.ncattrs()}
+    return {k: _nc_str_to_dict(v) for k, v in nc_dataset.attrs.items()}
 
 
 def _get_subdatasets(nc_dataset):
-    sds = []
-    for k in nc_dataset.variables.keys():
-        var_obj = nc_dataset.variables[k]
-        obj = {d: var_obj.getncattr(d) for d in var_obj.ncattrs()}
-        sds.append(obj)
-    return sds
+    return [dict(nc_dataset.variables[k].attrs)
+            for k in nc_dataset.variables.keys()]
+
+
+def _dask_chunks(data_arr, chunk_size=CHUNK_SIZE):
+    '''dask chunks (dict of dim to size) for a NetCDF variable: its
+    on-disk chunks, or one (y, x) slice of it if not chunked on disk,
+    grown by multiples along the leading dims to about chunk_size
+    elements'''
+    shape = data_arr.shape
+    disk_chunks = data_arr.encoding.get('chunksizes')
+    if not disk_chunks or data_arr.encoding.get('contiguous'):
+        disk_chunks = (1,) * (len(shape) - 2) + shape[-2:]
+    chunks = [max(1, min(c, s)) for c, s in zip(disk_chunks, shape)]
+    for axis, size in enumerate(shape):
+        n = int(np.prod(chunks))
+        if n >= chunk_size:
+            break
+        chunks[axis] = min(size, chunks[axis] * max(1, chunk_size // n))
+    return dict(zip(data_arr.dims, chunks))
+
+
+def _window_indexers(data_arr, window):
+    '''isel indexers (dict of dim to slice) from a BandSpec window'''
+    if not window:
+        return {}
+    if isinstance(window, dict):
+        bad = set(window) - set(data_arr.dims)
+        if bad:
+            raise ValueError('NetCDF window dims {} are not dims of {} '
+                             '{}'.format(sorted(bad), data_arr.name, data_arr.dims))
+        return {dim: slice(*w) for dim, w in window.items()}
+    coords = _normalize_coords(data_arr)
+    (y_start, y_stop), (x_start, x_stop) = window
+    return {coords['y'].dims[0]: slice(y_start, y_stop),
+            coords['x'].dims[0]: slice(x_start, x_stop)}
+
+
+def _window_offsets(data_arr, indexers):
+    '''(row, col) of the corner of a window given by indexers'''
+    coords = _normalize_coords(data_arr)
+    row = indexers.get(coords['y'].dims[0], slice(None)).start or 0
+    col = indexers.get(coords['x'].dims[0], slice(None)).start or 0
+    return row, col
+
+
+def _read_variable(ds, name, band_spec, packed):
+    '''Lazy (dask) DataArray of variable name, windowed and decoded'''
+    data_arr = ds[name]
+    if data_arr.ndim:
+        data_arr = data_arr.chunk(_dask_chunks(data_arr))
+    indexers = _window_indexers(data_arr, getattr(band_spec, 'window', None))
+    if indexers:
+        data_arr = data_arr.isel(**indexers)
+    # With packed bands, decode without scaling and masking
+    data_arr = xr.decode_cf(data_arr.to_dataset(name=name),
+                            mask_and_scale=not packed)[name]
+    if packed:
+        data_arr = pack_band(data_arr)
+    return data_arr, indexers
 
 
 def _normalize_coords(ds):
@@ -90,14 +166,14 @@ def load_netcdf_meta(datafile):
     Returns:
         :meta: Dictionary of metadata
     '''
-    ras = nc.Dataset(datafile)
-    attrs = _get_nc_attrs(ras)
-    sds = _get_subdatasets(ras)
-    meta = {'meta': attrs,
-            'band_meta': sds,
-            'name': datafile,
-            'variables': list(ras.variables.keys()),
-            }
+    with open_netcdf(datafile) as ras:
+        attrs = _get_nc_attrs(ras)
+        sds = _get_subdatasets(ras)
+        meta = {'meta': attrs,
+                'band_meta': sds,
+                'name': datafile,
+                'variables': list(ras.variables.keys()),
+                }
     return meta
 
 
@@ -109,32 +185,45 @@ def load_netcdf_array(datafile, meta, band_specs=None):
         :datafile: str: Path on disk to NetCDF file
         :meta: dict: netcdf metadata object
         :variables: dict<str:str>, list<str>: list of variables to load
+                    or BandSpecs (with optional window, see
+                    elm.readers.netcdf)
 
     Returns:
-        :new_es: ElmStore xarray.Dataset
+        :new_es: ElmStore xarray.Dataset with dask arrays as bands
     '''
     logger.debug('load_netcdf_array: {}'.format(datafile))
-    ds = xr.open_dataset(datafile)
-    if band_specs:
-        data = []
-        if isinstance(band_specs, dict):
-            data = { k: ds[getattr(v, 'name', v)] for k, v in band_specs.items() }
-            band_spec = tuple(band_specs.values())[0]
-        if isinstance(band_specs, (list, tuple)):
-            data = {getattr(v, 'name', v): ds[getattr(v, 'name', v)]
-                    for v in band_specs }
-            band_spec = band_specs[0]
-        data = OrderedDict(data)
+    if isinstance(band_specs, dict):
+        specs = OrderedDict((k, v) for k, v in band_specs.items())
+        names = OrderedDict((k, getattr(v, 'name', v)) for k, v in band_specs.items())
+        band_spec = tuple(band_specs.values())[0]
+    elif band_specs:
+        specs = OrderedDict((getattr(v, 'name', v), v) for v in band_specs)
+        names = OrderedDict((k, k) for k in specs)
+        band_spec = band_specs[0]
     else:
-        data = OrderedDict([(v, ds[v]) for v in meta['variables']])
+        specs = OrderedDict((v, None) for v in meta['variables'])
+        names = OrderedDict((k, k) for k in specs)
         band_spec = None
+    data = OrderedDict()
+    indexers = []
+    # not open_netcdf: the lazy bands keep using this handle
+    ds = xr.open_dataset(datafile, decode_cf=False)
+    for k, spec in specs.items():
+        packed = getattr(spec, 'packed', False)
+        data[k], band_indexers = _read_variable(ds, names[k], spec, packed)
+        indexers.append(band_indexers)
     geo_transform = take_geo_transform_from_meta(band_spec=band_spec,
                                                   required=True,
                                                   **meta['meta'])
+    first = next(iter(data))
+    if geo_transform is not None and indexers[0]:
+        geo_transform = window_geo_transform(geo_transform,
+                                             _window_offsets(data[first], indexers[0]))
     for b, sub_dataset_name in zip(meta['band_meta'], data):
         b['geo_transform'] = meta['geo_transform'] = geo_transform
         b['sub_dataset_name'] = sub_dataset_name
+    data = OrderedDict((k, as_float_dtype(v)) for k, v in data.items())
     new_es = ElmStore(data,
-                    coords=_normalize_coords(ds),
+                    coords=_normalize_coords(xr.Dataset(data)),
                     attrs=meta)
     return new_es
@@ -0,0 +1,187 @@
+'''
+----------------------
+
+``elm.readers.packed``
+~~~~~~~~~~~~~~~~~~~~~~
+
+Integer bands kept packed, as stored in the file, with the
+scale / offset / fill metadata needed to decode them to floats.
+
+HDF4 / HDF5 / NetCDF products often store int16 bands with
+"scale_factor" and "add_offset" attributes.  With
+``BandSpec(..., packed=True)`` the readers keep such a band
+as integers and add a "packed" dict to the band's attrs.
+A packed sample is half the size of a float32 sample, in memory,
+in caches of samples and when sent between dask workers.
+
+Bands are decoded only when floats are needed, chunk by chunk,
+using the CF conventions::
+
+    value = packed * scale_factor + add_offset
+
+with NaN where packed equals the fill value or is outside the
+"valid_range" (or within the "invalid_range"), compared in packed
+units.  The float dtype is that of elm.config.dtype_policy, or
+float32 if there is no policy.
+
+elm.readers.flatten decodes packed bands directly into the
+flattened array.  A Pipeline decodes packed bands before steps
+other than SelectCanvas, Flatten and Transpose.
+'''
+import logging
+
+import numpy as np
+import xarray as xr
+
+from elm.config.dtype_policy import get_float_dtype
+from elm.readers.util import (_case_insensitive_lookup,
+                              extract_invalid_range,
+                              extract_valid_range,
+                              MISSING_VALUE_WORDS)
+
+__all__ = ['packing_from_meta',
+           'pack_band',
+           'is_packed',
+           'decode_values',
+           'decode_band',
+           'decode_packed']
+
+logger = logging.getLogger(__name__)
+
+PACKED = 'packed'
+DECODED = 'decoded_from_packed'
+DECODE_CHUNK_SIZE = 2 ** 20
+
+SCALE_FACTOR_WORDS = (r'^scale[\s\-_]*factor$', r'^scale$')
+ADD_OFFSET_WORDS = (r'^add[\s\-_]*offset$', r'^offset$')
+FILL_VALUE_WORDS = (r'^_?fill[\s\-_]*value$', r'^nodata$') + MISSING_VALUE_WORDS
+
+
+def _lookup(attrs, words):
+    val = _case_insensitive_lookup(attrs, words, set())
+    if isinstance(val, list):
+        # a scalar parsed from a string
+        val = val[0] if val else None
+    return val
+
+
+def packing_from_meta(**attrs):
+    '''Return a dict of "scale_factor", "add_offset", "fill_value",
+    "valid_range" and "invalid_range" (None if not found) from
+    metadata attrs of a band'''
+    scale_factor = _lookup(attrs, SCALE_FACTOR_WORDS)
+    add_offset = _lookup(attrs, ADD_OFFSET_WORDS)
+    return {'scale_factor': 1. if scale_factor is None else scale_factor,
+            'add_offset': 0. if add_offset is None else add_offset,
+            'fill_value': _lookup(attrs, FILL_VALUE_WORDS),
+            'valid_range': extract_valid_range(**attrs),
+            'invalid_range': extract_invalid_range(**attrs)}
+
+
+def pack_band(data_arr, **packing):
+    '''Mark an integer DataArray as packed (in place)
+
+    Parameters:
+        :data_arr: xarray.DataArray - unchanged if not integer
+        :packing:  keys of packing_from_meta overriding those found
+                   in data_arr.attrs
+
+    Returns:
+        :data_arr: the DataArray
+    '''
+    if data_arr.dtype.kind not in 'iu':
+        return data_arr
+    pack = packing_from_meta(**data_arr.attrs)
+    pack.update((k, v) for k, v in packing.items() if v is not None)
+    data_arr.attrs[PACKED] = pack
+    return data_arr
+
+
+def is_packed(X):
+    '''Does X (ElmStore, xarray.Dataset or DataArray) have packed bands?'''
+    if hasattr(X, 'data_vars'):
+        return any(PACKED in arr.attrs for arr in X.data_vars.values())
+    return PACKED in getattr(X, 'attrs', {})
+
+
+def _na_mask(chunk, packing):
+    mask = None
+    fill_value = packing.get('fill_value')
+    if fill_value is not None:
+        mask = chunk == fill_value
+    valid_range = packing.get('valid_range')
+    if valid_range is not None and len(valid_range) == 2:
+        invalid = (chunk < valid_range[0]) | (chunk > valid_range[1])
+        mask = invalid if mask is None else (mask | invalid)
+    invalid_range = packing.get('invalid_range')
+    if invalid_range is not None and len(invalid_range) == 2:
+        invalid = (chunk > invalid_range[0]) & (chunk < invalid_range[1])
+        mask = invalid if mask is None else (mask | invalid)
+    return mask
+
+
+def decode_values(values, packing, out=None, dtype=None,
+                  chunk_size=DECODE_CHUNK_SIZE):
+    '''Decode packed integer values to floats, chunk by chunk
+
+    Parameters:
+        :values:     packed numpy array
+        :packing:    dict from packing_from_meta
+        :out:        array of values' size to decode into, such as a
+                     column of a flattened array, or None to allocate one
+        :dtype:      float dtype if out is None, default: the float
+                     dtype policy or float32
+        :chunk_size: number of values decoded at a time
+
+    Returns:
+        :out:        decoded values
+    '''
+    if out is None:
+        dtype = get_float_dtype(np.float32) if dtype is None else np.dtype(dtype)
+        out = np.empty(values.shape, dtype=dtype)
+    src = values.reshape(-1)
+    dst = out.reshape(-1)
+    if not np.may_share_memory(dst, out):
+        raise ValueError('Expected "out" that can be decoded into as 1-d')
+    scale_factor = dst.dtype.type(packing.get('scale_factor', 1.))
+    add_offset = dst.dtype.type(packing.get('add_offset', 0.))
+    for start in range(0, src.size, chunk_size):
+        chunk = src[start:start + chunk_size]
+        decoded = dst[start:start + chunk_size]
+        np.copyto(decoded, chunk, casting='unsafe')
+        if scale_factor != 1:
+            decoded *= scale_factor
+        if add_offset:
+            decoded += add_offset
+        mask = _na_mask(chunk, packing)
+        if mask is not None:
+            decoded[mask] = np.NaN
+    return out
+
+
+def decode_band(data_arr, dtype=None, chunk_size=DECODE_CHUNK_SIZE):
+    '''Return a float DataArray decoded from a packed DataArray,
+    or data_arr if it is not packed.  See decode_values'''
+    packing = data_arr.attrs.get(PACKED)
+    if packing is None:
+        return data_arr
+    values = decode_values(data_arr.values, packing, dtype=dtype,
+                           chunk_size=chunk_size)
+    attrs = dict(data_arr.attrs)
+    attrs[DECODED] = attrs.pop(PACKED)
+    return xr.DataArray(values, coords=data_arr.coords, dims=data_arr.dims,
+                        attrs=attrs, name=data_arr.name)
+
+
+def decode_packed(X, dtype=None, chunk_size=DECODE_CHUNK_SIZE):
+    '''Return X (ElmStore or xarray.Dataset) with packed bands
+    decoded, or X if it has no packed bands.  See decode_values'''
+    if not hasattr(X, 'data_vars') or not is_packed(X):
+        return X
+    new = X.copy(deep=False)
+    for band, data_arr in X.data_vars.items():
+        if PACKED in data_arr.attrs:
+            logger.debug('Decode packed band {}'.format(band))
+            new[band] = decode_band(data_arr, dtype=dtype,
+                                    chunk_size=chunk_size)
+    return new
@@ -20,7 +20,10 @@ import numpy as np
 import scipy.interpolate as spi
 import xarray as xr
 
+from elm.config.dtype_policy import get_float_dtype
 from elm.readers import ElmStore, Canvas
+from elm.readers.flat_store import FlatStore, as_elm_store, as_flat_store
+from elm.readers.packed import PACKED, decode_values
 from elm.readers.util import (canvas_to_coords,
                               VALID_X_NAMES,
                               VALID_Y_NAMES,
@@ -96,9 +99,110 @@ def aggregate_simple(es, **kwargs):
     return ElmStore(agged, attrs=es.attrs, add_canvas=False, lost_axis=lost_axes[0])
 
 
+def _aligned_axis(old_origin, old_res, old_size,
+                  new_origin, new_res, new_size):
+    '''Return (start, step, repeat, trim) if the new axis is the old one
+    sliced, strided by an integer step (coarser grid) or repeated an
+    integer number of times (finer grid), else None.  New values are::
+
+        np.repeat(old[start::step], repeat)[trim:trim + new_size]
+    '''
+    if not old_res or not new_res or (old_res > 0) != (new_res > 0):
+        return None
+    ratio = old_res / new_res
+    if abs(ratio) >= 1:
+        repeat, step, fine_res = int(round(ratio)), 1, new_res
+        if not np.isclose(ratio, repeat):
+            return None
+    else:
+        repeat, step, fine_res = 1, int(round(1 / ratio)), old_res
+        if not np.isclose(1 / ratio, step):
+            return None
+    offset = (new_origin - old_origin) / fine_res
+    ioffset = int(round(offset))
+    if not np.isclose(offset, ioffset, rtol=0, atol=1e-6):
+        return None
+    first = ioffset // repeat
+    last = (ioffset + (new_size - 1) * step) // repeat
+    if first < 0 or last >= old_size:
+        return None
+    return first, step, repeat, ioffset % repeat
+
+
+def _regular_axis(coord):
+    '''Return (origin, resolution) of evenly spaced coord values, or None'''
+    coord = np.asarray(coord)
+    if coord.ndim != 1 or coord.size < 2 or coord.dtype.kind not in 'iuf':
+        return None
+    res = coord[1] - coord[0]
+    if not res or not np.allclose(np.diff(coord), res, rtol=1e-6, atol=0):
+        return None
+    return coord[0], res
+
+
+def _select_aligned(data_arr, new_canvas):
+    '''Select new_canvas from data_arr by slicing, striding and np.repeat
+    when data_arr's coordinates are on a grid aligned with new_canvas
+    (see _aligned_axis), else return None'''
+    new_gt = new_canvas.geo_transform
+    if new_gt is None or set(data_arr.dims) != set(new_canvas.dims):
+        return None
+    if new_gt[2] or new_gt[4]:
+        # rotated grid
+        return None
+    old_canvas = data_arr.canvas
+    for at in ('zsize', 'tsize', 'zbounds', 'tbounds'):
+        if getattr(old_canvas, at) != getattr(new_canvas, at):
+            return None
+    dims = data_arr.dims
+    xaxis = [idx for idx, d in enumerate(dims) if d.lower() in VALID_X_NAMES]
+    yaxis = [idx for idx, d in enumerate(dims) if d.lower() in VALID_Y_NAMES]
+    if len(xaxis) != 1 or len(yaxis) != 1:
+        return None
+    xaxis, yaxis = xaxis[0], yaxis[0]
+    old_x = _regular_axis(data_arr.coords[dims[xaxis]].values)
+    old_y = _regular_axis(data_arr.coords[dims[yaxis]].values)
+    if old_x is None or old_y is None:
+        return None
+    axes = ((xaxis, new_canvas.buf_xsize,
+             _aligned_axis(old_x[0], old_x[1], data_arr.shape[xaxis],
+                           new_gt[0], new_gt[1], new_canvas.buf_xsize)),
+            (yaxis, new_canvas.buf_ysize,
+             _aligned_axis(old_y[0], old_y[1], data_arr.shape[yaxis],
+                           new_gt[3], new_gt[5], new_canvas.buf_ysize)))
+    if any(aligned is None for _, _, aligned in axes):
+        return None
+    values = data_arr.values
+    for axis, size, (start, step, repeat, trim) in axes:
+        index = [slice(None)] * values.ndim
+        if repeat == 1:
+            # a view of values
+            index[axis] = slice(start, start + (size - 1) * step + 1, step)
+            values = values[tuple(index)]
+        else:
+            stop = (trim + size - 1) // repeat + start + 1
+            index[axis] = slice(start, stop)
+            values = np.repeat(values[tuple(index)], repeat, axis=axis)
+            index[axis] = slice(trim, trim + size)
+            values = values[tuple(index)]
+    new_coords = canvas_to_coords(new_canvas)
+    coords = OrderedDict((d, new_coords[d] if d in new_coords and idx in (xaxis, yaxis)
+                          else data_arr.coords[d].values)
+                         for idx, d in enumerate(dims))
+    return xr.DataArray(values, coords=coords, dims=dims,
+                        name=data_arr.name)
+
+
 def select_canvas(es, new_canvas):
     '''reindex_like new_canvas for every band (DataArray) in ElmStore
 
+    Bands with coordinates on a grid aligned with new_canvas (the same
+    resolution or an integer multiple of it, offset by a whole number of
+    pixels, without rotation) are selected by slicing, strided views or np.repeat
+    (each pixel of new_canvas taking the value of the pixel that
+    contains its upper left corner).  Other bands are resampled with
+    the nearest neighbor method of xarray's reindex_like.
+
     Parameters:
         :es: ElmStore
         :new_canvas: an elm.readers.Canvas object
@@ -116,20 +220,21 @@ def select_canvas(es, new_canvas):
             new_arr = data_arr
             attrs = data_arr.attrs
         else:
-            new_coords = canvas_to_coords(new_canvas)
-            old_coords = canvas_to_coords(data_arr.canvas)
             old_dims = data_arr.canvas.dims
             new_dims = new_canvas.dims
-            shp_order = []
             attrs = copy.deepcopy(data_arr.attrs)
             attrs['canvas'] = new_canvas
             for nd in new_dims:
                 if not nd in old_dims:
                     raise ValueError()
-                shp_order.append(old_dims.index(nd))
-            index_to_make = xr.Dataset(new_coords)
-            data_arr = data_arr.reindex_like(index_to_make, method='nearest')
-        es_new_dict[band] = data_arr
+            new_arr = _select_aligned(data_arr, new_canvas)
+            if new_arr is None:
+                logger.debug('Resample {} with reindex_like'.format(band))
+                new_coords = canvas_to_coords(new_canvas)
+                index_to_make = xr.Dataset(new_coords)
+                new_arr = data_arr.reindex_like(index_to_make, method='nearest')
+            new_arr.attrs = attrs
+        es_new_dict[band] = new_arr
     attrs = copy.deepcopy(es.attrs)
     attrs['canvas'] = new_canvas
     es_new = ElmStore(es_new_dict, attrs=attrs)
@@ -138,7 +243,9 @@ def select_canvas(es, new_canvas):
 
 
 def drop_na_rows(flat):
-    '''Drop any NA rows from ElmStore flat'''
+    '''Drop any NA rows from ElmStore (or FlatStore) flat'''
+    if isinstance(flat, FlatStore):
+        return flat.drop_na_rows()
     check_is_flat(flat)
     flat_dropped = flat.flat.dropna(dim='space')
     flat_dropped.attrs.update(flat.attrs)
@@ -150,19 +257,25 @@ def drop_na_rows(flat):
     return no_na
 
 
-def flatten(es, ravel_order='C'):
+def flatten(es, ravel_order='C', flat_store=False):
     '''Given an ElmStore with different rasters (DataArray) as bands,
     flatten the rasters into a single 2-D DataArray called "flat"
     in a new ElmStore.
 
     Params:
         :elm_store:  3-d ElmStore (band, y, x)
+        :ravel_order: order of raveling each band, see np.ravel
+        :flat_store: return a FlatStore (elm.readers.flat_store)
+                     rather than an ElmStore, without building the
+                     xarray indexes of "flat"
 
     Returns:
-        :elm_store:  2-d ElmStore (space, band)
+        :elm_store:  2-d ElmStore (space, band) or FlatStore
     '''
+    if isinstance(es, FlatStore):
+        return es if flat_store else es.to_elm_store()
     if check_is_flat(es, raise_err=False):
-        return es
+        return as_flat_store(es) if flat_store else es
     shared_canvas = get_shared_canvas(es)
     if not shared_canvas:
         raise ValueError('es.select_canvas should be called before flatten when, as in this case, the bands do not all have the same Canvas')
@@ -179,38 +292,49 @@ def flatten(es, ravel_order='C'):
             # TODO consider canvas here instead
             # of assume fixed size, but that
             # makes reverse transform harder (is that important?)
-            store = np.empty((data_arr.values.size,
-                              len(es.data_vars))) * np.NaN
+            store = np.full((data_arr.values.size, len(es.data_vars)),
+                            np.NaN, dtype=get_float_dtype(np.float64))
         if data_arr.values.ndim == 1:
             # its already flat
             new_values = data_arr.values
         else:
             new_values = data_arr.values.ravel(order=ravel_order)
-        store[:, idx] = new_values
+        if PACKED in data_arr.attrs:
+            # decode into the column without a full size float copy
+            decode_values(new_values, data_arr.attrs[PACKED], out=store[:, idx])
+        else:
+            store[:, idx] = new_values
     attrs = {}
     attrs['canvas'] = shared_canvas
     attrs['old_canvases'] = old_canvases
     attrs['old_dims'] = old_dims
     attrs['flatten_data_array'] = True
     attrs.update(copy.deepcopy(es.attrs))
-    flat = ElmStore({'flat': xr.DataArray(store,
-                        coords=[('space', np.arange(store.shape[0])),
-                                ('band', band_names)],
-                        dims=('space',
-                              'band'),
-                        attrs=attrs)},
-                    attrs=attrs)
-    return flat
+    flat = FlatStore(store, band_names, canvas=attrs['canvas'], attrs=attrs)
+    if flat_store:
+        return flat
+    return flat.to_elm_store()
 
 
 def filled_flattened(na_dropped):
     '''Used by inverse_flatten to fill areas that were dropped
     out of X due to NA/NaN'''
+    if isinstance(na_dropped, FlatStore):
+        if na_dropped.mask is None:
+            return na_dropped
+        mask, values = na_dropped.mask, na_dropped.values
+        filled = np.full((mask.size, values.shape[1]), np.NaN,
+                         dtype=get_float_dtype(np.float64))
+        filled[mask] = values
+        attrs = dict(na_dropped.attrs)
+        attrs['notnull_shape'] = values.shape
+        return FlatStore(filled, na_dropped.band, canvas=na_dropped.canvas,
+                         attrs=attrs)
     shp = getattr(na_dropped, 'shape_before_drop_na_rows', None)
     if not shp:
         return na_dropped
     shp = (shp[0], len(na_dropped.band_order))
-    filled = np.empty(shp) * np.NaN
+    filled = np.full(shp, np.NaN, dtype=get_float_dtype(np.float64))
     filled[na_dropped.space, :] = na_dropped.flat.values
     attrs = copy.deepcopy(na_dropped.attrs)
     attrs.update(copy.deepcopy(na_dropped.flat.attrs))
@@ -252,7 +376,7 @@ def inverse_flatten(flat, add_canvas=False, **attrs):
     about x,y dims were preserved when the 2-d input ElmStore was created
 
     Params:
-        :flat: a 2-d ElmStore (space, band)
+        :flat: a 2-d ElmStore (space, band) or FlatStore
         :attrs: attribute dict to update the dict of the returned ElmStore
 
     Returns:
@@ -260,9 +384,17 @@ def inverse_flatten(flat, add_canvas=False, **attrs):
     '''
     flat = filled_flattened(flat)
     attrs2 = copy.deepcopy(flat.attrs)
+    if isinstance(flat, FlatStore):
+        # as in the attrs of FlatStore.to_elm_store
+        attrs2['band_order'] = list(flat.band)
+        if flat.canvas is not None:
+            attrs2['canvas'] = flat.canvas
+        old_dims = flat.attrs['old_dims']
+    else:
+        old_dims = flat.old_dims
     attrs2.update(copy.deepcopy(attrs))
     attrs = attrs2
-    band_list = zip(flat.flat.band_order, flat.old_dims)
+    band_list = zip(flat.flat.band_order, old_dims)
     es_new_dict = OrderedDict()
     if 'canvas' in attrs:
         new_coords = canvas_to_coords(attrs['canvas'])
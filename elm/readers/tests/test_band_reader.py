@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from elm.readers.band_reader import (_build_overviews, _n_threads,
+                                     overview_factors, read_bands)
+
+
+def test_read_bands_concurrent():
+    barrier = threading.Barrier(3, timeout=10)
+    def reader(idx):
+        # fails with BrokenBarrierError unless 3 bands are read at once
+        barrier.wait()
+        return idx
+    assert read_bands([lambda idx=idx: reader(idx) for idx in range(3)],
+                      n_threads=3) == [0, 1, 2]
+
+
+def test_read_bands_serial(monkeypatch):
+    main = threading.current_thread()
+    readers = [lambda idx=idx: (idx, threading.current_thread() is main)
+               for idx in range(4)]
+    assert read_bands(readers, n_threads=1) == [(idx, True) for idx in range(4)]
+    monkeypatch.setenv('ELM_READ_THREADS', '2')
+    assert _n_threads(None, 4) == 2
+    assert _n_threads(8, 4) == 4
+    monkeypatch.setenv('ELM_READ_THREADS', '1')
+    assert read_bands(readers) == [(idx, True) for idx in range(4)]
+
+
+def test_read_bands_error():
+    def bad():
+        raise ValueError('bad band')
+    with pytest.raises(ValueError):
+        read_bands([lambda: 1, bad], n_threads=2)
+
+
+def test_overview_factors():
+    assert overview_factors((800, 600), (100, 75)) == [2, 4, 8]
+    assert overview_factors((800, 600), (100, 150)) == [2, 4]
+    assert overview_factors((800, 600), (None, 300)) == [2]
+    assert overview_factors((800, 600), (500, 400)) == []
+    assert overview_factors((800, 600), (None, None)) == []
+
+
+class Band(object):
+    def __init__(self, count):
+        self.count = count
+
+    def GetOverviewCount(self):
+        return self.count
+
+
+class Dataset(object):
+    RasterXSize, RasterYSize = 1000, 800
+
+    def __init__(self, overviews=0):
+        self.band = Band(overviews)
+        self.built = []
+
+    def GetRasterBand(self, idx):
+        return self.band
+
+    def BuildOverviews(self, resampling, factors):
+        self.built.append(factors)
+        self.band.count = len(factors)
+        return 0
+
+
+def test_build_overviews():
+    data_file = Dataset()
+    assert not _build_overviews(data_file, 'f', buf_xsize=1000)
+    assert _build_overviews(data_file, 'f', xsize=400, ysize=400,
+                            buf_xsize=50, buf_ysize=100)
+    assert data_file.built == [[2, 4]]
+    # cached: not built again
+    assert not _build_overviews(data_file, 'f', buf_xsize=125, buf_ysize=100)
+    assert data_file.built == [[2, 4]]
+    assert not _build_overviews(Dataset(overviews=3), 'f', buf_xsize=10)
@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+import xarray as xr
+
+from elm.pipeline import steps
+from elm.pipeline.tests.util import random_elm_store
+from elm.readers import (BandStats, GranuleIndex, band_stats_catalog,
+                         file_band_stats, flatten, granule_from_meta, iter_granules,
+                         merge_band_stats)
+from elm.readers.tests.test_granule_index import hdf4_like_meta
+
+
+def _values(seed=0, size=1000, nan_fraction=0.1):
+    values = np.random.RandomState(seed).normal(5, 2, size)
+    values[:int(size * nan_fraction)] = np.NaN
+    return values
+
+
+def test_band_stats_welford():
+    values = _values()
+    stats = BandStats(hist_range=(-5, 15), bins=20).update(values, chunk_size=37)
+    good = values[~np.isnan(values)]
+    assert stats.size == 1000 and stats.count == 900
+    assert np.isclose(stats.nan_fraction, 0.1)
+    assert np.isclose(stats.mean, good.mean())
+    assert np.isclose(stats.var, good.var())
+    assert (stats.min, stats.max) == (good.min(), good.max())
+    assert np.array_equal(stats.hist, np.histogram(good, bins=20, range=(-5, 15))[0])
+
+
+def test_band_stats_merge_round_trip():
+    v1, v2 = _values(0), _values(1, size=500, nan_fraction=0.5)
+    s1 = BandStats((-5, 15), 10).update(v1)
+    s2 = BandStats((-5, 15), 10).update(v2)
+    merged = s1.merge(s2)
+    both = np.concatenate((v1, v2))
+    expected = BandStats((-5, 15), 10).update(both)
+    for attr in ('size', 'count', 'mean', 'var', 'min', 'max'):
+        assert np.isclose(getattr(merged, attr), getattr(expected, attr))
+    assert np.array_equal(merged.hist, expected.hist)
+    copied = BandStats.from_dict(merged.to_dict())
+    assert np.isclose(copied.var, merged.var) and np.array_equal(copied.hist, merged.hist)
+    with pytest.raises(ValueError):
+        s1.merge(BandStats())
+    merged = merge_band_stats([{'a': s1}, {'a': s2, 'b': s1}])
+    assert merged['a'].count == expected.count and merged['b'] is s1
+
+
+STORES = {'f0.hdf': random_elm_store(bands=2, height=10, width=10),
+          'mostly_nan.hdf': random_elm_store(bands=2, height=10, width=10)}
+STORES['mostly_nan.hdf'].band_1.values[:9] = np.NaN
+
+
+def _load_array(filename, band_specs=None, reader=None):
+    if filename not in STORES:
+        raise ValueError('Cannot read {}'.format(filename))
+    return STORES[filename]
+
+
+def test_file_band_stats_set_na_from_meta():
+    X = random_elm_store(bands=1, height=10, width=10)
+    values = np.arange(100, dtype=np.int16).reshape(10, 10)
+    values[:5] = -9999
+    X['band_1'] = xr.DataArray(values, dims=('y', 'x'),
+                               attrs={'missing_value': -9999,
+                                      'valid_range': [0, 89]})
+    stats = file_band_stats('f.hdf', load_array=lambda f, **kw: X)['band_1']
+    assert stats.count == 40 and np.isclose(stats.nan_fraction, 0.6)
+    assert (stats.min, stats.max) == (50, 89)
+    assert np.isclose(stats.mean, np.arange(50, 90).mean())
+
+
+def test_catalog_index_and_scalers(tmpdir):
+    filenames = ['f0.hdf', 'mostly_nan.hdf', 'bad.hdf']
+    catalog = band_stats_catalog(filenames, load_array=_load_array, n_threads=2)
+    assert list(catalog) == ['f0.hdf', 'mostly_nan.hdf']
+    assert list(catalog['f0.hdf']) == ['band_1', 'band_2']
+    index = GranuleIndex([granule_from_meta(f, hdf4_like_meta(0, 0))
+                          for f in filenames])
+    index.add_band_stats(catalog)
+    assert index.stats_bands == ['band_1', 'band_2']
+    assert np.isclose(index.nan_fraction()[1], 0.45)
+    assert index.query(max_nan_fraction=0.2) == ['f0.hdf', 'bad.hdf']
+    path = str(tmpdir.join('index.csv'))
+    index.save(path)
+    loaded = GranuleIndex.load(path)
+    assert loaded.query(max_nan_fraction=0.2) == ['f0.hdf', 'bad.hdf']
+    stats = loaded.band_stats(['f0.hdf'])
+    assert stats['band_1'].count == 100 and stats['band_1'].nan_fraction == 0
+
+    X = flatten(STORES['f0.hdf'])
+    for step, sk_cls in ((steps.StandardScaler(), StandardScaler),
+                         (steps.MinMaxScaler(), MinMaxScaler)):
+        step.fit_from_stats(stats)
+        new_X, _, _ = step.fit_transform(X)
+        expected = sk_cls().fit_transform(X.flat.values)
+        assert np.allclose(new_X.flat.values, expected)
+    with pytest.raises(ValueError):
+        steps.StandardScaler().fit_from_stats(stats, band_order=['band_3'])
+
+
+def test_iter_granules_stats_of_matching_files(tmpdir):
+    # mostly_nan.hdf and bad.hdf match the bbox, f0.hdf does not
+    granules = [granule_from_meta('f0.hdf', hdf4_like_meta(30, 30)),
+                granule_from_meta('mostly_nan.hdf', hdf4_like_meta(0, 0)),
+                granule_from_meta('bad.hdf', hdf4_like_meta(0, 0))]
+    path = str(tmpdir.join('index.csv'))
+    GranuleIndex(granules).save(path)
+    reads = []
+    def load_array(filename, **kwargs):
+        reads.append(filename)
+        return _load_array(filename, **kwargs)
+    kwargs = dict(granule_index=path, bbox=[0, 0, 5, 5], max_nan_fraction=0.2,
+                  load_array=load_array)
+    assert list(iter_granules(**kwargs)) == ['bad.hdf']
+    assert sorted(reads) == ['bad.hdf', 'mostly_nan.hdf']
+    index = GranuleIndex.load(path)
+    assert index.stats_missing() == ['f0.hdf']
+    # failed files are not read again
+    assert list(iter_granules(**kwargs)) == ['bad.hdf']
+    assert len(reads) == 2
@@ -0,0 +1,110 @@
+import dill
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import PCA
+
+from elm.pipeline import Pipeline, steps
+from elm.pipeline.tests.util import random_elm_store
+from elm.readers import (ElmStore, FlatStore, as_elm_store, as_flat_store,
+                         drop_na_rows, flatten, inverse_flatten)
+
+
+def _flat_with_nans():
+    X = random_elm_store(bands=3, height=10, width=12)
+    X.band_1.values[0, :4] = np.NaN
+    X.band_3.values[5, 5] = np.NaN
+    return flatten(X)
+
+
+def test_round_trip():
+    flat = _flat_with_nans()
+    fs = as_flat_store(flat)
+    assert isinstance(fs, FlatStore) and fs.mask is None
+    assert fs.values is flat.flat.values
+    assert fs.flat.values is fs.values and fs.band_order == ['band_1', 'band_2', 'band_3']
+    assert fs.canvas is flat.attrs['canvas']
+    assert not hasattr(fs, '__dict__')
+    assert as_flat_store(fs) is fs and as_elm_store(flat) is flat
+    es = fs.to_elm_store()
+    assert isinstance(es, ElmStore)
+    assert np.array_equal(es.flat.values, flat.flat.values, equal_nan=True)
+    assert list(es.flat.band.values) == list(flat.flat.band.values)
+    fs2 = dill.loads(dill.dumps(fs))
+    assert np.array_equal(fs2.values, fs.values, equal_nan=True)
+
+
+def test_drop_na_rows_and_inverse():
+    flat = _flat_with_nans()
+    dropped = drop_na_rows(flat)
+    fs = drop_na_rows(as_flat_store(flat))
+    assert isinstance(fs, FlatStore)
+    assert fs.values.shape == dropped.flat.values.shape == (115, 3)
+    assert np.array_equal(fs.space, dropped.flat.space.values)
+    # a FlatStore from an ElmStore with dropped rows has the same mask
+    assert np.array_equal(as_flat_store(dropped).mask, fs.mask)
+    new = fs.new(fs.values[:, :2] * 2)
+    assert new.mask is fs.mask and new.band == ['band_0', 'band_1']
+    es = fs.to_elm_store()
+    assert es.drop_na_rows == 5
+    for X in (dropped, fs):
+        restored = inverse_flatten(X)
+        assert restored.band_1.values.shape == (10, 12)
+        assert np.isnan(restored.band_1.values).sum() == 5
+
+
+def test_pipeline_passes_flat_store():
+    X = random_elm_store(bands=3, height=10, width=12)
+    X.band_1.values[0, :4] = np.NaN
+    seen = []
+    def check_type(X, **kwargs):
+        seen.append(type(X))
+        return X
+    pipe = Pipeline([steps.Flatten(),
+                     steps.DropNaRows(),
+                     steps.Transform(PCA(n_components=2)),
+                     steps.StandardScaler(),
+                     steps.ModifySample(check_type),
+                     MiniBatchKMeans(n_clusters=2, random_state=0)])
+    pred, Xt = pipe.fit(X).predict(X, return_X=True)
+    assert seen == [ElmStore, ElmStore]
+    assert pred.shape == (116,)
+    assert isinstance(Xt, ElmStore)
+    assert list(Xt.flat.band.values) == ['feat_0', 'feat_1']
+    assert Xt.drop_na_rows == 4
+    Xt2, _, _ = Pipeline(pipe.steps[:4] + [steps.Flatten()]).transform(X)
+    assert isinstance(Xt2, ElmStore)
+    assert np.allclose(Xt2.flat.values, Xt.flat.values)
+
+
+def test_flatten_to_flat_store():
+    X = random_elm_store(bands=3, height=10, width=12)
+    fs = flatten(X, flat_store=True)
+    assert isinstance(fs, FlatStore) and fs.mask is None
+    assert fs.attrs['old_dims'] == [('y', 'x')] * 3
+    flat = flatten(X)
+    assert isinstance(flat, ElmStore)
+    assert np.array_equal(fs.values, flat.flat.values)
+    assert flatten(fs, flat_store=True) is fs
+    assert isinstance(flatten(flat, flat_store=True), FlatStore)
+    restored = inverse_flatten(fs)
+    assert np.array_equal(restored.band_2.values, X.band_2.values)
+    assert restored.band_order == ['band_1', 'band_2', 'band_3']
+
+
+def test_predict_many_flat_store():
+    X = random_elm_store(bands=3, height=10, width=12)
+    X.band_1.values[0, :4] = np.NaN
+    pipe = Pipeline([steps.Flatten(), steps.DropNaRows(),
+                     MiniBatchKMeans(n_clusters=2, random_state=0)]).fit(X)
+    flat_pred, raster = [pipe.predict_many(X=X, ensemble=[('tag', pipe)],
+                                           to_raster=to_raster)[0]
+                         for to_raster in (False, True)]
+    assert isinstance(flat_pred, FlatStore)
+    assert flat_pred.band == ['predict'] and flat_pred.values.shape == (116, 1)
+    pred, Xt = pipe.predict(X, return_X=True)
+    assert isinstance(Xt, FlatStore) and Xt.values.shape == (116, 3)
+    assert np.array_equal(flat_pred.values[:, 0], pred)
+    assert isinstance(raster, ElmStore)
+    assert raster.predict.values.shape == (10, 12)
+    assert np.isnan(raster.predict.values[0, :4]).all()
+    assert not np.isnan(raster.predict.values[1:]).any()
@@ -0,0 +1,109 @@
+import os
+
+import pandas as pd
+import pytest
+
+from elm.readers import GranuleIndex, granule_from_meta, iter_granules
+from elm.readers.util import Canvas
+
+
+def hdf4_like_meta(west, south, day=True, date='2016-01-01'):
+    return {'meta': {'WESTBOUNDINGCOORDINATE': str(west),
+                     'EASTBOUNDINGCOORDINATE': str(west + 10),
+                     'SOUTHBOUNDINGCOORDINATE': str(south),
+                     'NORTHBOUNDINGCOORDINATE': str(south + 10),
+                     'RANGEBEGINNINGDATE': date,
+                     'RANGEBEGINNINGTIME': '10:30:00.000000',
+                     'DAYNIGHTFLAG': 'Day' if day else 'Night'},
+            'band_meta': [{'sub_dataset_name': 'band_1'}]}
+
+
+@pytest.fixture
+def index():
+    granules = []
+    for idx, (west, south) in enumerate([(0, 0), (10, 0), (0, 10), (30, 30)]):
+        meta = hdf4_like_meta(west, south, day=idx % 2 == 0,
+                              date='2016-01-0{}'.format(idx + 1))
+        granules.append(granule_from_meta('f{}.hdf'.format(idx), meta))
+    granules.append(granule_from_meta('unknown.hdf', {'meta': {}}))
+    return GranuleIndex(granules, grid_cells=4)
+
+
+def test_granule_from_meta():
+    granule = granule_from_meta('a.hdf', hdf4_like_meta(-100, 40))
+    assert (granule['left'], granule['bottom'], granule['right'], granule['top']) == (-100, 40, -90, 50)
+    assert granule['time'] == pd.Timestamp('2016-01-01 10:30')
+    assert granule['is_day'] is True
+    canvas = Canvas(geo_transform=(-100, 0.5, 0, 50, 0, -0.5),
+                    buf_xsize=20, buf_ysize=10, dims=('y', 'x'))
+    granule = granule_from_meta('20160105_a.tif', {'band_meta': [{'canvas': canvas}]},
+                                time_from_filename=r'(\d{8})')
+    assert (granule['left'], granule['bottom'], granule['right'], granule['top']) == (-100, 45, -90, 50)
+    assert granule['time'] == pd.Timestamp('2016-01-05')
+    assert granule['is_day'] is None
+    tif_meta = {'band_meta': [{'geo_transform': (0, 1, 0, 10, 0, -1),
+                               'height': 10, 'width': 5}]}
+    granule = granule_from_meta('b', tif_meta)
+    assert (granule['left'], granule['bottom'], granule['right'], granule['top']) == (0, 0, 5, 10)
+    assert pd.isnull(granule['time'])
+
+
+def test_query(index):
+    assert index.query() == ['f0.hdf', 'f1.hdf', 'f2.hdf', 'f3.hdf', 'unknown.hdf']
+    assert index.query(bbox=(12, 2, 15, 5)) == ['f1.hdf', 'unknown.hdf']
+    assert index.query(bbox=(5, 5, 15, 15)) == ['f0.hdf', 'f1.hdf', 'f2.hdf', 'unknown.hdf']
+    assert index.query(bbox=(100, 100, 110, 110)) == ['unknown.hdf']
+    # a triangle over f0 and f2, not reaching f1
+    triangle = [(1, 1), (9, 1), (1, 19)]
+    assert index.query(polygon=triangle) == ['f0.hdf', 'f2.hdf', 'unknown.hdf']
+    # polygon inside one granule, granule inside a polygon
+    assert index.query(polygon=[(31, 31), (32, 31), (32, 32)]) == ['f3.hdf', 'unknown.hdf']
+    assert index.query(polygon=[(25, 25), (45, 25), (45, 45), (25, 45)]) == ['f3.hdf', 'unknown.hdf']
+    assert index.query(time_range=('2016-01-02', '2016-01-04')) == ['f1.hdf', 'f2.hdf', 'unknown.hdf']
+    assert index.query(time_range=(None, '2016-01-02')) == ['f0.hdf', 'unknown.hdf']
+    assert index.query(is_day=False) == ['f1.hdf', 'f3.hdf', 'unknown.hdf']
+    assert index.query(bbox=(0, 0, 20, 20), is_day=True,
+                       time_range=('2016-01-01', None)) == ['f0.hdf', 'f2.hdf', 'unknown.hdf']
+
+
+def test_save_load_and_iter_granules(index, tmpdir):
+    path = str(tmpdir.join('granules.csv'))
+    index.save(path)
+    loaded = GranuleIndex.load(path)
+    assert len(loaded) == len(index)
+    for query in ({'bbox': (12, 2, 15, 5)}, {'is_day': True},
+                  {'time_range': ('2016-01-02', '2016-01-04')}):
+        assert loaded.query(**query) == index.query(**query)
+    files = list(iter_granules(granule_index=path, geo_filters={'bbox': (12, 2, 15, 5)}))
+    assert files == ['f1.hdf', 'unknown.hdf']
+    assert list(iter_granules(granule_index=index, is_day=False, bbox=(0, 0, 20, 20))) == ['f1.hdf', 'unknown.hdf']
+
+
+def test_build_from_files(tmpdir):
+    metas = {}
+    for idx in range(3):
+        filename = str(tmpdir.join('g{}.hdf'.format(idx)))
+        open(filename, 'w').close()
+        metas[filename] = hdf4_like_meta(idx * 20, 0)
+    opened = []
+    def load_meta(filename, **kwargs):
+        opened.append(filename)
+        return metas[filename]
+    path = str(tmpdir.join('index.csv'))
+    kwargs = dict(top_dir=str(tmpdir), file_pattern=r'\.hdf$', load_meta=load_meta,
+                  granule_index=path, bbox=(25, 0, 30, 5))
+    assert [f.endswith('g1.hdf') for f in iter_granules(**kwargs)] == [True]
+    assert len(opened) == 3
+    # the saved index is used without loading meta again
+    assert [f.endswith('g2.hdf') for f in iter_granules(**dict(kwargs, bbox=(45, 0, 50, 5)))] == [True]
+    assert len(opened) == 3
+    # files added to / removed from top_dir after the index was saved
+    new = str(tmpdir.join('g3.hdf'))
+    open(new, 'w').close()
+    metas[new] = hdf4_like_meta(40, 0)
+    os.remove(str(tmpdir.join('g2.hdf')))
+    assert list(iter_granules(**dict(kwargs, bbox=(45, 0, 50, 5)))) == [new]
+    assert opened[3:] == [new]
+    assert len(GranuleIndex.load(path)) == 3
+    list(iter_granules(**kwargs))
+    assert len(opened) == 4
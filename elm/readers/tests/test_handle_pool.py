@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from elm.readers.handle_pool import HandlePool, handle_pool
+
+
+class Handle(object):
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_reuse_and_evict():
+    pool = HandlePool(max_handles=2)
+    opened = []
+    def opener(name):
+        def open_():
+            opened.append(Handle(name))
+            return opened[-1]
+        return open_
+    for name in ('a', 'b', 'a'):
+        with pool.checkout(name, opener(name)) as handle:
+            assert handle.name == name and not handle.closed
+    assert [h.name for h in opened] == ['a', 'b']
+    assert (pool.hits, pool.misses) == (1, 2)
+    # "b" is least recently used
+    with pool.checkout('c', opener('c')):
+        pass
+    assert len(pool) == 2
+    assert [h.closed for h in opened] == [False, True, False]
+    pool.close_all()
+    assert len(pool) == 0 and all(h.closed for h in opened)
+
+
+def test_checked_out_not_shared():
+    pool = HandlePool()
+    with pool.checkout('a', lambda: Handle('a')) as h1:
+        with pool.checkout('a', lambda: Handle('a')) as h2:
+            assert h1 is not h2
+    assert len(pool) == 2
+    seen = []
+    def use():
+        with pool.checkout('a', lambda: Handle('a')) as h:
+            seen.append(h)
+    threads = [threading.Thread(target=use) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(seen) == 2 and set(seen) <= {h1, h2}
+
+
+def test_closed_on_error():
+    pool = HandlePool()
+    with pytest.raises(ValueError):
+        with pool.checkout('a', lambda: Handle('a')) as handle:
+            raise ValueError('bad read')
+    assert handle.closed and len(pool) == 0
+    assert isinstance(handle_pool(), HandlePool)
+
+
+def test_discard():
+    pool = HandlePool()
+    for name in ('a', 'b'):
+        with pool.checkout(name, lambda name=name: Handle(name)) as handle:
+            pass
+    pool.discard('a')
+    pool.discard('c')
+    assert len(pool) == 1
+    with pool.checkout('a', lambda: Handle('a2')) as handle:
+        assert handle.name == 'a2'
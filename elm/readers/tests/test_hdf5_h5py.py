@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from elm.readers import BandSpec, load_array, load_meta
+from elm.readers.hdf5 import (_h5_value, h5py_read_array, load_hdf5_array,
+                              load_hdf5_meta, tile_windows)
+
+GRID_HEADER = (b'BinMethod=ARITHMETIC_MEAN;\nRegistration=CENTER;\n'
+               b'LatitudeResolution=1;\nLongitudeResolution=1;\n'
+               b'NorthBoundingCoordinate=20;\nSouthBoundingCoordinate=0;\n'
+               b'EastBoundingCoordinate=40;\nWestBoundingCoordinate=0;\n'
+               b'Origin=SOUTHWEST;\n')
+
+
+@pytest.fixture
+def imerg_like(tmpdir):
+    '''HDF5 file with a (time, lon, lat) dataset stored in chunks'''
+    h5py = pytest.importorskip('h5py')
+    filename = str(tmpdir.join('grid.HDF5'))
+    values = np.arange(40 * 20, dtype=np.float32).reshape(1, 40, 20)
+    with h5py.File(filename, 'w') as f:
+        grid = f.create_group('Grid')
+        grid.attrs['GridHeader'] = GRID_HEADER
+        dset = grid.create_dataset('precipitationCal', data=values,
+                                   chunks=(1, 16, 8), compression='gzip')
+        dset.attrs['Units'] = b'mm/hr'
+        dset.attrs['_FillValue'] = np.array([-9999.9], dtype=np.float32)
+        grid.create_dataset('time', data=np.arange(1))
+    return filename, values[0]
+
+
+def band_spec(**kwargs):
+    return BandSpec(search_key='sub_dataset_name',
+                    search_value='precipitationCal$',
+                    name='precip',
+                    stored_coords_order=('x', 'y'),
+                    **kwargs)
+
+
+def test_h5_value():
+    assert _h5_value(b'a=1;\nb=2') == {'a': '1', 'b': '2'}
+    assert _h5_value(b'mm/hr') == 'mm/hr'
+    assert _h5_value(b'precipitation rate = mm/hr') == 'precipitation rate = mm/hr'
+    assert _h5_value('a=1;') == {'a': '1'}
+    assert _h5_value('a=1;\nb=x;\n') == {'a': '1', 'b': 'x'}
+    assert _h5_value(np.array([2.5])) == 2.5
+    assert _h5_value(np.array([b'x', b'y'])) == ['x', 'y']
+
+
+def test_tile_windows():
+    band_meta = {'shape': (1, 40, 20), 'chunks': (1, 16, 8)}
+    windows = tile_windows(band_meta, (10, 10))
+    assert windows[:3] == [((0, 16), (0, 16)), ((0, 16), (16, 20)),
+                           ((16, 32), (0, 16))]
+    assert len(windows) == 6
+    band_meta['chunks'] = None
+    assert len(tile_windows(band_meta, (10, 10))) == 8
+    with pytest.raises(ValueError):
+        tile_windows({'shape': (2, 40, 20)}, (10, 10))
+
+
+def test_read_meta(imerg_like):
+    filename, _ = imerg_like
+    meta = load_hdf5_meta(filename, backend='h5py')
+    assert meta['backend'] == 'h5py'
+    assert [s[0] for s in meta['sub_datasets']] == ['/Grid/precipitationCal']
+    band_meta = meta['band_meta'][0]
+    assert band_meta['Units'] == 'mm/hr' and band_meta['chunks'] == (1, 16, 8)
+    assert meta['meta']['GridHeader']['Origin'] == 'SOUTHWEST'
+    assert load_meta(filename, reader='h5py')['backend'] == 'h5py'
+    with pytest.raises(ValueError):
+        load_hdf5_meta(filename, backend='netcdf')
+
+
+def test_hyperslab_reads(imerg_like):
+    filename, values = imerg_like
+    raster, offsets, steps = h5py_read_array(filename, '/Grid/precipitationCal',
+                                             window=((16, 32), (8, 16)))
+    assert np.array_equal(raster, values[16:32, 8:16])
+    assert offsets == (16, 8) and steps == (1, 1)
+    raster, _, steps = h5py_read_array(filename, '/Grid/precipitationCal',
+                                       buf_xsize=5, buf_ysize=10)
+    assert np.array_equal(raster, values[::4, ::4]) and steps == (4, 4)
+
+
+def test_load_array(imerg_like):
+    filename, values = imerg_like
+    meta = load_hdf5_meta(filename, backend='h5py')
+    X = load_hdf5_array(filename, meta, [band_spec()])
+    assert X.precip.dims == ('x', 'y')
+    assert np.array_equal(X.precip.values, values)
+    assert list(X.precip.canvas.geo_transform) == [0, 1, 0, 0, 0, 1]
+    spec = band_spec(window=((16, 32), (8, 16)))
+    X = load_array(filename, band_specs=[spec], reader='h5py')
+    assert np.array_equal(X.precip.values, values[16:32, 8:16])
+    # x is the stored row: the window starts at x=16, y=8
+    assert list(X.precip.canvas.geo_transform) == [16, 1, 0, 8, 0, 1]
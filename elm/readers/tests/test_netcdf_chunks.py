@@ -0,0 +1,76 @@
+import dask.array as da
+import numpy as np
+import pytest
+import xarray as xr
+
+from elm.readers import BandSpec, is_packed
+from elm.readers.handle_pool import handle_pool
+from elm.readers.netcdf import (_dask_chunks, load_netcdf_array,
+                                load_netcdf_meta)
+
+GRID_HEADER = ';\n'.join(('LatitudeResolution=1',
+                          'LongitudeResolution=1',
+                          'SouthBoundingCoordinate=40',
+                          'NorthBoundingCoordinate=50',
+                          'EastBoundingCoordinate=-80',
+                          'WestBoundingCoordinate=-100',
+                          'Origin=NORTHWEST'))
+
+
+@pytest.fixture
+def nc_file(tmpdir):
+    cube = np.random.uniform(0, 1, (6, 10, 20)).astype(np.float32)
+    packed = np.arange(200, dtype=np.int16).reshape(10, 20)
+    ds = xr.Dataset({'cube': (('time', 'lat', 'lon'), cube),
+                     'packed': (('lat', 'lon'), packed)},
+                    coords={'time': np.arange(6),
+                            'lat': np.arange(49.5, 39.5, -1),
+                            'lon': np.arange(-99.5, -79.5, 1)},
+                    attrs={'GridHeader': GRID_HEADER})
+    ds.packed.attrs.update(scale_factor=0.5, add_offset=1.)
+    filename = str(tmpdir.join('cube.nc'))
+    ds.to_netcdf(filename, engine='scipy')
+    return filename, cube, packed
+
+
+def test_dask_chunks():
+    arr = xr.DataArray(np.empty((100, 30, 40)), dims=('time', 'y', 'x'))
+    assert _dask_chunks(arr) == {'time': 100, 'y': 30, 'x': 40}
+    assert _dask_chunks(arr, chunk_size=2400) == {'time': 2, 'y': 30, 'x': 40}
+    arr.encoding['chunksizes'] = (1, 10, 20)
+    assert _dask_chunks(arr, chunk_size=2000) == {'time': 10, 'y': 10, 'x': 20}
+    assert _dask_chunks(arr, chunk_size=10 ** 6) == {'time': 100, 'y': 30, 'x': 40}
+
+
+def test_open_once_and_window(nc_file):
+    filename, cube, _ = nc_file
+    pool = handle_pool()
+    misses = pool.misses
+    meta = load_netcdf_meta(filename)
+    window = {'time': (1, 3), 'lat': (2, 5)}
+    idle = len(pool)
+    X = load_netcdf_array(filename, meta, [BandSpec('', '', 'cube', window=window)])
+    # metadata from the pool, the lazy bands have their own handle
+    assert pool.misses == misses + 1 and len(pool) == idle
+    pool.close_all()
+    assert isinstance(X.cube.data, da.Array)
+    assert X.cube.shape == (2, 3, 20)
+    assert np.array_equal(X.cube.values, cube[1:3, 2:5])
+    assert X.cube.y.values.tolist() == [47.5, 46.5, 45.5]
+    assert list(meta['geo_transform']) == [-100., 1., 0, 48., 0, -1.]
+
+
+def test_yx_window_and_packed(nc_file):
+    filename, _, packed = nc_file
+    meta = load_netcdf_meta(filename)
+    spec = BandSpec('', '', 'packed', window=((2, 5), (3, 10)), packed=True)
+    X = load_netcdf_array(filename, meta, [spec])
+    assert X.packed.shape == (3, 7) and is_packed(X)
+    assert np.array_equal(X.packed.values, packed[2:5, 3:10])
+    assert list(meta['geo_transform']) == [-97., 1., 0, 48., 0, -1.]
+    X = load_netcdf_array(filename, meta, ['packed'])
+    assert not is_packed(X)
+    assert np.allclose(X.packed.values, packed * 0.5 + 1)
+    with pytest.raises(ValueError):
+        load_netcdf_array(filename, meta,
+                          [BandSpec('', '', 'packed', window={'time': (0, 1)})])
@@ -0,0 +1,101 @@
+import dill
+import numpy as np
+import pytest
+from sklearn.cluster import MiniBatchKMeans
+
+from elm.config.dtype_policy import float_dtype_context
+from elm.pipeline import Pipeline, steps
+from elm.pipeline.tests.util import random_elm_store
+from elm.readers import (BandSpec, ElmStore, decode_band, decode_packed,
+                         decode_values, flatten, is_packed, pack_band,
+                         packing_from_meta, set_na_from_meta)
+
+SCALE = 0.01
+OFFSET = 100.
+
+
+def packed_elm_store(**kwargs):
+    X = random_elm_store(bands=2, height=20, width=30, **kwargs)
+    decoded = {}
+    for band in X.band_order:
+        data_arr = X[band]
+        decoded[band] = data_arr.values.copy()
+        packed = np.round((data_arr.values - OFFSET) / SCALE).astype(np.int16)
+        packed[0, :5] = -9999
+        decoded[band][0, :5] = np.NaN
+        X[band] = data_arr.copy(data=packed)
+        X[band].attrs.update({'scale_factor': SCALE, 'add_offset': OFFSET,
+                              '_FillValue': -9999})
+        pack_band(X[band])
+    return X, decoded
+
+
+def test_packing_from_meta():
+    attrs = {'Scale_Factor': '0.5', 'meta': {'add_offset': 2},
+             'scale_factor_err': 1, '_FillValue': -1, 'valid_range': [0, 10]}
+    assert packing_from_meta(**attrs) == {'scale_factor': 0.5,
+                                          'add_offset': 2.,
+                                          'fill_value': -1.,
+                                          'valid_range': [0., 10.],
+                                          'invalid_range': None}
+    assert packing_from_meta()['scale_factor'] == 1.
+    assert BandSpec('a', 'b', 'c', packed=True).packed
+
+
+@pytest.mark.parametrize('chunk_size', [7, 2 ** 20])
+def test_decode_values(chunk_size):
+    packing = {'scale_factor': 2, 'add_offset': 1, 'fill_value': 0,
+               'valid_range': [0, 8], 'invalid_range': None}
+    values = np.arange(-1, 10, dtype=np.int16).reshape(1, 11)
+    out = decode_values(values, packing, chunk_size=chunk_size)
+    assert out.dtype == np.float32 and out.shape == (1, 11)
+    assert np.isnan(out[0, [0, 1, 10]]).all()
+    assert np.array_equal(out[0, 2:10], np.arange(1, 9) * 2 + 1)
+    column = np.zeros((11, 2))
+    decode_values(values.ravel(), packing, out=column[:, 1],
+                  chunk_size=chunk_size)
+    assert np.array_equal(column[:, 1], out.ravel(), equal_nan=True)
+    assert not column[:, 0].any()
+    with float_dtype_context('float64'):
+        assert decode_values(values, packing).dtype == np.float64
+
+
+def test_decode_and_flatten():
+    X, decoded = packed_elm_store()
+    assert is_packed(X) and X.band_1.dtype == np.int16
+    nbytes = sum(arr.nbytes for arr in X.data_vars.values())
+    assert nbytes * 2 == sum(arr.nbytes for arr in decode_packed(X).data_vars.values())
+    assert len(dill.dumps(X)) < len(dill.dumps(decode_packed(X)))
+    band = decode_band(X.band_1)
+    assert band.dtype == np.float32 and not is_packed(band)
+    assert np.allclose(band.values, decoded['band_1'], atol=SCALE, equal_nan=True)
+    X2 = decode_packed(X)
+    assert isinstance(X2, ElmStore) and not is_packed(X2) and is_packed(X)
+    assert decode_packed(X2) is X2
+    flat = flatten(X).flat.values
+    assert np.allclose(flat, flatten(X2).flat.values, equal_nan=True)
+    assert np.isnan(flat).any(axis=1).sum() == 5
+    # set_na_from_meta decodes and does not mask decoded bands again
+    set_na_from_meta(X)
+    assert not is_packed(X)
+    assert np.allclose(X.band_1.values, band.values, equal_nan=True)
+
+
+def test_pipeline_decodes_packed():
+    X, _ = packed_elm_store()
+    seen = []
+    def check_packed(X, **kwargs):
+        seen.append(is_packed(X))
+        return X
+    pipe = Pipeline([steps.SelectCanvas('band_1'),
+                     steps.Flatten(),
+                     steps.DropNaRows(),
+                     MiniBatchKMeans(n_clusters=2, random_state=0)])
+    pred = pipe.fit(X).predict(X)
+    assert pred.shape == (595,)
+    pipe = Pipeline([steps.ModifySample(check_packed),
+                     steps.Flatten(),
+                     steps.DropNaRows(),
+                     MiniBatchKMeans(n_clusters=2, random_state=0)])
+    pipe.fit(X)
+    assert seen == [False]
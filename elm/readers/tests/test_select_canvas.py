@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+import xarray as xr
+
+import elm.readers.reshape as reshape
+from elm.readers import ElmStore, canvas_to_coords, select_canvas
+from elm.readers.util import xy_canvas
+
+RES = 30.
+
+
+def _band(values, x0=1000., y0=5000., res=RES):
+    canvas = xy_canvas([x0, res, 0., y0, 0., -res], values.shape[1],
+                       values.shape[0], ('y', 'x'))
+    return xr.DataArray(values, coords=canvas_to_coords(canvas),
+                        dims=('y', 'x'), attrs={'canvas': canvas})
+
+
+def _store(values):
+    return ElmStore(OrderedDict([('a', _band(values))]), attrs={})
+
+
+@pytest.mark.parametrize('x0, y0, res, shape', [
+    (1000. + 3 * RES, 5000. - 2 * RES, RES, (10, 12)),   # offset
+    (1000. + RES, 5000., RES * 2, (6, 7)),               # coarser
+    (1000., 5000. - 3 * RES, RES * 3, (4, 4)),           # coarser
+])
+def test_aligned_matches_resampled(x0, y0, res, shape, monkeypatch):
+    values = np.random.uniform(0, 1, (20, 24))
+    es = _store(values)
+    canvas = _band(np.ones(shape), x0=x0, y0=y0, res=res).canvas
+    sel = select_canvas(es, canvas)
+    assert sel.a.shape == shape and sel.a.canvas == canvas
+    assert np.may_share_memory(sel.a.values, values)
+    monkeypatch.setattr(reshape, '_select_aligned', lambda *args: None)
+    expected = select_canvas(es, canvas)
+    assert np.array_equal(sel.a.values, expected.a.values)
+    assert np.array_equal(sel.a.x.values, expected.a.x.values)
+    assert np.array_equal(sel.a.y.values, expected.a.y.values)
+
+
+def test_aligned_finer():
+    es = _store(np.arange(12.).reshape(3, 4))
+    # a 15 m grid starting half a 30 m pixel into the 30 m grid
+    canvas = _band(np.ones((6, 7)), x0=1000. + RES / 2, res=RES / 2).canvas
+    sel = select_canvas(es, canvas)
+    assert sel.a.shape == (6, 7) and sel.a.canvas == canvas
+    assert np.array_equal(sel.a.values[0], [0, 1, 1, 2, 2, 3, 3])
+    assert np.array_equal(sel.a.values[:, 0], [0, 0, 4, 4, 8, 8])
+    assert np.array_equal(sel.a.x.values, canvas_to_coords(canvas)['x'])
+
+
+def test_not_aligned_resampled():
+    es = _store(np.random.uniform(0, 1, (20, 24)))
+    for canvas in (_band(np.ones((2, 2)), x0=1010.).canvas,
+                   _band(np.ones((2, 2)), res=RES * 1.5).canvas,
+                   # beyond the grid of band "a"
+                   _band(np.ones((30, 2))).canvas):
+        assert reshape._select_aligned(es.a, canvas) is None
+        sel = select_canvas(es, canvas)
+        assert sel.a.shape == (canvas.buf_ysize, canvas.buf_xsize)
+        assert sel.a.canvas == canvas
@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+from elm.readers import tif
+from elm.readers.handle_pool import handle_pool
+from elm.readers.util import BandSpec
+
+GEO_TRANSFORM = [100., 2., 0., 50., 0., -2.]
+RASTER = np.arange(20 * 30, dtype=np.int16).reshape(1, 20, 30)
+
+
+class FakeTif(object):
+    '''Enough of a rasterio handle for elm.readers.tif'''
+    count = 1
+    dtypes = ('int16',)
+    height, width = RASTER.shape[1:]
+    nodata = None
+    meta = {'name': 'fake'}
+    bounds = None
+
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+    def get_transform(self):
+        return list(GEO_TRANSFORM)
+
+    def read(self, out, window=None):
+        (r0, r1), (c0, c1) = window or ((0, self.height), (0, self.width))
+        # reduced resolution reads take every n-th pixel
+        row_step = (r1 - r0) // out.shape[1]
+        col_step = (c1 - c0) // out.shape[2]
+        out[:] = RASTER[:, r0:r1:row_step, c0:c1:col_step]
+        return out
+
+
+@contextmanager
+def fake_open_rasterio(filename):
+    yield FakeTif()
+
+
+def test_windowed_tif(tmpdir, monkeypatch):
+    monkeypatch.setattr(tif, 'open_rasterio', fake_open_rasterio)
+    tmpdir.join('a_B1.TIF').write('')
+    band_specs = [BandSpec('name', '_B1.TIF', 'band_1', window=((5, 15), (10, 16)))]
+    meta = tif.load_dir_of_tifs_meta(str(tmpdir), band_specs)
+    es = tif.load_dir_of_tifs_array(str(tmpdir), meta, band_specs)
+    band = es.band_1
+    assert np.array_equal(band.values, RASTER[0, 5:15, 10:16])
+    assert np.allclose(band.x.values, 100. + 2. * np.arange(10, 16))
+    assert np.allclose(band.y.values, 50. - 2. * np.arange(5, 15))
+    assert band.canvas.geo_transform == [120., 2., 0., 40., 0., -2.]
+
+
+def test_windowed_tif_reduced_resolution(tmpdir, monkeypatch):
+    monkeypatch.setattr(tif, 'open_rasterio', fake_open_rasterio)
+    tmpdir.join('a_B1.TIF').write('')
+    band_specs = [BandSpec('name', '_B1.TIF', 'band_1', window=((4, 16), (10, 16)),
+                           buf_xsize=3, buf_ysize=6)]
+    meta = tif.load_dir_of_tifs_meta(str(tmpdir), band_specs)
+    es = tif.load_dir_of_tifs_array(str(tmpdir), meta, band_specs)
+    band = es.band_1
+    assert np.array_equal(band.values, RASTER[0, 4:16:2, 10:16:2])
+    assert np.allclose(band.x.values, 100. + 2. * np.arange(10, 16, 2))
+    assert np.allclose(band.y.values, 50. - 2. * np.arange(4, 16, 2))
+
+
+def test_load_tif_meta_handle_not_pooled(monkeypatch):
+    rasterio = pytest.importorskip('rasterio')
+    monkeypatch.setattr(rasterio, 'open', lambda filename: FakeTif())
+    pooled = len(handle_pool())
+    r, meta = tif.load_tif_meta('a_B1.TIF')
+    assert isinstance(r, FakeTif) and not r.closed
+    assert meta['height'] == 20 and meta['name'] == 'a_B1.TIF'
+    assert len(handle_pool()) == pooled
+    r, raster = tif.open_prefilter('a_B1.TIF', meta, window=((0, 2), (0, 3)))
+    assert isinstance(r, FakeTif)
+    assert np.array_equal(raster, RASTER[:, :2, :3])
+    assert len(handle_pool()) == pooled
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from elm.pipeline import steps
+from elm.readers import (BandSpec, ElmStore, iter_cube_tiles, load_ts_cube,
+                         ts_cube_files)
+from elm.readers.util import xy_canvas
+
+CANVAS = xy_canvas((0., 1., 0., 40., 0., -1.), 30, 40, ('y', 'x'))
+SPEC = BandSpec(search_key='name', search_value='ndvi', name='ndvi')
+FILES = ['ndvi_20160103.tif', 'ndvi_20160101.tif', 'ndvi_20160102.tif']
+
+
+def _rasters(shape):
+    return {f: np.arange(np.prod(shape), dtype=np.int16).reshape(shape) + 1000 * idx
+            for idx, f in enumerate(sorted(FILES))}
+
+
+def _fake_load_meta(metas):
+    def load_meta(filename, band_specs=None, reader=None):
+        metas.append(filename)
+        return {'name': filename, 'missing_value': -1}
+    return load_meta
+
+
+def _fake_load_array(rasters, reads):
+    def load_array(filename, meta=None, band_specs=None, reader=None):
+        assert meta['name'] == filename
+        spec = band_specs[0]
+        (r0, r1), (c0, c1) = spec.window
+        reads.append((filename, spec.window))
+        arr = xr.DataArray(rasters[filename][r0:r1, c0:c1], dims=('y', 'x'),
+                           attrs={'missing_value': meta['missing_value']})
+        return ElmStore({spec.name: arr}, add_canvas=False)
+    return load_array
+
+
+def test_ts_cube_files():
+    times, files = ts_cube_files(FILES, time_from_filename=r'_(\d{8})')
+    assert files == sorted(FILES)
+    assert list(times.day) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        ts_cube_files(FILES, time_from_filename=r'_(\d{10})')
+
+
+def test_load_ts_cube_lazy_windows():
+    rasters, reads, metas = _rasters((40, 30)), [], []
+    X = load_ts_cube(FILES, CANVAS, SPEC, time_from_filename=r'_(\d{8})',
+                     tile_shape=(16, 20), load_array=_fake_load_array(rasters, reads),
+                     load_meta=_fake_load_meta(metas))
+    cube = X.ndvi
+    assert cube.dims == ('t', 'y', 'x') and cube.shape == (3, 40, 30)
+    assert cube.data.chunks == ((1, 1, 1), (16, 16, 8), (20, 10))
+    assert not reads and sorted(metas) == sorted(FILES)
+    assert np.array_equal(cube[1, 16:32, 20:].values, rasters[sorted(FILES)[1]][16:32, 20:])
+    assert reads == [(sorted(FILES)[1], ((16, 32), (20, 30)))]
+    expected = np.stack([rasters[f] for f in sorted(FILES)]).astype(np.float64)
+    tiles = list(iter_cube_tiles(X))
+    assert len(tiles) == 6
+    for (rows, cols), tile in tiles:
+        assert np.array_equal(tile.ndvi.values, expected[:, slice(*rows), slice(*cols)])
+    window, tile = tiles[-1]
+    features, _, _ = steps.TSDescribe(band='ndvi', axis=0).fit_transform(tile)
+    assert features.flat.shape == (8 * 10, 8)
+    # metadata was loaded once per file, not per tile
+    assert len(metas) == 3
+
+
+def test_load_ts_cube_missing_values():
+    rasters, reads, metas = _rasters((40, 30)), [], []
+    rasters[FILES[1]][:2] = -1
+    X = load_ts_cube(FILES, CANVAS, SPEC, time_from_filename=r'_(\d{8})',
+                     load_array=_fake_load_array(rasters, reads),
+                     load_meta=_fake_load_meta(metas))
+    values = X.ndvi.values
+    assert np.isnan(values[0, :2]).all() and not np.isnan(values[0, 2:]).any()
+    assert not np.isnan(values[1:]).any()
+
+
+def test_load_ts_cube_source_canvas():
+    # files on a grid 2 times coarser, covering the top half of CANVAS
+    source = xy_canvas((0., 2., 0., 40., 0., -2.), 15, 10, ('y', 'x'))
+    rasters, reads = _rasters((10, 15)), []
+    X = load_ts_cube(FILES, CANVAS, SPEC, times=['2016-01-03', '2016-01-01', '2016-01-02'],
+                     source_canvas=source, tile_shape=(16, 30),
+                     load_array=_fake_load_array(rasters, reads),
+                     load_meta=_fake_load_meta([]))
+    values = X.ndvi.values
+    first = rasters[sorted(FILES)[0]]
+    assert np.array_equal(values[0, :20], np.repeat(np.repeat(first, 2, axis=0), 2, axis=1))
+    assert np.isnan(values[:, 20:]).all()
+    assert ((16, 20), (0, 30)) not in [w for _, w in reads]
@@ -12,12 +12,12 @@ Tools for reading GeoTiff files.  Typically use the interface through
 '''
 from collections import OrderedDict
 import copy
+from functools import partial
 import gc
 import logging
 import os
 
 import numpy as np
-import rasterio as rio
 import xarray as xr
 
 from elm.sample_util.metadata_selection import match_meta
@@ -27,9 +27,14 @@ from elm.readers.util import (geotransform_to_coords,
                               raster_as_2d,
                               READ_ARRAY_KWARGS,
                               take_geo_transform_from_meta,
+                              window_geo_transform,
+                              window_to_gdal_read_kwargs,
                               BandSpec)
 
 from elm.readers import ElmStore
+from elm.readers.band_reader import build_overviews, read_bands
+from elm.readers.handle_pool import handle_pool, open_rasterio
+from elm.readers.packed import pack_band
 logger = logging.getLogger(__name__)
 
 
@@ -38,6 +43,25 @@ __all__ = ['load_tif_meta',
            'load_dir_of_tifs_array',]
 
 
+def _handle_meta(r, filename):
+    if r.count != 1:
+        raise ValueError('elm.readers.tif only reads tif files with 1 band (shape of [1, y, x]). Found {} bands'.format(r.count))
+    meta = {'meta': r.meta}
+    meta['geo_transform'] = r.get_transform()
+    meta['bounds'] = r.bounds
+    meta['height'] = r.height
+    meta['width'] = r.width
+    meta['name'] = meta['sub_dataset_name'] = filename
+    return meta
+
+
+def _load_tif_meta(filename):
+    '''Metadata of one TIF file (see load_tif_meta), read with a
+    handle of elm.readers.handle_pool'''
+    with open_rasterio(filename) as r:
+        return _handle_meta(r, filename)
+
+
 def load_tif_meta(filename):
     '''Read the metadata of one TIF file
 
@@ -45,7 +69,8 @@ def load_tif_meta(filename):
         :filename: str: path and filename of TIF to read
 
     Returns:
-        :file: TIF file
+        :file: TIF file (a rasterio handle not shared with
+               elm.readers.handle_pool, closed by the caller)
         :meta: Dictionary with meta data about the file, including;
 
             - **meta**: Meta attributes of the TIF file
@@ -57,15 +82,13 @@ def load_tif_meta(filename):
             - **sub_dataset_name**: The filename
 
     '''
+    import rasterio as rio
     r = rio.open(filename)
-    if r.count != 1:
-        raise ValueError('elm.readers.tif only reads tif files with 1 band (shape of [1, y, x]). Found {} bands'.format(r.count))
-    meta = {'meta': r.meta}
-    meta['geo_transform'] = r.get_transform()
-    meta['bounds'] = r.bounds
-    meta['height'] = r.height
-    meta['width'] = r.width
-    meta['name'] = meta['sub_dataset_name'] = filename
+    try:
+        meta = _handle_meta(r, filename)
+    except Exception:
+        r.close()
+        raise
     return r, meta
 
 
@@ -91,11 +114,11 @@ def array_template(r, meta, **reader_kwargs):
         if 'height' in reader_kwargs:
             height = reader_kwargs['height']
         else:
-            height = np.diff(reader_kwargs['window'][0])
+            height = int(np.diff(reader_kwargs['window'][0])[0])
         if 'width' in reader_kwargs:
             width = reader_kwargs['width']
         else:
-            width = np.diff(reader_kwargs['window'][0])
+            width = int(np.diff(reader_kwargs['window'][1])[0])
     return np.empty((1, height, width), dtype=dtype)
 
 
@@ -112,7 +135,7 @@ def load_dir_of_tifs_meta(dir_of_tiffs, band_specs=None, **meta):
     meta = copy.deepcopy(meta)
     band_order_info = []
     for band_idx, tif in enumerate(tifs):
-        raster, band_meta = load_tif_meta(tif)
+        band_meta = _load_tif_meta(tif)
 
         if band_specs:
             for idx, band_spec in enumerate(band_specs):
@@ -139,18 +162,63 @@ def load_dir_of_tifs_meta(dir_of_tiffs, band_specs=None, **meta):
 def open_prefilter(filename, meta, **reader_kwargs):
     '''Placeholder for future operations on open file rasterio
     handle like resample / aggregate or setting width, height, etc
-    on load.  TODO see optional kwargs to rasterio.open'''
+    on load.  TODO see optional kwargs to rasterio.open
+
+    Returns (handle, raster) where handle is a rasterio handle not
+    shared with elm.readers.handle_pool, closed by the caller'''
+    import rasterio as rio
     try:
         r = rio.open(filename)
-        raster = array_template(r, meta, **reader_kwargs)
-        logger.debug('reader_kwargs {} raster template shape {}'.format(reader_kwargs, raster.shape))
-        r.read(out=raster)
+        try:
+            raster = _read_handle(r, meta, **reader_kwargs)
+        except Exception:
+            r.close()
+            raise
         return r, raster
     except Exception as e:
         logger.info('Failed to rasterio.open {}'.format(filename))
         raise
 
-def load_dir_of_tifs_array(dir_of_tiffs, meta, band_specs=None):
+
+def _read_handle(r, meta, **reader_kwargs):
+    raster = array_template(r, meta, **reader_kwargs)
+    logger.debug('reader_kwargs {} raster template shape {}'.format(reader_kwargs, raster.shape))
+    r.read(out=raster, window=reader_kwargs.get('window'))
+    return raster
+
+
+def _read_tif(filename, meta, build_overviews=False, **reader_kwargs):
+    '''Read a GeoTiff into an array_template, returning (raster, info)
+    where info has the attributes of the handle used by
+    load_dir_of_tifs_array (read while the handle is checked out of
+    elm.readers.handle_pool, so the handle itself is not returned).  A raster smaller than the file (or
+    window) is read from overviews if the file has them or if
+    build_overviews (see elm.readers.band_reader.build_overviews)'''
+    if build_overviews:
+        _build_tif_overviews(filename, **reader_kwargs)
+    try:
+        with open_rasterio(filename) as r:
+            raster = _read_handle(r, meta, **reader_kwargs)
+            info = {'geo_transform': r.get_transform(),
+                    'scales': getattr(r, 'scales', None),
+                    'offsets': getattr(r, 'offsets', None),
+                    'nodata': r.nodata}
+            return raster, info
+    except Exception as e:
+        logger.info('Failed to rasterio.open {}'.format(filename))
+        raise
+
+
+def _build_tif_overviews(filename, **reader_kwargs):
+    gdal_kwargs = window_to_gdal_read_kwargs(**reader_kwargs)
+    gdal_kwargs['buf_xsize'] = gdal_kwargs.pop('width', None)
+    gdal_kwargs['buf_ysize'] = gdal_kwargs.pop('height', None)
+    if build_overviews(filename, **gdal_kwargs):
+        # rasterio handles opened before the .ovr file existed
+        handle_pool().discard(('rasterio', filename))
+
+
+def load_dir_of_tifs_array(dir_of_tiffs, meta, band_specs=None, n_threads=None):
     '''Return an ElmStore where each subdataset is a DataArray
 
     Parameters:
@@ -160,6 +228,8 @@ def load_dir_of_tifs_array(dir_of_tiffs, meta, band_specs=None):
         :band_specs: list of elm.readers.BandSpec objects,
                     defaulting to reading all subdatasets
                     as bands
+        :n_threads: number of GeoTiffs read at once
+                    (see elm.readers.band_reader)
     Returns:
         :X: ElmStore
 
@@ -177,6 +247,7 @@ def load_dir_of_tifs_array(dir_of_tiffs, meta, band_specs=None):
     elm_store_dict = OrderedDict()
     attrs = {'meta': meta}
     attrs['band_order'] = []
+    to_read = []
     for (idx, filename, band_spec), band_meta in zip(band_order_info, meta['band_meta']):
         band_name = getattr(band_spec, 'name', band_spec)
         if not isinstance(band_spec, str):
@@ -191,26 +262,31 @@ def load_dir_of_tifs_array(dir_of_tiffs, meta, band_specs=None):
             reader_kwargs['height'] = reader_kwargs.pop('buf_ysize')
         if 'window' in reader_kwargs:
             reader_kwargs['window'] = tuple(map(tuple, reader_kwargs['window']))
-            # TODO multx, multy should be handled here as well?
-        if reader_kwargs:
-            multy = band_meta['height'] / reader_kwargs.get('height', band_meta['height'])
-            multx = band_meta['width'] / reader_kwargs.get('width', band_meta['width'])
+            (row0, row1), (col0, col1) = reader_kwargs['window']
         else:
-            multx = multy = 1.
+            row0, row1, col0, col1 = 0, band_meta['height'], 0, band_meta['width']
+        # pixel size multipliers of a read at reduced resolution
+        multy = (row1 - row0) / reader_kwargs.get('height', row1 - row0)
+        multx = (col1 - col0) / reader_kwargs.get('width', col1 - col0)
         band_meta.update(reader_kwargs)
         geo_transform = take_geo_transform_from_meta(band_spec, **attrs)
-        handle, raster = open_prefilter(filename, band_meta, **reader_kwargs)
+        to_read.append((band_name, band_spec, band_meta, geo_transform,
+                        (row0, col0), (multy, multx),
+                        partial(_read_tif, filename, band_meta,
+                                build_overviews=getattr(band_spec, 'build_overviews', False),
+                                **reader_kwargs)))
+    opened = read_bands([read for _, _, _, _, _, _, read in to_read],
+                        n_threads=n_threads)
+    for (band_name, band_spec, band_meta, geo_transform, offsets, steps, _), (raster, info) in zip(to_read, opened):
         raster = raster_as_2d(raster)
         if getattr(band_spec, 'stored_coords_order', ['y', 'x'])[0] == 'y':
             rows, cols = raster.shape
         else:
             rows, cols = raster.T.shape
         if geo_transform is None:
-            band_meta['geo_transform'] = handle.get_transform()
-        else:
-            band_meta['geo_transform'] = geo_transform
-        band_meta['geo_transform'][1]  *= multx
-        band_meta['geo_transform'][-1] *= multy
+            geo_transform = info['geo_transform']
+        band_meta['geo_transform'] = window_geo_transform(geo_transform,
+                                                          offsets, steps)
 
         coords_x, coords_y = geotransform_to_coords(cols,
                                                     rows,
@@ -220,6 +296,13 @@ def load_dir_of_tifs_array(dir_of_tiffs, meta, band_specs=None):
                                                          ('x', coords_x),],
                                                  dims=native_dims,
                                                  attrs=band_meta)
+        if getattr(band_spec, 'packed', False):
+            scales = info['scales'] or (None,)
+            offsets = info['offsets'] or (None,)
+            pack_band(elm_store_dict[band_name],
+                      scale_factor=scales[0],
+                      add_offset=offsets[0],
+                      fill_value=info['nodata'])
 
         attrs['band_order'].append(band_name)
     gc.collect()
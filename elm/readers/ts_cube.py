@@ -0,0 +1,325 @@
+'''
+-----------------------
+
+``elm.readers.ts_cube``
+~~~~~~~~~~~~~~~~~~~~~~~
+
+Time series cubes stacked lazily from many files, one file per time
+(e.g. daily granules of a product over years), for per-pixel time
+series steps such as steps.TSDescribe and steps.TSProbs.
+
+load_ts_cube returns an ElmStore with one band, a (t, y, x) DataArray
+on a target Canvas backed by a dask array with one chunk per file and
+(y, x) tile.  The metadata of each file is loaded once, by
+load_ts_cube, and the arrays are not read until chunks are computed;
+each chunk reads only its window of one file (BandSpec.window), with
+NaN set from the band's metadata (set_na_from_meta), resampled to the
+target canvas with select_canvas when the files are on another grid
+(source_canvas).  iter_cube_tiles then computes the full time series
+of one tile at a time, so memory use is bounded by one tile, not the
+whole cube.
+
+Example::
+
+    from elm.readers import iter_files_recursively, load_ts_cube, iter_cube_tiles
+
+    files = iter_files_recursively(top_dir=top_dir, file_pattern='\\.tif$')
+    X = load_ts_cube(files, canvas, band_spec,
+                     time_from_filename='_(\\d{8})_', tile_shape=(256, 256))
+    for window, tile in iter_cube_tiles(X):
+        features, _, _ = steps.TSDescribe(band=band_spec.name, axis=0).fit_transform(tile)
+'''
+from functools import partial
+import logging
+
+import attr
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from elm.config.dtype_policy import get_float_dtype
+from elm.readers.band_reader import read_bands
+from elm.readers.elm_store import ElmStore
+from elm.readers.granule_index import _time_from_filename
+from elm.readers.reshape import select_canvas
+from elm.readers.util import (BandSpec, canvas_to_coords,
+                              geotransform_to_coords, set_na_from_meta,
+                              window_geo_transform, xy_canvas)
+
+__all__ = ['ts_cube_files', 'read_cube_tile', 'load_ts_cube',
+           'iter_cube_tiles']
+
+logger = logging.getLogger(__name__)
+
+TILE_SHAPE = (512, 512)
+TIME_DIM = 't'
+
+
+def ts_cube_files(filenames, times=None, time_from_filename=None):
+    '''Return (times, filenames) sorted by time
+
+    Parameters:
+        :filenames:          filenames (or TIF directories), e.g. from
+                             elm.readers.iter_files_recursively
+        :times:              times of filenames (strings or datetimes), or
+        :time_from_filename: regex whose match (or groups joined) in
+                             each file's basename is its time
+
+    Returns:
+        :(times, filenames): pandas.DatetimeIndex and list
+    '''
+    filenames = list(filenames)
+    if times is None:
+        if not time_from_filename:
+            raise ValueError('Expected times or time_from_filename')
+        times = [_time_from_filename(f, time_from_filename) for f in filenames]
+        missing = [f for f, t in zip(filenames, times) if t is None]
+        if missing:
+            raise ValueError('No time found with {} in {}'.format(time_from_filename,
+                                                                 missing))
+    if len(times) != len(filenames):
+        raise ValueError('Expected one time per file ({} times, {} '
+                         'files)'.format(len(times), len(filenames)))
+    times = pd.DatetimeIndex(times)
+    order = np.argsort(times.values, kind='mergesort')
+    return times[order], [filenames[idx] for idx in order]
+
+
+def _tile_chunks(size, tile_size):
+    return tuple(min(tile_size, size - start) for start in range(0, size, tile_size))
+
+
+def _window_canvas(canvas, window):
+    (r0, r1), (c0, c1) = window
+    gt = window_geo_transform(canvas.geo_transform, (r0, c0))
+    return xy_canvas(tuple(gt), c1 - c0, r1 - r0, canvas.dims,
+                     ravel_order=canvas.ravel_order)
+
+
+def _source_window(source_canvas, tile_canvas):
+    '''Window of source_canvas covering tile_canvas, or None if they
+    do not overlap'''
+    src, tile = source_canvas.geo_transform, tile_canvas.geo_transform
+    corners = [(tile[0], tile[3]),
+               (tile[0] + tile_canvas.buf_xsize * tile[1],
+                tile[3] + tile_canvas.buf_ysize * tile[5])]
+    cols = sorted(np.round((x - src[0]) / src[1], 6) for x, _ in corners)
+    rows = sorted(np.round((y - src[3]) / src[5], 6) for _, y in corners)
+    r0, r1 = max(0, int(np.floor(rows[0]))), min(source_canvas.buf_ysize, int(np.ceil(rows[1])))
+    c0, c1 = max(0, int(np.floor(cols[0]))), min(source_canvas.buf_xsize, int(np.ceil(cols[1])))
+    if r0 >= r1 or c0 >= c1:
+        return None
+    return ((r0, r1), (c0, c1))
+
+
+def _covered_window(tile_canvas, source_canvas):
+    '''Window of tile_canvas whose pixels' upper left corners are in
+    source_canvas, or None'''
+    src = source_canvas.geo_transform
+    x, y = geotransform_to_coords(tile_canvas.buf_xsize, tile_canvas.buf_ysize,
+                                  tile_canvas.geo_transform)
+    cols = np.floor(np.round((x - src[0]) / src[1], 6))
+    rows = np.floor(np.round((y - src[3]) / src[5], 6))
+    cols = np.flatnonzero((cols >= 0) & (cols < source_canvas.buf_xsize))
+    rows = np.flatnonzero((rows >= 0) & (rows < source_canvas.buf_ysize))
+    if not cols.size or not rows.size:
+        return None
+    return ((rows[0], rows[-1] + 1), (cols[0], cols[-1] + 1))
+
+
+def _load_cube_meta(filename, band_spec, load_meta=None, reader=None):
+    '''Load the metadata of one file of a time series cube
+
+    Parameters:
+        :filename:  filename (or TIF directory)
+        :band_spec: elm.readers.BandSpec of the band
+        :load_meta: function like elm.readers.load_meta, default: the
+                    loader of reader or of the file type of filename
+        :reader:    reader, e.g. "hdf4"
+
+    Returns:
+        :meta:      metadata dict to pass to load_array
+    '''
+    if load_meta is not None:
+        return load_meta(filename, band_specs=[band_spec], reader=reader)
+    from elm.readers.load_array import _find_file_type, _load_meta
+    ftype = reader or _find_file_type(filename)
+    if ftype == 'tif':
+        return _load_meta(filename, ftype, band_specs=[band_spec])
+    return _load_meta(filename, ftype)
+
+
+def read_cube_tile(filename, band_spec, canvas, window, source_canvas=None,
+                   load_array=None, reader=None, dtype=np.float64, meta=None):
+    '''Read a window of canvas from the band of one file
+
+    Parameters:
+        :filename:      filename (or TIF directory)
+        :band_spec:     elm.readers.BandSpec of the band
+        :canvas:        target elm.readers.Canvas with dims ("y", "x")
+        :window:        ((row_start, row_stop), (col_start, col_stop)) of canvas
+        :source_canvas: Canvas of the band in the file, default: canvas
+        :load_array:    function like elm.readers.load_array (the default)
+        :reader:        reader for load_array, e.g. "hdf4"
+        :dtype:         float dtype of the tile
+        :meta:          metadata of filename (from load_meta), or
+                        None to load it
+
+    Returns:
+        :tile:          2-D array, NaN where the file has no data or
+                        the band's metadata marks values missing
+    '''
+    if load_array is None:
+        from elm.readers.load_array import load_array
+    tile_canvas = _window_canvas(canvas, window)
+    source_canvas = source_canvas or canvas
+    tile = np.full((tile_canvas.buf_ysize, tile_canvas.buf_xsize), np.NaN, dtype=dtype)
+    src_window = _source_window(source_canvas, tile_canvas)
+    if src_window is None:
+        return tile
+    spec = attr.evolve(band_spec, window=src_window, buf_xsize=None, buf_ysize=None)
+    logger.debug('Read {} window {} of {}'.format(band_spec.name, src_window, filename))
+    X = load_array(filename, meta=meta, band_specs=[spec], reader=reader)
+    # decode packed bands and set NaN for fill values / invalid ranges
+    set_na_from_meta(X)
+    src_canvas = _window_canvas(source_canvas, src_window)
+    raster = np.asarray(X[band_spec.name].values, dtype=dtype)
+    if raster.shape != (src_canvas.buf_ysize, src_canvas.buf_xsize):
+        raise ValueError('Expected window {} of {} to have shape {} (got '
+                         '{})'.format(src_window, filename,
+                                      (src_canvas.buf_ysize, src_canvas.buf_xsize),
+                                      raster.shape))
+    if src_canvas == tile_canvas:
+        return raster
+    # resample only the pixels of the tile the file covers (the
+    # others stay NaN)
+    covered = _covered_window(tile_canvas, src_canvas)
+    if covered is None:
+        return tile
+    (r0, r1), (c0, c1) = covered
+    data_arr = xr.DataArray(raster, coords=canvas_to_coords(src_canvas),
+                            dims=src_canvas.dims, attrs={'canvas': src_canvas})
+    es = select_canvas(ElmStore({band_spec.name: data_arr},
+                                attrs={'canvas': src_canvas}),
+                       _window_canvas(tile_canvas, covered))
+    tile[r0:r1, c0:c1] = es[band_spec.name].values
+    return tile
+
+
+def _read_cube_chunk(*args):
+    return read_cube_tile(*args)[np.newaxis]
+
+
+def load_ts_cube(filenames, canvas, band_spec, times=None,
+                 time_from_filename=None, source_canvas=None,
+                 tile_shape=TILE_SHAPE, load_array=None, reader=None,
+                 dtype=None, load_meta=None, n_threads=None):
+    '''Stack a band of many files, one per time, into a lazy (t, y, x) cube
+
+    Parameters:
+        :filenames:     filenames (or TIF directories)
+        :canvas:        target elm.readers.Canvas with dims ("y", "x")
+        :band_spec:     elm.readers.BandSpec of the band in each file
+        :times, time_from_filename: times of files, see ts_cube_files
+        :source_canvas: Canvas of the band in the files if they are not
+                        on canvas' grid (files are resampled to canvas)
+        :tile_shape:    (rows, cols) of the dask chunks (and reads)
+        :load_array:    function like elm.readers.load_array (the default)
+        :reader:        reader for load_array, e.g. "hdf4"
+        :dtype:         float dtype, default: the float dtype policy or
+                        float64 (see elm.config.dtype_policy)
+        :load_meta:     function like elm.readers.load_meta, called
+                        once per file (default: the loader of reader
+                        or of each file's type)
+        :n_threads:     number of files whose metadata is loaded at
+                        once (see elm.readers.band_reader)
+
+    Returns:
+        :es:            ElmStore with one band, band_spec.name, a DataArray
+                        with dims ("t", "y", "x") backed by a dask array
+    '''
+    import dask.array as da
+    from dask.base import tokenize
+    if not isinstance(band_spec, BandSpec):
+        raise ValueError('Expected an elm.readers.BandSpec (got {})'.format(band_spec))
+    if tuple(canvas.dims) != ('y', 'x'):
+        raise ValueError('Expected a canvas with dims ("y", "x") (got {})'.format(canvas.dims))
+    times, filenames = ts_cube_files(filenames, times=times,
+                                     time_from_filename=time_from_filename)
+    if not filenames:
+        raise ValueError('No files to stack in a time series cube')
+    dtype = np.dtype(dtype or get_float_dtype(np.float64))
+    row_chunks = _tile_chunks(canvas.buf_ysize, tile_shape[0])
+    col_chunks = _tile_chunks(canvas.buf_xsize, tile_shape[1])
+    row_starts = np.cumsum((0,) + row_chunks)
+    col_starts = np.cumsum((0,) + col_chunks)
+    name = 'ts-cube-' + tokenize(filenames, canvas, band_spec, source_canvas,
+                                 tile_shape, reader, dtype.name)
+    metas = read_bands([partial(_load_cube_meta, f, band_spec,
+                                load_meta=load_meta, reader=reader)
+                        for f in filenames], n_threads=n_threads)
+    dsk = {}
+    for t, (filename, meta) in enumerate(zip(filenames, metas)):
+        for i in range(len(row_chunks)):
+            for j in range(len(col_chunks)):
+                window = ((row_starts[i], row_starts[i + 1]),
+                          (col_starts[j], col_starts[j + 1]))
+                dsk[(name, t, i, j)] = (_read_cube_chunk, filename, band_spec,
+                                        canvas, window, source_canvas,
+                                        load_array, reader, dtype, meta)
+    data = da.Array(dsk, name, ((1,) * len(filenames), row_chunks, col_chunks),
+                    dtype=dtype)
+    cube_canvas = attr.evolve(canvas, dims=(TIME_DIM,) + tuple(canvas.dims),
+                              tsize=len(times), tbounds=[times[0], times[-1]])
+    coords = canvas_to_coords(canvas)
+    data_arr = xr.DataArray(data,
+                            coords=[(TIME_DIM, times)] + list(coords.items()),
+                            dims=cube_canvas.dims,
+                            attrs={'canvas': cube_canvas,
+                                   'filenames': filenames})
+    return ElmStore({band_spec.name: data_arr},
+                    attrs={'canvas': cube_canvas,
+                           'band_order': [band_spec.name]})
+
+
+def iter_cube_tiles(es, band=None, tile_shape=None):
+    '''Compute a (t, y, x) cube one (y, x) tile at a time
+
+    Parameters:
+        :es:         ElmStore from load_ts_cube
+        :band:       band name, default: the first of es.band_order
+        :tile_shape: (rows, cols), default: the dask chunks of the band
+
+    Yields:
+        :(window, tile): window ((row_start, row_stop), (col_start,
+                     col_stop)) and ElmStore of the band's full time
+                     series in that window (numpy backed)
+    '''
+    band = band or es.band_order[0]
+    data_arr = es[band]
+    t_dim, y_dim, x_dim = data_arr.dims
+    canvas = data_arr.attrs['canvas']
+    if tile_shape is None and data_arr.chunks:
+        row_chunks, col_chunks = data_arr.chunks[1:]
+    else:
+        tile_shape = tile_shape or TILE_SHAPE
+        row_chunks = _tile_chunks(data_arr.shape[1], tile_shape[0])
+        col_chunks = _tile_chunks(data_arr.shape[2], tile_shape[1])
+    space_canvas = attr.evolve(canvas, dims=(y_dim, x_dim), tsize=None, tbounds=None)
+    row_starts = np.cumsum((0,) + tuple(row_chunks))
+    col_starts = np.cumsum((0,) + tuple(col_chunks))
+    for i in range(len(row_chunks)):
+        for j in range(len(col_chunks)):
+            window = ((int(row_starts[i]), int(row_starts[i + 1])),
+                      (int(col_starts[j]), int(col_starts[j + 1])))
+            (r0, r1), (c0, c1) = window
+            tile = data_arr.isel(**{y_dim: slice(r0, r1), x_dim: slice(c0, c1)})
+            tile_canvas = _window_canvas(space_canvas, window)
+            attrs = dict(tile.attrs)
+            attrs['canvas'] = attr.evolve(tile_canvas, dims=data_arr.dims,
+                                          tsize=canvas.tsize, tbounds=canvas.tbounds)
+            tile = xr.DataArray(np.asarray(tile.values), coords=tile.coords,
+                                dims=tile.dims, attrs=attrs)
+            yield window, ElmStore({band: tile},
+                                   attrs={'canvas': attrs['canvas'],
+                                          'band_order': [band]})
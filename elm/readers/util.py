@@ -11,23 +11,20 @@ import logging
 import numbers
 import re
 
-import gdal
 import numpy as np
-import ogr
-from rasterio.coords import BoundingBox
-import scipy.interpolate as spi
 
 import attr
 from attr.validators import instance_of
 
 from elm.config import import_callable
+from elm.config.dtype_policy import as_float_dtype, get_float_dtype
 
 __all__ = ['Canvas', 'xy_to_row_col', 'row_col_to_xy',
            'geotransform_to_coords', 'geotransform_to_bounds',
            'canvas_to_coords', 'VALID_X_NAMES', 'VALID_Y_NAMES',
            'xy_canvas','dummy_canvas', 'BandSpec',
            'set_na_from_meta', 'get_shared_canvas',
-           'take_geo_transform_from_meta']
+           'take_geo_transform_from_meta', 'window_geo_transform']
 logger = logging.getLogger(__name__)
 
 SPATIAL_KEYS = ('height', 'width', 'geo_transform', 'bounds')
@@ -60,6 +57,8 @@ class BandSpec(object):
     window = attr.ib(default=None)
     meta_to_geotransform = attr.ib(default=None)
     stored_coords_order = attr.ib(default=('y', 'x'))
+    packed = attr.ib(default=False)
+    build_overviews = attr.ib(default=False)
 
 
 VALID_X_NAMES = ('lon','longitude', 'x') # compare with lower-casing
@@ -99,20 +98,24 @@ def geotransform_to_coords(buf_xsize, buf_ysize, geo_transform):
 
 
 def geotransform_to_bounds(buf_xsize, buf_ysize, geo_transform):
+    from rasterio.coords import BoundingBox
     left, bottom = row_col_to_xy(0, 0, geo_transform)
     right, top = row_col_to_xy(buf_ysize - 1, buf_xsize - 1, geo_transform)
     return BoundingBox(left, bottom, right, top)
 
 
 def raster_as_2d(raster):
+    '''Return a 2-d raster from a (y, x) or (1, y, x) raster, casting
+    floating point rasters to the float dtype policy (see
+    elm.config.dtype_policy)'''
     if len(raster.shape) == 3:
         if raster.shape[0] == 1:
-            return raster[0, :, :]
+            raster = raster[0, :, :]
         else:
             raise ValueError('Did not expect 3-d TIF unless singleton in 0 or 2 dimension')
     elif len(raster.shape) != 2:
         raise ValueError('Expected a raster with shape (y, x) or (1, y, x)')
-    return raster
+    return as_float_dtype(raster)
 
 
 def canvas_to_coords(canvas):
@@ -200,6 +203,30 @@ def window_to_gdal_read_kwargs(**reader_kwargs):
     return reader_kwargs
 
 
+def window_geo_transform(geo_transform, offsets, steps=(1, 1)):
+    '''geo_transform of a window of a raster
+
+    Parameters:
+        :geo_transform: geo_transform of the raster
+        :offsets:       (row, col) of the window's upper left corner
+        :steps:         (row, col) pixel steps of a strided or reduced
+                        resolution read of the window
+
+    Returns:
+        :geo_transform: list with the origin moved to the window's
+                        corner and the pixel size multiplied by steps
+    '''
+    (row, col), (row_step, col_step) = offsets, steps
+    geo_transform = list(geo_transform)
+    geo_transform[0] += col * geo_transform[1] + row * geo_transform[2]
+    geo_transform[3] += col * geo_transform[4] + row * geo_transform[5]
+    geo_transform[1] *= col_step
+    geo_transform[4] *= col_step
+    geo_transform[2] *= row_step
+    geo_transform[5] *= row_step
+    return geo_transform
+
+
 def take_geo_transform_from_meta(band_spec=None, required=True, **meta):
     if band_spec and getattr(band_spec, 'meta_to_geotransform', False):
         func = import_callable(band_spec.meta_to_geotransform)
@@ -351,14 +378,28 @@ def set_na_from_meta(es, **kwargs):
     would be NaN. With ``es.attrs.valid_range == [0, 1]`` all values in all bands
     outside of (0, 1) would be assigned NaN.
 
+    Integer bands are cast to the float dtype policy (see
+    elm.config.dtype_policy), or float32 if there is no policy.
+
+    Packed bands (see elm.readers.packed) are decoded, with the
+    ranges and missing value in packed units.  NaNs are not set again
+    in bands that were decoded from packed bands.
+
     '''
+    from elm.readers.packed import DECODED, PACKED, decode_band
     attrs = es.attrs
-    for band in es.data_vars:
+    for band in tuple(es.data_vars):
         band_arr = getattr(es, band)
-        if 'int' in str(band_arr.values.dtype):
-            band_arr.values = band_arr.values.astype(np.float32)
+        if PACKED in band_arr.attrs:
+            es[band] = decode_band(band_arr)
+        elif 'int' in str(band_arr.values.dtype):
+            band_arr.values = band_arr.values.astype(get_float_dtype(np.float32))
+        else:
+            band_arr.values = as_float_dtype(band_arr.values)
     for idx, band in enumerate(es.data_vars):
         band_arr = getattr(es, band)
+        if DECODED in band_arr.attrs:
+            continue
         val = band_arr.values
         invalid_range_b = extract_invalid_range(**band_arr.attrs)
         if invalid_range_b is not None:
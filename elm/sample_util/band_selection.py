@@ -7,8 +7,6 @@
 '''
 from collections import OrderedDict
 
-from gdalconst import GA_ReadOnly
-import gdal
 import logging
 
 from elm.config import import_callable
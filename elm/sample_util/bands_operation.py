@@ -2,6 +2,8 @@ from functools import partial
 
 import xarray as xr
 
+from elm.config.dtype_policy import as_float_dtype
+from elm.readers.packed import decode_band
 from elm.sample_util.change_coords import ModifySample
 
 def two_bands_operation(method, X, y=None, sample_weight=None, spec=None, **kwargs):
@@ -11,8 +13,10 @@ def two_bands_operation(method, X, y=None, sample_weight=None, spec=None, **kwar
     if not spec:
         raise ValueError('Expected "spec" in kwargs, e.g. {"ndvi": ["band_4", "band_3]}')
     for idx, (key, (b1, b2)) in enumerate(sorted(spec.items())):
-        band1 = getattr(X, b1)
-        band2 = getattr(X, b2)
+        # compute in the float dtype policy, if any, rather than
+        # promoting integer bands to float64
+        band1 = as_float_dtype(decode_band(getattr(X, b1)), integers=True)
+        band2 = as_float_dtype(decode_band(getattr(X, b2)), integers=True)
         if method == 'normed_diff':
             new = (band1 - band2) / (band1 + band2)
         elif method == 'diff':
@@ -41,6 +41,7 @@ class SelectCanvas(StepMixin):
         :mod:`elm.readers.reshape`
     '''
     _sp_step = 'select_canvas'
+    _packed_ok = True
     def __init__(self, band=None):
         self.band = band
 
@@ -70,19 +71,21 @@ class SelectCanvas(StepMixin):
 class Flatten(StepMixin):
     '''
     flatten an ElmStore from rasters in separate DataArrays to
-    single flat DataArray
+    a FlatStore (see elm.readers.flat_store)
 
     See also:
         :class:`elm.readers.flatten`
         :mod:`elm.readers.reshape`
     '''
     _sp_step = 'flatten'
+    _packed_ok = True
+    _flat_store_ok = True
 
     def __init__(self):
         pass
 
     def fit_transform(self, X, y=None, sample_weight=None, **kwargs):
-        return (_flatten(X), y, sample_weight)
+        return (_flatten(X, flat_store=True), y, sample_weight)
 
     transform = fit = fit_transform
 
@@ -104,6 +107,7 @@ class DropNaRows(StepMixin):
         :mod:`elm.readers.reshape`
     '''
     _sp_step = 'drop_na_rows'
+    _flat_store_ok = True
     def __init__(self):
         '''In an ElmStore that has a DataArray flat, drop NA rows
 
@@ -156,6 +160,7 @@ class InverseFlatten(StepMixin):
 
 class Transpose(StepMixin):
     _sp_step = 'transpose'
+    _packed_ok = True
     def __init__(self, trans_arg):
         '''Calls the xarray.DataArray.transpose method
 
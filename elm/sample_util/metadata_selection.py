@@ -7,8 +7,6 @@
 '''
 from collections import OrderedDict
 
-from gdalconst import GA_ReadOnly
-import gdal
 import logging
 import pandas as pd
 import re
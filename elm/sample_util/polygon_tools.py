@@ -7,9 +7,6 @@
 '''
 import numpy as np
 from numba import njit
-from matplotlib.path import Path
-import matplotlib.patches as patches
-import matplotlib.pyplot as plt
 
 # Implementation inspired by pseudo-code and pros at:
 # http://www.inf.usi.ch/hormann/papers/Hormann.2001.TPI.pdf
@@ -196,6 +193,8 @@ def vec_points_in_polys(x_vec, y_vec, polys, inon=True, closedPolys=False):
 
 def plot_poly(plt, poly_x, poly_y):
     # Debug helper, will plot a polygon into plt's gcf
+    from matplotlib.path import Path
+    import matplotlib.patches as patches
     length = len(poly_x) + 1
     pthcode = [Path.LINETO] * length
     pthcode[0] = Path.MOVETO
@@ -8,18 +8,22 @@
 import copy
 from functools import WRAPPER_ASSIGNMENTS, wraps, partial
 
-import sklearn.feature_selection as skfeat
-import sklearn.preprocessing as skpre
 import numpy as np
 import xarray as xr
 
 from elm.config import import_callable
+from elm.config.dtype_policy import as_float_dtype, get_float_dtype
 from elm.model_selection.util import get_args_kwargs_defaults
 from elm.readers import *
 from elm.sample_util.step_mixin import StepMixin
 
 class SklearnBase(StepMixin):
+    _flat_store_ok = True
+    _stats_bands = None
+
     def __init__(self,  **kwargs):
+        import sklearn.feature_selection as skfeat
+        import sklearn.preprocessing as skpre
         cls = getattr(skfeat, self.__class__.__name__, None)
         if cls is None:
             cls = getattr(skpre, self.__class__.__name__)
@@ -31,6 +35,7 @@ class SklearnBase(StepMixin):
     def _import_score_func(self, **params):
         if 'score_func' in params:
             if isinstance(params['score_func'], str):
+                import sklearn.feature_selection as skfeat
                 sf = getattr(skfeat, params['score_func'], None)
                 if not sf:
                     sf = import_callable(params['score_func'])
@@ -38,6 +43,8 @@ class SklearnBase(StepMixin):
         return params
 
     def require_flat(self, X):
+        if isinstance(X, FlatStore):
+            return
         if not (isinstance(X, (ElmStore, xr.Dataset)) and hasattr(X, 'flat')):
             raise ValueError("Expected an elm.readers.ElmStore or xarray.Dataset with DataArray 'flat' (2-d array with dims [space, band])")
 
@@ -45,7 +52,7 @@ class SklearnBase(StepMixin):
         args, defaults, var_kwargs = get_args_kwargs_defaults(func)
         kw = dict(y=y, sample_weight=sample_weight, **kwargs)
         kw = {k: v for k, v in kw.items() if k in defaults or k in args}
-        return ((X.flat.values,), kw, y, sample_weight)
+        return ((as_float_dtype(X.flat.values),), kw, y, sample_weight)
 
     def get_params(self, **kwargs):
         params = self._estimator.get_params()
@@ -69,8 +76,19 @@ class SklearnBase(StepMixin):
         X = self._to_elm_store(new_X, X)
         return (X, y, sample_weight)
 
+    def _check_stats_bands(self, X):
+        self.require_flat(X)
+        band = [str(b) for b in np.asarray(X.flat.band)]
+        if band != self._stats_bands:
+            raise ValueError('{} was fit from stats of bands {} but X has bands '
+                             '{}'.format(self.__class__.__name__, self._stats_bands, band))
+
     def fit_transform(self, *args, **kwargs):
         X = args[0]
+        if self._stats_bands is not None:
+            # fit with fit_from_stats
+            self._check_stats_bands(X)
+            return self.transform(*args, **kwargs)
         if hasattr(self._estimator, 'fit_transform'):
             self.require_flat(X)
             args, kwargs, y, sample_weight = self._filter_kw(self._estimator.fit_transform, *args, **kwargs)
@@ -82,14 +100,21 @@ class SklearnBase(StepMixin):
 
     def fit(self, *args, **kwargs):
         X = args[0]
+        if self._stats_bands is not None:
+            self._check_stats_bands(X)
+            return self._estimator
         self.require_flat(X)
         args, kwargs, _, _ = self._filter_kw(self._estimator.fit, *args, **kwargs)
         return self._estimator.fit(*args, **kwargs)
 
     def _to_elm_store(self, X, old_X):
+        if isinstance(old_X, FlatStore):
+            band = ['feat_{}'.format(idx) for idx in range(X.shape[1])]
+            return old_X.new(as_float_dtype(X), band)
         attrs = copy.deepcopy(old_X.attrs)
         attrs.update(copy.deepcopy(old_X.flat.attrs))
         band = ['feat_{}'.format(idx) for idx in range(X.shape[1])]
+        X = as_float_dtype(X)
         flat = xr.DataArray(X,
                             coords=[('space', old_X.flat.space), ('band', band)],
                             dims=old_X.flat.dims,
@@ -118,9 +143,44 @@ class LabelEncoder(SklearnBase):
 class MaxAbsScaler(SklearnBase):
     '''sklearn.preprocessing.MaxAbsScaler for elm.pipeline.Pipeline'''
 
+def _stats_list(stats, band_order):
+    if band_order is None:
+        band_order = list(stats)
+    missing = [band for band in band_order if band not in stats]
+    if missing:
+        raise ValueError('No stats for bands {}'.format(missing))
+    return [str(band) for band in band_order], [stats[band] for band in band_order]
+
+
 class MinMaxScaler(SklearnBase):
     '''sklearn.preprocessing.MinMaxScaler for elm.pipeline.Pipeline'''
 
+    def fit_from_stats(self, stats, band_order=None):
+        '''Fit from merged elm.readers.BandStats (e.g. from
+        GranuleIndex.band_stats) instead of a sample, then fit and
+        fit_transform only transform
+
+        Parameters:
+            :stats:      dict of band name to BandStats
+            :band_order: band names, in order of the columns of X,
+                         default: the keys of stats
+        '''
+        band_order, stats = _stats_list(stats, band_order)
+        est = self._estimator
+        data_min = np.array([s.min for s in stats], dtype=np.float64)
+        data_max = np.array([s.max for s in stats], dtype=np.float64)
+        data_range = data_max - data_min
+        low, high = est.feature_range
+        est.data_min_ = data_min
+        est.data_max_ = data_max
+        est.data_range_ = data_range
+        est.scale_ = (high - low) / np.where(data_range == 0, 1., data_range)
+        est.min_ = low - data_min * est.scale_
+        est.n_samples_seen_ = int(max(s.count for s in stats))
+        est.n_features_in_ = len(stats)
+        self._stats_bands = band_order
+        return self
+
 class MultiLabelBinarizer(SklearnBase):
     '''sklearn.preprocessing.MultiLabelBinarizer for elm.pipeline.Pipeline'''
 
@@ -139,6 +199,27 @@ class RobustScaler(SklearnBase):
 class StandardScaler(SklearnBase):
     '''sklearn.preprocessing.StandardScaler for elm.pipeline.Pipeline'''
 
+    def fit_from_stats(self, stats, band_order=None):
+        '''Fit from merged elm.readers.BandStats (e.g. from
+        GranuleIndex.band_stats) instead of a sample, then fit and
+        fit_transform only transform
+
+        Parameters:
+            :stats:      dict of band name to BandStats
+            :band_order: band names, in order of the columns of X,
+                         default: the keys of stats
+        '''
+        band_order, stats = _stats_list(stats, band_order)
+        est = self._estimator
+        var = np.array([s.var for s in stats], dtype=np.float64)
+        est.mean_ = np.array([s.mean for s in stats], dtype=np.float64) if est.with_mean else None
+        est.var_ = var if est.with_std else None
+        est.scale_ = np.sqrt(np.where(var == 0, 1., var)) if est.with_std else None
+        est.n_samples_seen_ = int(max(s.count for s in stats))
+        est.n_features_in_ = len(stats)
+        self._stats_bands = band_order
+        return self
+
 class RFE(SklearnBase):
     '''sklearn.feature_selection.RFE for elm.pipeline.Pipeline'''
 
@@ -182,7 +263,7 @@ def require_positive(X, small_num=0.0001):
 
 
     if X.dtype.kind != 'f':
-        X = X.astype(np.float32)
+        X = X.astype(get_float_dtype(np.float32))
     X[np.where(X <= 0)] = small_num
     return X
 
@@ -17,12 +17,12 @@ from pprint import pformat
 import numpy as np
 import xarray as xr
 from sklearn.utils import check_array as _check_array
-import sklearn.preprocessing as skpre
-import sklearn.feature_selection as skfeat
 
 from elm.config import import_callable
+from elm.config.dtype_policy import as_float_dtype
 from elm.model_selection.util import get_args_kwargs_defaults
-from elm.readers import (ElmStore, flatten as _flatten, load_meta, load_array)
+from elm.readers import (ElmStore, FlatStore, flatten as _flatten,
+                         load_meta, load_array)
 from elm.sample_util.change_coords import CHANGE_COORDS_ACTIONS
 from elm.pipeline import steps
 from elm.sample_util.preproc_scale import SKLEARN_PREPROCESSING
@@ -107,6 +107,8 @@ def make_pipeline_steps(config, pipeline):
 
     This is used by :func:``elm.pipeline.parse_run_config``
     '''
+    import sklearn.feature_selection as skfeat
+    import sklearn.preprocessing as skpre
     actions = []
     for action_idx, action in enumerate(pipeline):
         is_dic = isinstance(action, dict)
@@ -203,7 +205,7 @@ def final_on_sample_step(fitter,
     Parameters:
         :fitter: fit function object
         :model:  the final estimator in a Pipeline
-        :X:      ElmStore with DataArray "flat"
+        :X:      ElmStore with DataArray "flat" or FlatStore
         :fit_kwargs: kwargs to fitter
         :y:      numpy array y if needed
         :sample_weight: numpy array if needed
@@ -225,18 +227,21 @@ def final_on_sample_step(fitter,
         fit_kwargs.pop('sample_weight', None)
     if isinstance(X, np.ndarray):
         X_values = X             # numpy array 2-d
+    elif isinstance(X, FlatStore):
+        X_values = X.values
     elif isinstance(X, (ElmStore, xr.Dataset)):
         if hasattr(X, 'flat'):
             X_values = X.flat.values
         else:
             logger.info("After running Pipeline, X is not an ElmStore with a DataArray called 'flat' and X is not a numpy array.  Found {}".format(type(X)))
             logger.info("Trying elm.readers.reshape:flatten on X. If this fails, try a elm.pipeline.steps:ModifySample step to create ElmStore with 'flat' DataArray")
-            X = _flatten(X)
-            X_values = X.flat.values
+            X = _flatten(X, flat_store=True)
+            X_values = X.values
     else:
         X_values = X # may not be okay for sklearn models,e.g KMEans but can be passed thru Pipeline
     if X_values.ndim == 1:
         X_values = X_values.reshape(-1, 1)
+    X_values = as_float_dtype(X_values)
     args, kwargs, var_keyword = get_args_kwargs_defaults(fitter)
 
     has_y = _has_arg(y)
@@ -4,26 +4,115 @@
 ``elm.sample_util.sampleres``
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+Samples are loaded by dask tasks from make_samples_dask.  Within
+the shared_samples context (used by elm-main --config-dir with
+--max-concurrent-configs > 1), each distinct sample - the same
+sampler, args and data_source - is loaded once and each Pipeline /
+config using it gets its own copy.
 '''
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from concurrent.futures import Future
+import contextlib
+import copy
+import itertools
+import threading
 
 import attr
+from dask.base import tokenize
 import numpy as np
 import pandas as pd
 
-sample_idx = 0
+from elm.config.dask_settings import _is_distributed_client
+from elm.config.profiling import profile_task
+
+_sample_idx = itertools.count()
 def _next_name(token):
-    global sample_idx
-    s = '{}_{}'.format(token, sample_idx)
-    sample_idx += 1
-    return s
+    return '{}_{}'.format(token, next(_sample_idx))
+
+SHARED_SAMPLES = None
+SHARED_SAMPLES_MAX = 16
+_shared_lock = threading.Lock()
+_shared_depth = 0
+_shared_max = SHARED_SAMPLES_MAX
+
+
+def _enter_shared_samples(max_samples=SHARED_SAMPLES_MAX):
+    global SHARED_SAMPLES, _shared_depth, _shared_max
+    with _shared_lock:
+        if not _shared_depth:
+            SHARED_SAMPLES = OrderedDict()
+            _shared_max = max_samples
+        _shared_depth += 1
+
+
+def _exit_shared_samples():
+    global SHARED_SAMPLES, _shared_depth
+    with _shared_lock:
+        _shared_depth -= 1
+        if not _shared_depth:
+            SHARED_SAMPLES = None
+
 
+@contextlib.contextmanager
+def shared_samples(client=None, max_samples=SHARED_SAMPLES_MAX):
+    '''Within this context, load each distinct sample (same sampler,
+    args and data_source) once for all the Pipelines or configs that
+    use it, e.g. configs run concurrently by run_many_configs.
+    Samplers are assumed to return the same sample for the same
+    arguments.  Each caller gets a copy of the sample, so steps
+    such as ModifySample may change it in place.
 
+    Parameters:
+        :client: dask client or None.  With a distributed client,
+                 samples are also shared within each worker
+        :max_samples: number of the most recently used samples
+                      held in memory (on each worker if distributed)
+    '''
+    if max_samples < 1:
+        raise ValueError('Expected max_samples > 0 (got {})'.format(max_samples))
+    distributed = _is_distributed_client(client)
+    _enter_shared_samples(max_samples)
+    if distributed:
+        client.run(_enter_shared_samples, max_samples)
+    try:
+        yield
+    finally:
+        if distributed:
+            client.run(_exit_shared_samples)
+        _exit_shared_samples()
+
+
+def _create_sample(pipe, args, sampler, data_source):
+    return pipe.create_sample(sampler=sampler, sampler_args=args,
+                              **{k: v for k, v in data_source.items()
+                                 if k not in ('sampler', 'sampler_args')})
+
+
+@profile_task('sample')
 def _make_sample(pipe, args, sampler, data_source):
-    out = pipe.create_sample(sampler=sampler, sampler_args=args,
-                             **{k: v for k, v in data_source.items()
-                                if k not in ('sampler', 'sampler_args')})
-    return out
+    cache = SHARED_SAMPLES
+    if cache is None:
+        return _create_sample(pipe, args, sampler, data_source)
+    token = tokenize(sampler, args, data_source)
+    with _shared_lock:
+        future = cache.get(token)
+        owner = future is None
+        if owner:
+            future = cache[token] = Future()
+            while len(cache) > _shared_max:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(token)
+    if owner:
+        try:
+            future.set_result(_create_sample(pipe, args, sampler, data_source))
+        except Exception as e:
+            with _shared_lock:
+                if cache.get(token) is future:
+                    del cache[token]
+            future.set_exception(e)
+    # the cached sample is never handed out, so callers may modify theirs
+    return copy.deepcopy(future.result())
 
 
 def make_samples(pipe, args_list, sampler, data_source):
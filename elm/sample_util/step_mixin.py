@@ -12,6 +12,12 @@ class StepMixin(object):
     _func = None
     _required_kwargs = None
     _context = 'sample pipeline step'
+    # True if the step takes packed bands (elm.readers.packed),
+    # otherwise a Pipeline decodes them before the step
+    _packed_ok = False
+    # True if the step takes a FlatStore (elm.readers.flat_store),
+    # otherwise a Pipeline gives the step a flattened ElmStore
+    _flat_store_ok = False
 
     def __init__(self, *args, func=None, **kwargs):
         self._args = args
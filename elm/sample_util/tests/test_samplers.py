@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import os
+import threading
+
+import numpy as np
+import pytest
+import yaml
+
+from elm.model_selection.tests.evolve_example_config import CONFIG_STR
+from elm.pipeline import Pipeline, steps
+from elm.pipeline.tests.util import random_elm_store, tmp_dirs_context
+from elm.sample_util.samplers import _make_sample, shared_samples
+from elm.scripts.main import main
+from sklearn.cluster import MiniBatchKMeans
+
+CALLS = []
+_lock = threading.Lock()
+
+
+def counting_sampler(*args, **kwargs):
+    with _lock:
+        CALLS.append(args)
+    return random_elm_store(bands=3, height=20, width=30)
+
+
+def counting_blobs(*args, **kwargs):
+    from elm.pipeline.tests.util import make_blobs_elm_store
+    with _lock:
+        CALLS.append(args)
+    return make_blobs_elm_store(n_samples=500, n_features=8, centers=3)
+
+
+def _fit(n_clusters):
+    pipe = Pipeline([steps.Flatten(), MiniBatchKMeans(n_clusters=n_clusters)])
+    return pipe.fit_ensemble(sampler=counting_sampler,
+                             args_list=[(1,), (2,)],
+                             models_share_sample=False, ngen=2)
+
+
+def test_shared_samples():
+    del CALLS[:]
+    _fit(3)
+    assert len(CALLS) == 4 # 2 generations x 2 samples
+    del CALLS[:]
+    with shared_samples():
+        with ThreadPoolExecutor(3) as pool:
+            fitted = list(pool.map(_fit, [2, 3, 4]))
+    assert sorted(CALLS) == [(1,), (2,)]
+    assert [len(pipe.ensemble) for pipe in fitted] == [4, 4, 4]
+    del CALLS[:]
+    _fit(3)
+    assert len(CALLS) == 4
+
+
+def test_shared_samples_copies_and_eviction():
+    del CALLS[:]
+    pipe = Pipeline([steps.Flatten()])
+    data_source = {'sampler': counting_sampler}
+    with shared_samples(max_samples=1):
+        X1, _, _ = _make_sample(pipe, (1,), counting_sampler, data_source)
+        X1.band_1.values[:] = np.NaN
+        X2, _, _ = _make_sample(pipe, (1,), counting_sampler, data_source)
+        assert X2 is not X1 and not np.isnan(X2.band_1.values).any()
+        assert len(CALLS) == 1
+        _make_sample(pipe, (2,), counting_sampler, data_source)
+        _make_sample(pipe, (1,), counting_sampler, data_source)
+    assert CALLS == [(1,), (2,), (1,)]
+    with pytest.raises(ValueError):
+        with shared_samples(max_samples=0):
+            pass
+
+
+def test_run_many_configs_concurrently():
+    config = yaml.load(CONFIG_STR)
+    config['data_sources']['synthetic'] = {
+        'sampler': 'elm.sample_util.tests.test_samplers:counting_blobs',
+        'sampler_args': None}
+    pg = config['param_grids']['example_param_grid']
+    pg['control'].update({'ngen': 2, 'mu': 4, 'k': 4})
+    del CALLS[:]
+    with tmp_dirs_context('test_run_many_configs_concurrently') as (train_path, predict_path, cwd):
+        for idx in range(3):
+            cfg = copy.deepcopy(config)
+            cfg['train']['kmeans']['model_init_kwargs']['n_clusters'] = idx + 2
+            with open(os.path.join(cwd, 'config_{}.yaml'.format(idx)), 'w') as f:
+                f.write(yaml.dump(cfg))
+        ret = main(sys_argv=['--config-dir', cwd,
+                             '--max-concurrent-configs', '3'])
+        assert ret == 0
+    # One sample shared by all 3 configs and generations
+    assert len(CALLS) == 1
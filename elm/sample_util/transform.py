@@ -11,8 +11,9 @@ import logging
 import numpy as np
 import xarray as xr
 
+from elm.config.dtype_policy import as_float_dtype
 from elm.sample_util.step_mixin import StepMixin
-from elm.readers import ElmStore
+from elm.readers import ElmStore, FlatStore
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,8 @@ __all__ = ['Transform',]
 
 class Transform(StepMixin):
     '''Wraps transform models like IncrementalPCA for use in elm.pipeline.Pipeline'''
+    _flat_store_ok = True
+
     def __init__(self, estimator, partial_fit_batches=None):
         '''Wraps transform models like IncrementalPCA for use in elm.pipeline.Pipeline
 
@@ -53,7 +56,9 @@ class Transform(StepMixin):
         fitter_func = getattr(self._estimator, method)
         kw = dict(y=y, sample_weight=sample_weight, **kwargs)
         kw = {k: v for k, v in kw.items() if k in self._params}
-        if isinstance(X, (ElmStore, xr.Dataset)):
+        if isinstance(X, FlatStore):
+            XX = X.values
+        elif isinstance(X, (ElmStore, xr.Dataset)):
             if hasattr(X, 'flat'):
                 XX = X.flat.values
                 space = X.flat.space
@@ -61,12 +66,14 @@ class Transform(StepMixin):
                 raise ValueError("Call elm.pipeline.steps.Flatten() before Transform in pipeline or otherwise use X as an (elm.readers.ElmStore or xarray.Dataset)")
         else:
             raise ValueError('Expected X to be an xarray.Dataset or elm.readers.ElmStore')
-        out = fitter_func(X.flat.values, **kw)
+        out = fitter_func(as_float_dtype(XX), **kw)
         if 'transform' in method:
             # 'transform' or 'fit_transform' was called
-            out = np.atleast_2d(out)
+            out = as_float_dtype(np.atleast_2d(out))
             band = ['transform_{}'.format(idx)
                     for idx in range(out.shape[1])]
+            if isinstance(X, FlatStore):
+                return (X.new(out, band), y, sample_weight)
             coords = [('space', space),
                       ('band', band)]
             attrs = copy.deepcopy(X.attrs)
@@ -14,12 +14,12 @@ import logging
 import glob
 import random
 
-from sklearn.cluster import MiniBatchKMeans
 import numpy as np
 import pandas as pd
 from scipy.stats import describe
 import xarray as xr
 
+from elm.config.dtype_policy import get_float_dtype
 from elm.model_selection.kmeans import kmeans_aic, kmeans_model_averaging
 from elm.readers import ElmStore
 from elm.sample_util.step_mixin import StepMixin
@@ -63,7 +63,7 @@ def ts_describe(X, y=None, sample_weight=None, **kwargs):
     shp = tuple(s for idx, s in enumerate(band_arr.values.shape)
                 if isinstance(inds[idx], int))
     num_rows = np.prod(shp)
-    new_arr = np.empty((num_rows, num_cols))
+    new_arr = np.empty((num_rows, num_cols), dtype=get_float_dtype(np.float64))
     for row, (i, j) in enumerate(product(*(range(s) for s in shp))):
         ind1, ind2, ind3 = _ij_for_axis(kwargs['axis'], i, j)
         values = band_arr.values[ind1, ind2, ind3]
@@ -115,7 +115,8 @@ def ts_probs(X, y=None, sample_weight=None, **kwargs):
         bins = np.linspace(-bin_size * num_bins // 2, bin_size * num_bins // 2, num_bins)
     num_rows = np.prod(band_arr.shape[1:])
     col_count =  num_bins
-    new_arr = np.empty((num_rows, col_count),dtype=np.float64)
+    dtype = get_float_dtype(np.float64)
+    new_arr = np.empty((num_rows, col_count), dtype=dtype)
     logger.info("Histogramming...")
     small = 1e-8
     inds = _ij_for_axis(kwargs['axis'], 0, 0)
@@ -126,7 +127,7 @@ def ts_probs(X, y=None, sample_weight=None, **kwargs):
         values_slc = band_arr.values[ind1, ind2, ind3]
         if bin_size is not None:
             indices = np.searchsorted(bins, values_slc, side='left')
-            binned = np.bincount(indices).astype(np.float64)
+            binned = np.bincount(indices).astype(dtype)
             # add small to avoid log zero
             if log_probs:
                 was_zero = binned[binned == 0].size
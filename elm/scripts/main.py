@@ -1,5 +1,6 @@
 
 from argparse import ArgumentParser, Namespace
+from concurrent.futures import ThreadPoolExecutor
 import contextlib
 import copy
 import datetime
@@ -9,8 +10,6 @@ import logging
 import os
 import warnings
 
-from dask.diagnostics import ProgressBar
-
 from elm.config.cli import (add_config_file_argument,
                             add_run_options,
                             add_ensemble_kwargs,
@@ -19,7 +18,7 @@ from elm.config.cli import (add_config_file_argument,
 from elm.config import (DEFAULTS, ConfigParser,
                         client_context, ElmConfigError,
                         parse_env_vars)
-from elm.pipeline import parse_run_config
+from elm.config.profiling import profile_context
 
 logger = logging.getLogger(__name__)
 
@@ -56,10 +55,35 @@ def try_finally_log_etime(started):
             logger.info('There were errors {}'.format(err))
 
 
+def _profile_dir(config, config_dict, started):
+    '''Directory for the --profile report of one config'''
+    if isinstance(config_dict, str):
+        name = os.path.splitext(os.path.basename(config_dict))[0]
+    else:
+        name = 'config'
+    name = '{}-{}'.format(name, started.strftime('%Y%m%d-%H%M%S-%f'))
+    return os.path.join(config.ELM_TRAIN_PATH, 'profile', name)
+
+
+@contextlib.contextmanager
+def _maybe_profile(config, config_dict, client, started):
+    '''Run profile_context if --profile was given'''
+    if not getattr(config, 'PROFILE', False):
+        yield None
+        return
+    profile_dir = _profile_dir(config, config_dict, started)
+    logger.info('Profile tasks to {}'.format(profile_dir))
+    with profile_context(profile_dir, client=client) as profile_dir:
+        yield profile_dir
+
+
 def run_one_config(args=None, sys_argv=None,
                    return_0_if_ok=True, config_dict=None,
                    client=None, started=None):
 
+    # elm.pipeline imports are slow, so they are not made
+    # for "elm-main --help" or argument errors
+    from elm.pipeline import parse_run_config
     started = started or datetime.datetime.now()
     args = args or cli(args=None, sys_argv=sys_argv)
     config_dict = config_dict or args.config
@@ -75,9 +99,11 @@ def run_one_config(args=None, sys_argv=None,
                 # of deprecation warnings for kmeans
                 warnings.simplefilter("ignore")
                 with client_context(dask_client, dask_scheduler) as client:
-                    return_values = parse_run_config(config, client)
+                    with _maybe_profile(config, config_dict, client, started):
+                        return_values = parse_run_config(config, client)
         else:
-            return_values = parse_run_config(config, client)
+            with _maybe_profile(config, config_dict, client, started):
+                return_values = parse_run_config(config, client)
 
     if return_0_if_ok:
         return 0
@@ -96,6 +122,7 @@ def _run_one_config_of_many(fname, **kwargs):
 
 def run_many_configs(args=None, sys_argv=None, return_0_if_ok=True,
                      started=None):
+    from elm.sample_util.samplers import shared_samples
     started = started or datetime.datetime.now()
     env_cmd_line = Namespace(**{k: v  for d in (vars(args), parse_env_vars())
                                 for k, v in d.items()
@@ -103,6 +130,10 @@ def run_many_configs(args=None, sys_argv=None, return_0_if_ok=True,
     logger.info('With --config-dir, DASK_CLIENT and DASK_SCHEDULER in config files are ignored')
     dask_client = getattr(env_cmd_line, 'DASK_CLIENT', 'SERIAL')
     dask_scheduler = getattr(env_cmd_line, 'DASK_SCHEDULER', None)
+    max_concurrent = getattr(args, 'max_concurrent_configs', None) or 1
+    if max_concurrent > 1 and getattr(args, 'profile', False):
+        logger.info('With --profile, configs are run one at a time')
+        max_concurrent = 1
     ret_val = 1
     with try_finally_log_etime(started) as _:
         with warnings.catch_warnings():
@@ -116,7 +147,16 @@ def run_many_configs(args=None, sys_argv=None, return_0_if_ok=True,
                       'client': client,}
                 pipe = partial(_run_one_config_of_many, **kw)
                 fnames = glob.glob(os.path.join(args.config_dir, '*.yaml'))
-                ret_val = max(map(pipe, fnames))
+                if max_concurrent > 1:
+                    # Configs share one client and samples with the same
+                    # sampler, args and data_source are loaded once
+                    logger.info('Run {} configs, up to {} at '
+                                'once'.format(len(fnames), max_concurrent))
+                    with shared_samples(client):
+                        with ThreadPoolExecutor(max_concurrent) as pool:
+                            ret_val = max(pool.map(pipe, fnames))
+                else:
+                    ret_val = max(map(pipe, fnames))
     return ret_val
 
 
@@ -128,6 +168,7 @@ def main(args=None, sys_argv=None, return_0_if_ok=True):
     elif args.config_dir:
         ret = run_many_configs(args, started=started, return_0_if_ok=return_0_if_ok)
         logger.info('Elapsed time {}'.format((datetime.datetime.now() - started).total_seconds()))
+        return ret
     ret = run_one_config(args=args, sys_argv=sys_argv,
                           return_0_if_ok=return_0_if_ok,
                           started=started)